@@ -0,0 +1,140 @@
+"""
+Compares the guest checkout order payload with the full order payload, and a
+revalidated GET of the checkout order (304) with a full one (200).
+
+    python -m benchmarks.bench_checkout_payload [--events 12] [--iterations 500]
+                                                [--json results.json]
+
+The serializer comparison renders the same order, with --events deliveries,
+through OrderSerializer and CheckoutOrderSerializer and reports the JSON
+size and render time of each. The request comparison repeats GET
+/api/events/guest-checkout/order/ with and without the ETag of the previous
+response. Runs against a throwaway test database created from
+DJANGO_SETTINGS_MODULE (config.settings by default).
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from benchmarks.bench_webhooks import _summary  # noqa: E402
+
+ORDER_URL = '/api/events/guest-checkout/order/'
+
+
+def _order_with_events(events):
+    from django.contrib.auth import get_user_model
+    from events.models import Event, Order
+
+    user = get_user_model().objects.create_user(username='bench@example.com', email='bench@example.com')
+    order = Order.objects.create(
+        user=user, billing_mode='recurring', frequency='monthly', budget='125.00',
+        start_date=date.today() + timedelta(days=14),
+        recipient_first_name='Bench', recipient_last_name='Mark', delivery_notes='Leave at the door.',
+    )
+    Event.objects.bulk_create(
+        Event(order=order, delivery_date=order.start_date + timedelta(days=30 * n), message='Happy birthday!')
+        for n in range(events)
+    )
+    return Order.objects.prefetch_related('events', 'payments').get(pk=order.pk)
+
+
+def _render(serializer_class, order, iterations):
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        body = renderer.render(serializer_class(order).data)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'bytes': len(body), **_summary(timings, [0] * len(timings))}
+
+
+def _requests(iterations):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    response = client.post('/api/events/guest-checkout/start/', {'brief': {'budget': '125.00'}}, format='json')
+    assert response.status_code == 201, response.data
+    etag = client.get(ORDER_URL)['ETag']
+
+    results = {}
+    for label, headers in (('full_200', {}), ('revalidated_304', {'HTTP_IF_NONE_MATCH': etag})):
+        latencies, queries, size = [], [], 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(ORDER_URL, **headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+            size = len(response.content)
+        results[label] = {'status': response.status_code, 'bytes': size, **_summary(latencies, queries)}
+    return results
+
+
+def run(events, iterations):
+    """Runs both comparisons; returns the results dict."""
+    from events.serializers import CheckoutOrderSerializer, OrderSerializer
+
+    order = _order_with_events(events)
+    return {
+        'serializers': {
+            'OrderSerializer': _render(OrderSerializer, order, iterations),
+            'CheckoutOrderSerializer': _render(CheckoutOrderSerializer, order, iterations),
+        },
+        'requests': _requests(iterations),
+    }
+
+
+def _print_report(results):
+    print(f"{'payload':<26} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in results['serializers'].items():
+        print(f"{name:<26} {row['bytes']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"{'GET order':<26} {'status':>8} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for name, row in results['requests'].items():
+        print(f"{name:<26} {row['status']:>8} {row['bytes']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+              f"{row['p99_ms']:>8} {row['mean_queries']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=12, help='Deliveries on the order rendered by both serializers.')
+    parser.add_argument('--iterations', type=int, default=500, help='Renders and requests per variant.')
+    parser.add_argument('--json', help='Write machine-readable results to this file.')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = run(args.events, args.iterations)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    results['config'] = {
+        'events': args.events,
+        'iterations': args.iterations,
+        'database': settings.DATABASES['default']['ENGINE'],
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    _print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
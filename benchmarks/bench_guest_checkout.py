@@ -0,0 +1,136 @@
+"""
+Drives simulated visitors through the guest checkout funnel and reports how
+many rows each table gains, plus latency and SQL queries per funnel step.
+
+    python -m benchmarks.bench_guest_checkout [--visitors 1000] [--claim-rate 0.2]
+                                              [--json results.json]
+
+Each visitor starts a checkout and edits the brief; a --claim-rate share go on
+to accept the terms and claim it with their details. Only claimed checkouts
+should create a user, so `users` should track `claimed`, not `visitors`. Runs
+against a throwaway test database created from DJANGO_SETTINGS_MODULE
+(config.settings by default).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from collections import defaultdict
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from benchmarks.bench_webhooks import _summary  # noqa: E402
+
+URL = '/api/events/guest-checkout/{}/'
+
+
+def _tables():
+    from django.contrib.auth import get_user_model
+    from data_management.models import TermsAcceptance
+    from events.models import CheckoutSession, Order
+    return {
+        'users': get_user_model(),
+        'orders': Order,
+        'checkout_sessions': CheckoutSession,
+        'terms_acceptances': TermsAcceptance,
+    }
+
+
+def _row_counts():
+    return {name: model.objects.count() for name, model in _tables().items()}
+
+
+def run(visitors, claim_rate, seed=0):
+    """Runs the funnel for every visitor; returns the results dict."""
+    from rest_framework.test import APIClient
+    from data_management.models import TermsAndConditions
+
+    TermsAndConditions.objects.get_or_create(terms_type='customer', version='bench', defaults={'content': 'Terms'})
+    rng = random.Random(seed)
+    latencies, queries = defaultdict(list), defaultdict(list)
+    claimed = 0
+
+    def call(client, step, data=None):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.post(URL.format(step), data or {}, format='json')
+            latencies[step].append((time.perf_counter() - started) * 1000)
+        queries[step].append(len(captured.captured_queries))
+        assert response.status_code < 300, (step, response.status_code, response.data)
+
+    before = _row_counts()
+    started = time.perf_counter()
+    for n in range(visitors):
+        client = APIClient()
+        call(client, 'start', {'brief': {'budget': str(rng.choice([75, 125, 200]))}})
+        call(client, 'order', {'budget': '150.00'})
+        if rng.random() < claim_rate:
+            claimed += 1
+            call(client, 'accept-terms')
+            call(client, 'claim', {'email': f"visitor{n}@example.com", 'first_name': 'Bench', 'last_name': 'Mark'})
+    wall_seconds = time.perf_counter() - started
+    after = _row_counts()
+
+    growth = {name: after[name] - before[name] for name in after}
+    return {
+        'visitors': visitors,
+        'claimed': claimed,
+        'wall_seconds': round(wall_seconds, 3),
+        'rows_added': growth,
+        'rows_per_visitor': {name: round(rows / visitors, 3) for name, rows in growth.items()},
+        'by_step': {step: _summary(latencies[step], queries[step]) for step in latencies},
+    }
+
+
+def _print_report(results):
+    print(f"{results['visitors']} visitors, {results['claimed']} claimed, in {results['wall_seconds']}s")
+    print(f"{'table':<20} {'rows added':>10} {'per visitor':>12}")
+    for name, rows in results['rows_added'].items():
+        print(f"{name:<20} {rows:>10} {results['rows_per_visitor'][name]:>12}")
+    print(f"{'step':<20} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for step, row in results['by_step'].items():
+        print(f"{step:<20} {row['events']:>6} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+              f"{row['p99_ms']:>8} {row['mean_queries']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--visitors', type=int, default=1000, help='Checkouts to start.')
+    parser.add_argument('--claim-rate', type=float, default=0.2, help='Share of visitors who claim their checkout.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write machine-readable results to this file.')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = run(args.visitors, args.claim_rate, seed=args.seed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    results['config'] = {
+        'visitors': args.visitors,
+        'claim_rate': args.claim_rate,
+        'seed': args.seed,
+        'database': settings.DATABASES['default']['ENGINE'],
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    _print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
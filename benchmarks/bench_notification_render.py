@@ -0,0 +1,118 @@
+"""
+Per-message cost of rendering notification emails: render_to_string on both
+templates for every message (as send_notification used to) against the
+layouts in data_management/utils/notification_rendering.py.
+
+    python -m benchmarks.bench_notification_render [--messages 5000] [--json results.json]
+
+Bodies are the realistic admin and customer bodies notification_factory
+builds. Nothing touches the database.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.template.loader import render_to_string  # noqa: E402
+
+from benchmarks.bench_webhooks import _summary  # noqa: E402
+
+
+def _notifications(count):
+    from data_management.models import Notification
+
+    bodies = [
+        (
+            "Action Required: Order flowers for delivery on 2026-11-02",
+            "Upcoming FutureFlower delivery requires ordering.\n\nRecipient: Ana O'Neil\n"
+            "Address: 12 Rose St, Fitzroy, Melbourne, VIC 3065, AU\nDelivery Date: 2026-11-02\n"
+            "Budget: $120.00\nBrief: Pastels & <no lilies>\n",
+        ),
+        (
+            "Your FutureFlower delivery is today!",
+            "Hi Sam,\n\nYour FutureFlower delivery is today! Flowers should be arriving for Jo Lee.\n"
+            "\nYour next delivery after this one is scheduled for 2026-12-02.\n"
+            "\nThank you for choosing FutureFlower!",
+        ),
+    ]
+    return [Notification(subject=subject, body=body) for subject, body in (bodies * count)[:count]]
+
+
+def _time_per_message(render, notifications):
+    timings = []
+    for notification in notifications:
+        started = time.perf_counter()
+        render(notification)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _before(notification):
+    context = {'subject': notification.subject, 'body': notification.body}
+    render_to_string('notifications/emails/admin_notification.html', context)
+    render_to_string('notifications/emails/admin_notification.txt', context)
+
+
+def run(messages):
+    """Times both renderers over the same messages; returns the results dict."""
+    from data_management.utils.notification_rendering import render_email, render_emails
+
+    notifications = _notifications(messages)
+    _before(notifications[0])
+    render_email('warm', 'up')
+
+    before = _time_per_message(_before, notifications)
+    after = _time_per_message(lambda n: render_email(n.subject, n.body), notifications)
+    started = time.perf_counter()
+    render_emails(notifications)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    results = {'render_to_string': _row(before), 'layouts': _row(after), 'render_emails_total_ms': round(batch_ms, 3)}
+    results['speedup'] = round(results['render_to_string']['mean_us'] / results['layouts']['mean_us'], 1)
+    return results
+
+
+def _row(timings):
+    row = _summary(timings, [])
+    del row['mean_queries']
+    row['mean_us'] = round(sum(timings) / len(timings) * 1000, 2)
+    return row
+
+
+def _print_report(results):
+    print(f"{'renderer':<18} {'messages':>9} {'mean us':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in ('render_to_string', 'layouts'):
+        row = results[name]
+        print(f"{name:<18} {row['events']:>9} {row['mean_us']:>9} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"render_emails over all messages: {results['render_emails_total_ms']}ms; "
+          f"per-message speedup {results['speedup']}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=5000, help='Messages rendered by each renderer.')
+    parser.add_argument('--json', help='Write machine-readable results to this file.')
+    args = parser.parse_args()
+
+    results = run(args.messages)
+    results['config'] = {
+        'messages': args.messages,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    _print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Mailgun sends per second against a local stand-in HTTP server: a fresh
+connection per message (a bare requests.post, as the senders used to do)
+against the shared pooled session in data_management/utils/provider_clients.py.
+
+    python -m benchmarks.bench_provider_sends [--messages 2000] [--workers 1 8]
+                                              [--latency-ms 0] [--json results.json]
+
+The stand-in speaks plain HTTP on 127.0.0.1, so it only shows the TCP
+connection cost; against the real API every fresh connection also pays a
+TLS handshake, which widens the gap. Nothing touches the database.
+"""
+import argparse
+import json
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import requests  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from benchmarks.bench_webhooks import _summary  # noqa: E402
+
+_BODY = b'{"id": "<bench@mg.example.com>", "message": "Queued. Thank you."}'
+
+
+def _stand_in(latency_ms):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; with Nagle on, a kept-alive
+        # socket waits out the client's delayed ACK between them.
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(_BODY)))
+            self.end_headers()
+            self.wfile.write(_BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _message(n):
+    return {
+        'from': settings.DEFAULT_FROM_EMAIL,
+        'to': [f'bench{n}@example.com'],
+        'subject': 'Your FutureFlower delivery is today!',
+        'text': 'Flowers should be arriving today.',
+    }
+
+
+def _fresh_connection(data):
+    return requests.post(
+        f"{settings.MAILGUN_API_BASE_URL}/{settings.MAILGUN_DOMAIN}/messages",
+        auth=("api", settings.MAILGUN_API_KEY),
+        data=data,
+        timeout=10,
+    )
+
+
+def _measure(send, messages, workers):
+    latencies = []
+
+    def one(n):
+        started = time.perf_counter()
+        send(_message(n)).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, range(messages)))
+    seconds = time.perf_counter() - started
+    row = _summary(latencies, [])
+    del row['mean_queries']
+    row['sends_per_second'] = round(messages / seconds, 1)
+    return row
+
+
+def run(messages, workers_options, latency_ms):
+    """Times both ways of sending at each worker count; returns the results dict."""
+    from data_management.utils.provider_clients import post_mailgun_message
+
+    server = _stand_in(latency_ms)
+    settings.MAILGUN_API_BASE_URL = f'http://127.0.0.1:{server.server_address[1]}/v3'
+    settings.MAILGUN_DOMAIN = settings.MAILGUN_DOMAIN or 'mg.example.com'
+    settings.MAILGUN_API_KEY = settings.MAILGUN_API_KEY or 'key-bench'
+    try:
+        results = {}
+        for workers in workers_options:
+            results[f'workers_{workers}'] = {
+                'fresh_connection': _measure(_fresh_connection, messages, workers),
+                'pooled_session': _measure(post_mailgun_message, messages, workers),
+            }
+        return results
+    finally:
+        server.shutdown()
+
+
+def _print_report(results):
+    print(f"{'workers':<12} {'client':<18} {'sends/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for workers, rows in results.items():
+        for name, row in rows.items():
+            print(f"{workers:<12} {name:<18} {row['sends_per_second']:>9} {row['p50_ms']:>8} "
+                  f"{row['p95_ms']:>8} {row['p99_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=2000, help='Sends per client and worker count.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8], help='Concurrent senders to try.')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay the stand-in adds to every response.')
+    parser.add_argument('--json', help='Write machine-readable results to this file.')
+    args = parser.parse_args()
+
+    results = run(args.messages, args.workers, args.latency_ms)
+    results['config'] = {
+        'messages': args.messages,
+        'workers': args.workers,
+        'latency_ms': args.latency_ms,
+        'pool_size': settings.PROVIDER_HTTP_POOL_SIZE,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    _print_report({key: value for key, value in results.items() if key != 'config'})
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
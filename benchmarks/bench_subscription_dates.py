@@ -0,0 +1,70 @@
+"""
+Benchmarks the subscription date engine against the loop it replaced.
+
+    python -m benchmarks.bench_subscription_dates [--orders 10000]
+
+Runs without a database or Django settings: it calls the pure functions in
+payments.utils.subscription_dates directly.
+"""
+import argparse
+import random
+import timeit
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from payments.utils.subscription_dates import next_payment_date, next_payment_dates
+
+LEAD_DAYS = 7
+FREQUENCIES = ['weekly', 'fortnightly', 'monthly', 'annually']
+_STEPS = {
+    'weekly': relativedelta(weeks=1),
+    'fortnightly': relativedelta(weeks=2),
+    'monthly': relativedelta(months=1),
+    'annually': relativedelta(years=1),
+}
+
+
+def legacy_next_payment_date(start_date, frequency, lead_days, today):
+    """The previous implementation: step one period at a time from the anchor."""
+    next_date = start_date - timedelta(days=lead_days)
+    if next_date > today:
+        return next_date
+    while next_date <= today:
+        next_date += _STEPS[frequency]
+    return next_date
+
+
+def _orders(count, max_age_days, seed=0):
+    rng = random.Random(seed)
+    today = date.today()
+    starts = [today - timedelta(days=rng.randint(0, max_age_days)) for _ in range(count)]
+    frequencies = [rng.choice(FREQUENCIES) for _ in range(count)]
+    return starts, frequencies
+
+
+def _best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    today = date.today()
+    print(f"{'max age':>10} {'legacy loop':>12} {'closed form':>12} {'numpy batch':>12}")
+    for years in (1, 5, 10):
+        starts, frequencies = _orders(args.orders, 365 * years)
+        pairs = list(zip(starts, frequencies))
+
+        legacy = _best_of(lambda: [legacy_next_payment_date(s, f, LEAD_DAYS, today) for s, f in pairs], args.repeat)
+        scalar = _best_of(lambda: [next_payment_date(s, f, LEAD_DAYS, today) for s, f in pairs], args.repeat)
+        batch = _best_of(lambda: next_payment_dates(starts, frequencies, LEAD_DAYS, today), args.repeat)
+
+        print(f"{years:>8}y {legacy * 1000:>10.1f}ms {scalar * 1000:>10.1f}ms {batch * 1000:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
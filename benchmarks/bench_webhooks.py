@@ -0,0 +1,211 @@
+"""
+Replays a realistic, signed Stripe event stream through StripeWebhookView
+and reports throughput, latency percentiles and SQL queries per event.
+
+    python -m benchmarks.bench_webhooks [--events 1000] [--duplicate-rate 0.1]
+                                        [--inbox] [--json results.json]
+
+Runs against a throwaway test database created from DJANGO_SETTINGS_MODULE
+(config.settings by default). Events are signed with a benchmark secret and
+go through real signature verification. Outbound calls are stubbed: Stripe
+retrieves, Mailgun (the shared session in provider_clients) and Twilio. The
+--json output is meant to be kept per release so throughput regressions
+show up as a diff.
+"""
+import argparse
+import contextlib
+import hashlib
+import hmac
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from unittest import mock
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+WEBHOOK_URL = '/api/payments/webhook/'
+WEBHOOK_SECRET = 'whsec_benchmark'
+
+
+def sign(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """A Stripe-Signature header for `payload`, as Stripe would send it."""
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def _event(event_id, event_type, obj):
+    return {'id': event_id, 'object': 'event', 'type': event_type, 'data': {'object': obj}}
+
+
+def build_event_stream(count, duplicate_rate, seed=0):
+    """
+    Creates the local rows a production stream would hit and returns the
+    matching events, shuffled, with a share of them re-sent as Stripe
+    retries would be. Mix: 40% first payments, 35% renewals, 15% transfers,
+    10% subscription cancellations.
+    """
+    from events.tests.factories.order_factory import OrderFactory
+    from partners.tests.factories.payout_factory import PayoutFactory
+    from payments.tests.factories.payment_factory import PaymentFactory
+
+    rng = random.Random(seed)
+    events = []
+    for n in range(count):
+        roll = rng.random()
+        if roll < 0.40:
+            order = OrderFactory(billing_mode='one_time', start_date=date.today() + timedelta(days=10))
+            payment = PaymentFactory(order=order, user=order.user, status='pending', stripe_payment_intent_id=f"pi_bench_{n}")
+            events.append(_event(f"evt_bench_{n}", 'payment_intent.succeeded', {
+                'id': payment.stripe_payment_intent_id, 'object': 'payment_intent',
+                'metadata': {'order_id': str(order.pk), 'billing_mode': 'one_time'},
+            }))
+        elif roll < 0.75:
+            order = OrderFactory(
+                billing_mode='recurring', frequency='monthly', status='active',
+                start_date=date.today() - timedelta(days=60), stripe_subscription_id=f"sub_bench_{n}",
+            )
+            events.append(_event(f"evt_bench_{n}", 'invoice.payment_succeeded', {
+                'id': f"in_bench_{n}", 'object': 'invoice', 'billing_reason': 'subscription_cycle',
+                'subscription': order.stripe_subscription_id, 'payment_intent': f"pi_renewal_{n}",
+                'amount_paid': 8000, 'created': int(time.time()) - rng.randint(0, 86400 * 30),
+            }))
+        elif roll < 0.90:
+            payout = PayoutFactory(status='processing', stripe_transfer_id=f"tr_bench_{n}")
+            events.append(_event(f"evt_bench_{n}", 'transfer.created', {
+                'id': payout.stripe_transfer_id, 'object': 'transfer', 'metadata': {'payout_id': str(payout.pk)},
+            }))
+        else:
+            order = OrderFactory(
+                billing_mode='recurring', frequency='weekly', status='active',
+                start_date=date.today() + timedelta(days=7), stripe_subscription_id=f"sub_cancel_{n}",
+            )
+            events.append(_event(f"evt_bench_{n}", 'customer.subscription.deleted', {
+                'id': order.stripe_subscription_id, 'object': 'subscription', 'status': 'canceled',
+            }))
+
+    duplicates = [rng.choice(events) for _ in range(int(len(events) * duplicate_rate))]
+    stream = events + duplicates
+    rng.shuffle(stream)
+    return stream
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summary(latencies_ms, queries):
+    ordered = sorted(latencies_ms)
+    return {
+        'events': len(ordered),
+        'p50_ms': round(_percentile(ordered, 50), 3),
+        'p95_ms': round(_percentile(ordered, 95), 3),
+        'p99_ms': round(_percentile(ordered, 99), 3),
+        'mean_queries': round(statistics.fmean(queries), 2) if queries else 0.0,
+    }
+
+
+def replay(stream):
+    """Posts every event to the webhook view; returns the results dict."""
+    client = Client()
+    latencies, queries = defaultdict(list), defaultdict(list)
+    statuses = defaultdict(int)
+
+    started = time.perf_counter()
+    for event in stream:
+        payload = json.dumps(event)
+        with CaptureQueriesContext(connection) as captured:
+            request_started = time.perf_counter()
+            response = client.post(
+                WEBHOOK_URL, data=payload, content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=sign(payload),
+            )
+            elapsed_ms = (time.perf_counter() - request_started) * 1000
+        statuses[response.status_code] += 1
+        for key in ('all', event['type']):
+            latencies[key].append(elapsed_ms)
+            queries[key].append(len(captured.captured_queries))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        'events_per_second': round(len(stream) / wall_seconds, 1) if wall_seconds else None,
+        'wall_seconds': round(wall_seconds, 3),
+        'status_codes': dict(statuses),
+        'overall': _summary(latencies['all'], queries['all']),
+        'by_type': {
+            event_type: _summary(latencies[event_type], queries[event_type])
+            for event_type in sorted(latencies) if event_type != 'all'
+        },
+    }
+
+
+def _print_report(results):
+    overall = results['overall']
+    print(f"{overall['events']} events in {results['wall_seconds']}s "
+          f"-> {results['events_per_second']} events/s (status codes: {results['status_codes']})")
+    print(f"{'event type':<32} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for event_type, row in [('all', overall)] + list(results['by_type'].items()):
+        print(f"{event_type:<32} {row['events']:>6} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+              f"{row['p99_ms']:>8} {row['mean_queries']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=1000, help='Distinct events to generate.')
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help='Share of events re-sent as retries.')
+    parser.add_argument('--inbox', action='store_true', help='Measure inbox ingestion (STRIPE_WEBHOOK_INBOX) instead.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write machine-readable results to this file.')
+    parser.add_argument('--verbose', action='store_true', help="Show the handlers' own output.")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, STRIPE_WEBHOOK_INBOX=args.inbox), \
+                mock.patch('data_management.utils.provider_clients.mailgun_session') as mailgun, \
+                mock.patch('twilio.rest.Client'), \
+                mock.patch('stripe.Invoice.retrieve', return_value={}):
+            mailgun.return_value.post.return_value.status_code = 200
+            stream = build_event_stream(args.events, args.duplicate_rate, seed=args.seed)
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            with quiet:
+                results = replay(stream)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    results['config'] = {
+        'events': args.events,
+        'duplicate_rate': args.duplicate_rate,
+        'inbox': args.inbox,
+        'seed': args.seed,
+        'database': settings.DATABASES['default']['ENGINE'],
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    _print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,15 @@ SECRET_KEY = os.environ.get("SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY", "")
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
+STRIPE_CONNECT_TIMEOUT = 5
+STRIPE_READ_TIMEOUT = 30
+STRIPE_MAX_NETWORK_RETRIES = 2
+STRIPE_HTTP_POOL_SIZE = 10
+STRIPE_SLOW_CALL_MS = 2000
+STRIPE_OBJECT_CACHE_TTL = 120
+STRIPE_WEBHOOK_INBOX = os.environ.get("STRIPE_WEBHOOK_INBOX") == 'True'
+STRIPE_WEBHOOK_MAX_ATTEMPTS = 8
+STRIPE_EVENT_LEDGER_CACHE_SIZE = 10000
 
 SITE_URL = os.environ.get("SITE_URL")
 HASHING_SALT = os.environ.get("HASHING_SALT")
@@ -155,6 +164,7 @@ AUTH_USER_MODEL = "users.User"
 AUTH_COOKIE = 'access_token'
 AUTH_COOKIE_REFRESH = 'refresh_token'
 GUEST_CHECKOUT_LIFETIME = timedelta(days=7)
+GUEST_CHECKOUT_CACHE_TIMEOUT = 300
 MAGIC_LINK_LIFETIME = timedelta(minutes=30)
 
 REST_FRAMEWORK = {
@@ -189,6 +199,10 @@ SIMPLE_JWT = {
 MAILGUN_API_KEY = os.environ.get("MAILGUN_API_KEY")
 MAILGUN_DOMAIN = os.environ.get("MAILGUN_DOMAIN")
 DEFAULT_FROM_EMAIL = "FutureFlower <postmaster@mail.futureflower.app>"
+MAILGUN_API_BASE_URL = "https://api.mailgun.net/v3"
+MAILGUN_TIMEOUT = 10
+# Recipients per Mailgun batch send (Mailgun's limit is 1,000).
+MAILGUN_BATCH_SIZE = 1000
 
 TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
 
@@ -197,3 +211,19 @@ MARKETING_SERVER_URL = os.environ.get("MARKETING_SERVER_URL", "https://www.futur
 TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.environ.get("TWILIO_PHONE_NUMBER")
 TWILIO_MESSAGING_SERVICE_SID = os.environ.get("TWILIO_MESSAGING_SERVICE_SID")
+TWILIO_TIMEOUT = 10
+
+# Shared Mailgun and Twilio sessions (data_management/utils/provider_clients.py).
+PROVIDER_HTTP_POOL_SIZE = 10
+PROVIDER_CONNECT_RETRIES = 2
+
+# send_notifications: concurrent sends and starts per second, per channel.
+NOTIFICATION_EMAIL_WORKERS = 8
+NOTIFICATION_EMAIL_RATE = 20
+NOTIFICATION_SMS_WORKERS = 2
+NOTIFICATION_SMS_RATE = 1
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_LEASE_SECONDS = 300
+NOTIFICATION_MAX_ATTEMPTS = 6
+NOTIFICATION_RETRY_BASE_SECONDS = 60
+NOTIFICATION_RETRY_MAX_SECONDS = 6 * 60 * 60
@@ -8,5 +8,5 @@ admin.site.register(TermsAndConditions)
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['recipient_type', 'channel', 'status', 'scheduled_for', 'related_event']
+    list_display = ['recipient_type', 'channel', 'status', 'scheduled_for', 'attempts', 'next_attempt_at', 'related_event']
     list_filter = ['status', 'channel', 'recipient_type']
@@ -1,20 +1,60 @@
 from datetime import date
 from django.core.management.base import BaseCommand
-from data_management.models import Notification
-from data_management.utils.send_notification import send_notification
+from data_management.utils.notification_dispatcher import NotificationDispatcher
 
 
 class Command(BaseCommand):
-    help = 'Sends all pending notifications scheduled for today or earlier.'
+    help = 'Sends all pending notifications scheduled for today or earlier, and retries failed ones that are due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email-workers',
+            type=int,
+            default=None,
+            help='Emails sent concurrently (defaults to NOTIFICATION_EMAIL_WORKERS).',
+        )
+        parser.add_argument(
+            '--email-rate',
+            type=float,
+            default=None,
+            help='Emails started per second, 0 for no limit (defaults to NOTIFICATION_EMAIL_RATE).',
+        )
+        parser.add_argument(
+            '--sms-workers',
+            type=int,
+            default=None,
+            help='SMS sent concurrently (defaults to NOTIFICATION_SMS_WORKERS).',
+        )
+        parser.add_argument(
+            '--sms-rate',
+            type=float,
+            default=None,
+            help='SMS started per second, 0 for no limit (defaults to NOTIFICATION_SMS_RATE).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Notifications claimed, and their statuses written back, together (defaults to NOTIFICATION_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=None,
+            help='How long a claimed batch is reserved for this run (defaults to NOTIFICATION_LEASE_SECONDS).',
+        )
 
     def handle(self, *args, **options):
-        today = date.today()
-        due = Notification.objects.filter(status='pending', scheduled_for__lte=today)
-        sent, failed = 0, 0
-        for notification in due:
-            send_notification(notification)
-            if notification.status == 'sent':
-                sent += 1
-            else:
-                failed += 1
-        self.stdout.write(f'Done. Sent: {sent}, Failed: {failed}')
+        dispatcher = NotificationDispatcher(
+            email_workers=options['email_workers'],
+            email_rate=options['email_rate'],
+            sms_workers=options['sms_workers'],
+            sms_rate=options['sms_rate'],
+            batch_size=options['batch_size'],
+            lease_seconds=options['lease_seconds'],
+        )
+        result = dispatcher.dispatch_due(today=date.today())
+        self.stdout.write(
+            f"Done. Sent: {result['sent']}, Failed: {result['failed']}, Dead: {result['dead']} "
+            f"in {result['seconds']}s ({result['per_second']}/s, throttled: {result['throttled']})"
+        )
@@ -0,0 +1,20 @@
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0005_notification_retry'),
+        ('events', '0007_checkout_session_expires_at_index'),
+        ('partners', '0004_discount_email_usage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['status', 'scheduled_for'], name='data_manage_status_201855_idx'),
+        ),
+    ]
@@ -16,8 +16,12 @@ class Notification(models.Model):
         ('pending', 'Pending'),
         ('sent', 'Sent'),
         ('failed', 'Failed'),
+        ('dead', 'Dead'),
         ('cancelled', 'Cancelled'),
     )
+    # Not yet sent, and still to be sent unless cancelled: 'failed' rows
+    # are retried at next_attempt_at; 'dead' ones are not.
+    OPEN_STATUSES = ('pending', 'failed')
 
     recipient_type = models.CharField(max_length=20, choices=RECIPIENT_TYPE_CHOICES)
     recipient_partner = models.ForeignKey(
@@ -42,6 +46,14 @@ class Notification(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     sent_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error_class = models.CharField(max_length=100, blank=True)
+
+    # Set while a send_notifications worker holds the row (see
+    # notification_dispatcher.claim_due). An expired lease can be reclaimed.
+    claimed_by = models.CharField(max_length=100, null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
 
     related_event = models.ForeignKey(
         'events.Event',
@@ -54,3 +66,7 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['scheduled_for']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
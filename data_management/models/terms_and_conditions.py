@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 class TermsAndConditions(models.Model):
@@ -21,5 +21,21 @@ class TermsAndConditions(models.Model):
         ordering = ['-published_at']
         unique_together = [('terms_type', 'version')]
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._publish()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._publish()
+        return result
+
+    @staticmethod
+    def _publish():
+        """Makes every process see the change (utils/terms_registry.py); again on commit, once it is visible."""
+        from data_management.utils import terms_registry
+        terms_registry.bump_version()
+        transaction.on_commit(terms_registry.bump_version)
+
     def __str__(self):
         return f"{self.get_terms_type_display()} Terms and Conditions v{self.version}"
@@ -0,0 +1,51 @@
+import pytest
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from data_management.tests.factories.notification_factory import NotificationFactory
+
+
+@pytest.mark.django_db
+class TestSendNotificationsCommand:
+
+    def test_sends_due_notifications_only(self, mocker, settings):
+        settings.MAILGUN_BATCH_SIZE = 1
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        due = NotificationFactory(scheduled_for=date.today())
+        overdue = NotificationFactory(scheduled_for=date.today() - timedelta(days=2))
+        future = NotificationFactory(scheduled_for=date.today() + timedelta(days=1))
+        NotificationFactory(scheduled_for=date.today(), status='sent')
+
+        out = StringIO()
+        call_command('send_notifications', '--email-rate', '0', stdout=out)
+
+        assert {call.args[0].pk for call in deliver.call_args_list} == {due.pk, overdue.pk}
+        future.refresh_from_db()
+        assert future.status == 'pending'
+        assert 'Done. Sent: 2, Failed: 0' in out.getvalue()
+
+    def test_reports_failures_and_throughput(self, mocker, settings):
+        settings.MAILGUN_BATCH_SIZE = 1
+        mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=ValueError('No email address'),
+        )
+        NotificationFactory(scheduled_for=date.today())
+
+        out = StringIO()
+        call_command('send_notifications', '--email-rate', '0', stdout=out)
+
+        output = out.getvalue()
+        assert 'Done. Sent: 0, Failed: 1, Dead: 1' in output
+        assert '/s, throttled: 0)' in output
+
+    def test_due_emails_are_sent_in_one_mailgun_batch(self, mocker):
+        batch = mocker.patch('data_management.utils.notification_dispatcher.deliver_email_batch')
+        NotificationFactory.create_batch(3, scheduled_for=date.today())
+
+        out = StringIO()
+        call_command('send_notifications', '--email-rate', '0', stdout=out)
+
+        batch.assert_called_once()
+        assert len(batch.call_args.args[0]) == 3
+        assert 'Done. Sent: 3, Failed: 0' in out.getvalue()
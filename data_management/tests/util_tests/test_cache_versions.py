@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+from data_management.utils import cache_versions
+
+
+class TestCacheVersions:
+
+    def test_current_is_stable_until_bumped(self):
+        first = cache_versions.current('test_versions_stable')
+
+        assert cache_versions.current('test_versions_stable') == first
+        cache_versions.bump('test_versions_stable')
+        assert cache_versions.current('test_versions_stable') == first + 1
+
+    def test_missing_key_restarts_from_a_random_number(self, mocker):
+        mocker.patch('data_management.utils.cache_versions.random.getrandbits', side_effect=[1000, 5000])
+        cache_versions.current('test_versions_evicted')
+
+        cache.delete('test_versions_evicted')
+
+        assert cache_versions.current('test_versions_evicted') == 5000
+
+    def test_bumping_a_missing_key_seeds_it(self, mocker):
+        mocker.patch('data_management.utils.cache_versions.random.getrandbits', return_value=42)
+
+        cache_versions.bump('test_versions_never_read')
+
+        assert cache.get('test_versions_never_read') == 42
+
+    def test_bump_restarts_the_timeout(self, mocker):
+        cache_versions.current('test_versions_timeout', timeout=60)
+        touch = mocker.spy(cache, 'touch')
+
+        cache_versions.bump('test_versions_timeout', timeout=60)
+
+        touch.assert_called_once_with('test_versions_timeout', 60)
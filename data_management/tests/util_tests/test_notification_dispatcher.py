@@ -0,0 +1,493 @@
+import json
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+import requests
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from data_management.models import Notification
+from data_management.tests.factories.notification_factory import NotificationFactory
+from data_management.utils.notification_dispatcher import (
+    NotificationDispatcher,
+    ProviderBackoff,
+    RateLimiter,
+    _retry_after,
+    claim_due,
+    renew_leases,
+)
+from data_management.utils.send_notification import email_batches, is_transient, retry_delay
+from partners.tests.factories.partner_factory import PartnerFactory
+
+
+def _throttled_error(retry_after=None):
+    response = requests.Response()
+    response.status_code = 429
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return requests.HTTPError('429 Too Many Requests', response=response)
+
+
+def _dispatcher(**kwargs):
+    # One Mailgun call per email unless a test is about batching.
+    options = {'email_rate': 0, 'sms_rate': 0, 'mailgun_batch_size': 1}
+    options.update(kwargs)
+    dispatcher = NotificationDispatcher(**options)
+    for channel in dispatcher.channels.values():
+        channel.backoff.base = 0.01
+    return dispatcher
+
+
+@pytest.mark.django_db
+class TestNotificationDispatcher:
+
+    def test_sends_every_notification_and_writes_statuses(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        notifications = NotificationFactory.create_batch(5)
+
+        result = _dispatcher(batch_size=2).dispatch(notifications)
+
+        assert deliver.call_count == 5
+        assert result['sent'] == 5
+        assert result['failed'] == 0
+        for notification in notifications:
+            notification.refresh_from_db()
+            assert notification.status == 'sent'
+            assert notification.sent_at is not None
+
+    def test_failure_is_recorded_without_stopping_the_batch(self, mocker):
+        notifications = NotificationFactory.create_batch(3)
+        broken = notifications[1]
+
+        def deliver(notification, email, phone):
+            if notification.pk == broken.pk:
+                raise ValueError('Mailgun said no')
+
+        mocker.patch('data_management.utils.notification_dispatcher.deliver', side_effect=deliver)
+
+        result = _dispatcher().dispatch(notifications)
+
+        assert (result['sent'], result['failed'], result['dead']) == (2, 1, 1)
+        broken.refresh_from_db()
+        assert broken.status == 'dead'
+        assert broken.error_message == 'Mailgun said no'
+
+    def test_sends_run_concurrently_up_to_the_worker_count(self, mocker):
+        barrier = threading.Barrier(3, timeout=5)
+        mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=lambda *args: barrier.wait(),
+        )
+        notifications = NotificationFactory.create_batch(3)
+
+        result = _dispatcher(email_workers=3).dispatch(notifications)
+
+        assert result['sent'] == 3
+
+    def test_throttled_send_is_retried_after_backing_off(self, mocker):
+        deliver = mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=[_throttled_error(), None],
+        )
+        notification = NotificationFactory()
+
+        result = _dispatcher().dispatch([notification])
+
+        assert deliver.call_count == 2
+        assert result['sent'] == 1
+        assert result['throttled'] == 1
+
+    def test_send_fails_once_throttle_retries_are_exhausted(self, mocker):
+        deliver = mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=_throttled_error(),
+        )
+        notification = NotificationFactory()
+
+        result = _dispatcher(max_throttle_retries=2).dispatch([notification])
+
+        assert deliver.call_count == 3
+        assert result['failed'] == 1
+        notification.refresh_from_db()
+        assert notification.status == 'failed'
+        assert notification.next_attempt_at is not None
+
+    def test_unknown_channel_fails_without_sending(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        notification = NotificationFactory(channel='fax')
+
+        result = _dispatcher().dispatch([notification])
+
+        deliver.assert_not_called()
+        assert result['failed'] == 1
+        notification.refresh_from_db()
+        assert "Unknown channel 'fax'" in notification.error_message
+
+
+@pytest.mark.django_db
+class TestNotificationRetries:
+
+    def test_transient_failure_schedules_a_retry(self, mocker):
+        mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=requests.ConnectionError('Connection reset'),
+        )
+        notification = NotificationFactory()
+
+        result = _dispatcher().dispatch([notification])
+
+        assert (result['failed'], result['dead']) == (1, 0)
+        notification.refresh_from_db()
+        assert notification.status == 'failed'
+        assert notification.attempts == 1
+        assert notification.last_error_class == 'ConnectionError'
+        assert notification.next_attempt_at > timezone.now()
+
+    def test_last_attempt_dead_letters(self, mocker, settings):
+        settings.NOTIFICATION_MAX_ATTEMPTS = 3
+        mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=requests.ConnectionError('Connection reset'),
+        )
+        notification = NotificationFactory(status='failed', attempts=2, next_attempt_at=timezone.now())
+
+        result = _dispatcher().dispatch([notification])
+
+        assert result['dead'] == 1
+        notification.refresh_from_db()
+        assert notification.status == 'dead'
+        assert notification.attempts == 3
+        assert notification.next_attempt_at is None
+
+    def test_due_retries_are_claimed_and_future_ones_are_not(self):
+        due = NotificationFactory(status='failed', next_attempt_at=timezone.now() - timedelta(seconds=1))
+        NotificationFactory(status='failed', next_attempt_at=timezone.now() + timedelta(minutes=5))
+        NotificationFactory(status='failed', next_attempt_at=None)
+        NotificationFactory(status='dead', scheduled_for=date.today())
+
+        claimed = claim_due('worker-a', limit=10, lease_seconds=60)
+
+        assert [n.pk for n in claimed] == [due.pk]
+
+    def test_retry_that_succeeds_is_sent(self, mocker):
+        mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        notification = NotificationFactory(
+            status='failed', attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1),
+            error_message='Timed out', last_error_class='Timeout',
+        )
+
+        _dispatcher().dispatch_due()
+
+        notification.refresh_from_db()
+        assert notification.status == 'sent'
+        assert notification.attempts == 2
+        assert notification.next_attempt_at is None
+
+    @pytest.mark.parametrize('status_code, transient', [(500, True), (503, True), (429, True), (408, True), (400, False), (401, False)])
+    def test_http_errors_are_transient_only_when_retrying_can_help(self, status_code, transient):
+        response = requests.Response()
+        response.status_code = status_code
+        assert is_transient(requests.HTTPError(response=response)) is transient
+
+    def test_twilio_and_address_errors(self):
+        twilio_invalid_number = Exception('Invalid To number')
+        twilio_invalid_number.status = 400
+        assert not is_transient(twilio_invalid_number)
+        assert not is_transient(ValueError('No phone number for notification 1'))
+        assert is_transient(requests.Timeout())
+
+    def test_retry_delay_backs_off_exponentially_with_jitter(self, settings):
+        settings.NOTIFICATION_RETRY_BASE_SECONDS = 60
+        settings.NOTIFICATION_RETRY_MAX_SECONDS = 600
+
+        assert 48 <= retry_delay(1).total_seconds() <= 72
+        assert 192 <= retry_delay(3).total_seconds() <= 288
+        assert retry_delay(10).total_seconds() <= 720
+
+
+@pytest.mark.django_db
+class TestMailgunBatching:
+
+    def _response(self, status_code=200):
+        response = requests.Response()
+        response.status_code = status_code
+        return response
+
+    def test_emails_due_together_share_one_mailgun_call(self, mocker):
+        post = mocker.patch('data_management.utils.send_notification.post_mailgun_message', return_value=self._response())
+        notifications = NotificationFactory.create_batch(4)
+
+        result = _dispatcher(mailgun_batch_size=1000).dispatch(notifications)
+
+        assert post.call_count == 1
+        data = post.call_args.args[0]
+        variables = json.loads(data['recipient-variables'])
+        assert data['to'] == [n.recipient_user.email for n in notifications]
+        assert set(variables) == set(data['to'])
+        assert data['subject'] == '%recipient.subject%'
+        assert '%recipient.body_html%' in data['html']
+        assert result['sent'] == 4
+
+    def test_recipient_variables_carry_each_escaped_body(self, mocker):
+        post = mocker.patch('data_management.utils.send_notification.post_mailgun_message', return_value=self._response())
+        first, second = NotificationFactory.create_batch(2)
+        first.body = 'Roses & <tulips>'
+
+        _dispatcher(mailgun_batch_size=1000).dispatch([first, second])
+
+        variables = json.loads(post.call_args.args[0]['recipient-variables'])
+        assert variables[first.recipient_user.email]['body_html'] == 'Roses &amp; &lt;tulips&gt;'
+        assert variables[first.recipient_user.email]['subject'] == first.subject
+
+    def test_batches_respect_the_size_limit(self, mocker):
+        post = mocker.patch('data_management.utils.send_notification.post_mailgun_message', return_value=self._response())
+        NotificationFactory.create_batch(5)
+
+        _dispatcher(mailgun_batch_size=2).dispatch(Notification.objects.all())
+
+        assert sorted(len(call.args[0]['to']) for call in post.call_args_list) == [1, 2, 2]
+
+    def test_rejected_batch_falls_back_to_one_call_per_recipient(self, mocker):
+        good, bad = NotificationFactory.create_batch(2)
+
+        def post(data):
+            rejected = len(data['to']) > 1 or data['to'] == [bad.recipient_user.email]
+            return self._response(400 if rejected else 200)
+
+        mocker.patch('data_management.utils.send_notification.post_mailgun_message', side_effect=post)
+
+        result = _dispatcher(mailgun_batch_size=1000).dispatch([good, bad])
+
+        assert (result['sent'], result['failed']) == (1, 1)
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        assert (good.status, good.attempts) == ('sent', 1)
+        assert (bad.status, bad.attempts) == ('dead', 1)
+
+    def test_email_batches_never_repeat_an_address(self):
+        a, b, c = object(), object(), object()
+
+        batches = email_batches([(a, 'x@example.com'), (b, 'X@example.com '), (c, 'y@example.com')], 10)
+
+        assert batches == [[(a, 'x@example.com'), (c, 'y@example.com')], [(b, 'X@example.com ')]]
+
+
+@pytest.mark.django_db
+class TestNotificationLeases:
+
+    def _due(self, count=1, **kwargs):
+        return NotificationFactory.create_batch(count, scheduled_for=date.today(), **kwargs)
+
+    def test_claim_leases_due_rows(self):
+        due = self._due(2)
+        NotificationFactory(scheduled_for=date.today() + timedelta(days=1))
+        NotificationFactory(scheduled_for=date.today(), status='sent')
+
+        claimed = claim_due('worker-a', limit=10, lease_seconds=60)
+
+        assert {n.pk for n in claimed} == {n.pk for n in due}
+        for notification in claimed:
+            assert notification.claimed_by == 'worker-a'
+            assert notification.lease_expires_at > timezone.now()
+
+    def test_workers_never_claim_the_same_row(self):
+        self._due(5)
+
+        first = claim_due('worker-a', limit=3, lease_seconds=60)
+        second = claim_due('worker-b', limit=10, lease_seconds=60)
+
+        assert len(first) == 3
+        assert len(second) == 2
+        assert not {n.pk for n in first} & {n.pk for n in second}
+        assert claim_due('worker-c', limit=10, lease_seconds=60) == []
+
+    def test_expired_lease_is_reclaimed(self):
+        notification, = self._due(claimed_by='crashed', lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        claimed = claim_due('worker-a', limit=10, lease_seconds=60)
+
+        assert [n.pk for n in claimed] == [notification.pk]
+        assert claimed[0].claimed_by == 'worker-a'
+
+    def test_renew_only_extends_our_own_leases(self):
+        ours, theirs = self._due(2)
+        claim_due('worker-a', limit=2, lease_seconds=60)
+        Notification.objects.filter(pk=theirs.pk).update(claimed_by='worker-b')
+
+        renewed = renew_leases('worker-a', [ours.pk, theirs.pk], lease_seconds=600)
+
+        assert renewed == 1
+        ours.refresh_from_db()
+        assert ours.lease_expires_at > timezone.now() + timedelta(seconds=500)
+
+    def test_dispatch_due_sends_and_releases_the_lease(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        notifications = self._due(3)
+
+        result = _dispatcher(batch_size=2).dispatch_due()
+
+        assert deliver.call_count == 3
+        assert result['sent'] == 3
+        for notification in notifications:
+            notification.refresh_from_db()
+            assert notification.status == 'sent'
+            assert notification.claimed_by is None
+            assert notification.lease_expires_at is None
+
+    def test_dispatch_due_skips_rows_leased_by_another_worker(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        self._due(claimed_by='worker-b', lease_expires_at=timezone.now() + timedelta(minutes=5))
+
+        result = _dispatcher().dispatch_due()
+
+        deliver.assert_not_called()
+        assert result['sent'] == 0
+
+    def test_slow_batch_has_its_lease_renewed(self, mocker):
+        mocker.patch('data_management.utils.notification_dispatcher.deliver', side_effect=lambda *args: time.sleep(0.3))
+        renew = mocker.patch('data_management.utils.notification_dispatcher.renew_leases')
+        self._due()
+
+        result = _dispatcher(lease_seconds=0.3).dispatch_due()
+
+        assert result['sent'] == 1
+        assert renew.called
+
+    def test_status_is_not_written_over_a_lost_lease(self, mocker):
+        mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        notification, = self._due()
+        dispatcher = _dispatcher()
+        wait = dispatcher._wait
+
+        def wait_then_lose_the_lease(futures, batch, leased):
+            wait(futures, batch, leased)
+            Notification.objects.filter(pk=notification.pk).update(claimed_by='worker-b')
+
+        mocker.patch.object(dispatcher, '_wait', side_effect=wait_then_lose_the_lease)
+
+        dispatcher.dispatch_due()
+
+        notification.refresh_from_db()
+        assert notification.status == 'pending'
+        assert notification.claimed_by == 'worker-b'
+
+    def test_notification_cancelled_during_its_send_stays_cancelled(self, mocker):
+        mocker.patch(
+            'data_management.utils.notification_dispatcher.deliver',
+            side_effect=requests.ConnectionError('Mailgun unreachable'),
+        )
+        notification, = self._due()
+        dispatcher = _dispatcher()
+        wait = dispatcher._wait
+
+        def wait_then_cancel(futures, batch, leased):
+            wait(futures, batch, leased)
+            # As cancel_orders or cancel_event_notifications would, from another request.
+            Notification.objects.filter(pk=notification.pk).update(status='cancelled')
+
+        mocker.patch.object(dispatcher, '_wait', side_effect=wait_then_cancel)
+
+        result = dispatcher.dispatch_due()
+
+        assert result['failed'] == 0
+        notification.refresh_from_db()
+        assert notification.status == 'cancelled'
+        assert notification.attempts == 0
+        assert notification.next_attempt_at is None
+
+
+@pytest.mark.django_db
+class TestDueNotificationQueries:
+
+    def _due_for_every_recipient_type(self, count):
+        today = date.today()
+        for _ in range(count):
+            NotificationFactory(scheduled_for=today)
+            NotificationFactory(scheduled_for=today, recipient_type='partner', recipient_user=None,
+                                recipient_partner=PartnerFactory())
+            NotificationFactory(scheduled_for=today, recipient_type='admin', recipient_user=None)
+
+    def _queries(self, run):
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        return len(queries)
+
+    def test_each_claimed_batch_costs_the_same_queries_whatever_its_size(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        self._due_for_every_recipient_type(4)
+
+        one_batch = self._queries(lambda: _dispatcher(batch_size=12).dispatch_due())
+        Notification.objects.update(status='pending', attempts=0)
+        four_batches = self._queries(lambda: _dispatcher(batch_size=3).dispatch_due())
+        idle = self._queries(lambda: _dispatcher().dispatch_due())
+
+        assert deliver.call_count == 24
+        assert four_batches - idle == 4 * (one_batch - idle)
+
+    def test_claimed_partners_come_with_their_user(self, mocker):
+        deliver = mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        partner = PartnerFactory(phone='+61400000000')
+        NotificationFactory(scheduled_for=date.today(), recipient_type='partner', recipient_user=None,
+                            recipient_partner=partner)
+
+        _dispatcher().dispatch_due()
+
+        notification, email, phone = deliver.call_args.args
+        assert (email, phone) == (partner.user.email, '+61400000000')
+
+    def test_queryset_is_streamed_in_batches_with_one_select(self, mocker):
+        mocker.patch('data_management.utils.notification_dispatcher.deliver')
+        iterator = mocker.spy(QuerySet, 'iterator')
+        self._due_for_every_recipient_type(3)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = _dispatcher(batch_size=4).dispatch(Notification.objects.filter(status='pending'))
+
+        assert result['sent'] == 9
+        assert iterator.call_args.kwargs == {'chunk_size': 4}
+        assert len([q for q in queries if q['sql'].startswith('SELECT')]) == 1
+
+
+class TestThrottling:
+
+    def test_retry_after_reads_the_mailgun_header(self):
+        assert _retry_after(_throttled_error(7)) == 7.0
+
+    def test_retry_after_recognises_twilio_429(self):
+        error = Exception('Too many requests')
+        error.status = 429
+        assert _retry_after(error) == 0.0
+
+    def test_other_errors_are_not_throttling(self):
+        response = requests.Response()
+        response.status_code = 500
+        assert _retry_after(requests.HTTPError(response=response)) is None
+        assert _retry_after(ValueError('bad address')) is None
+
+    def test_backoff_doubles_and_resets(self):
+        backoff = ProviderBackoff(base=1, cap=60)
+
+        assert [backoff.throttled() for _ in range(3)] == [1, 2, 4]
+        backoff.recovered()
+        assert backoff.throttled() == 1
+
+    def test_backoff_honours_retry_after_and_cap(self):
+        backoff = ProviderBackoff(base=1, cap=30)
+
+        assert backoff.throttled(retry_after=10) == 10
+        assert backoff.throttled(retry_after=120) == 30
+
+    def test_rate_limiter_spaces_starts(self, mocker):
+        clock = mocker.patch('data_management.utils.notification_dispatcher.time')
+        clock.monotonic.return_value = 100.0
+        limiter = RateLimiter(rate=4)
+
+        limiter.acquire()
+        limiter.acquire()
+        limiter.acquire()
+
+        assert [call.args[0] for call in clock.sleep.call_args_list] == [0.25, 0.5]
@@ -0,0 +1,53 @@
+import pytest
+from django.template.loader import render_to_string
+
+from data_management.models import Notification
+from data_management.utils import notification_rendering
+from data_management.utils.notification_rendering import (
+    EMAIL_HTML_TEMPLATE,
+    EMAIL_TEXT_TEMPLATE,
+    render_email,
+    render_email_placeholders,
+    render_emails,
+)
+
+
+def _reference(subject, body):
+    context = {'subject': subject, 'body': body}
+    return render_to_string(EMAIL_HTML_TEMPLATE, context), render_to_string(EMAIL_TEXT_TEMPLATE, context)
+
+
+class TestNotificationRendering:
+
+    @pytest.mark.parametrize('subject, body', [
+        ('Delivery day', 'Flowers are on their way.'),
+        ('Roses & "tulips"', "Recipient: O'Brien\n<b>Budget</b>: $120"),
+        (None, 'No subject given.'),
+        ('Liefde 💐', 'Zeile eins\nZeile zwei — ümlaut'),
+        ('', ''),
+    ])
+    def test_matches_render_to_string(self, subject, body):
+        assert render_email(subject, body) == _reference(subject, body)
+
+    def test_renders_a_batch_in_order(self):
+        notifications = [Notification(subject=f'Subject {n}', body=f'Body {n}') for n in range(3)]
+
+        rendered = render_emails(notifications)
+
+        assert rendered == [_reference(f'Subject {n}', f'Body {n}') for n in range(3)]
+
+    def test_placeholders_are_inserted_unescaped(self):
+        html, text = render_email_placeholders({'subject': '%recipient.subject_html%', 'body': '<%b%>'})
+
+        assert '%recipient.subject_html%' in html
+        assert '<%b%>' in html
+        assert '<%b%>' in text
+
+    def test_templates_are_rendered_once_per_process(self, mocker):
+        notification_rendering._layout.cache_clear()
+        spy = mocker.spy(notification_rendering, 'render_to_string')
+
+        for n in range(5):
+            render_email(f'Subject {n}', 'Body')
+
+        assert spy.call_count == 2
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_management.utils import provider_clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(provider_clients, '_mailgun_session', None)
+    monkeypatch.setattr(provider_clients, '_twilio', {'credentials': None, 'client': None})
+
+
+class TestMailgunSession:
+
+    def test_one_session_is_shared_across_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            sessions = list(pool.map(lambda _: provider_clients.mailgun_session(), range(32)))
+
+        assert len({id(session) for session in sessions}) == 1
+
+    def test_session_pools_connections_and_only_retries_connecting(self, settings):
+        settings.PROVIDER_HTTP_POOL_SIZE = 12
+        settings.PROVIDER_CONNECT_RETRIES = 3
+
+        adapter = provider_clients.mailgun_session().get_adapter('https://api.mailgun.net/v3')
+
+        assert adapter._pool_maxsize == 12
+        assert adapter.max_retries.connect == 3
+        assert adapter.max_retries.read == 0
+        assert adapter.max_retries.status == 0
+
+    def test_post_mailgun_message(self, mocker, settings):
+        settings.MAILGUN_API_BASE_URL = 'https://api.mailgun.net/v3'
+        settings.MAILGUN_DOMAIN = 'mg.example.com'
+        settings.MAILGUN_API_KEY = 'key-test'
+        settings.MAILGUN_TIMEOUT = 7
+        post = mocker.patch.object(provider_clients.mailgun_session(), 'post')
+
+        provider_clients.post_mailgun_message({'to': ['a@example.com']})
+
+        post.assert_called_once_with(
+            'https://api.mailgun.net/v3/mg.example.com/messages',
+            auth=('api', 'key-test'),
+            data={'to': ['a@example.com']},
+            timeout=7,
+        )
+
+
+class TestTwilioClient:
+
+    def test_client_is_created_once(self, mocker, settings):
+        client_class = mocker.patch('twilio.rest.Client')
+        settings.TWILIO_ACCOUNT_SID = 'ACtest'
+        settings.TWILIO_AUTH_TOKEN = 'authtest'
+
+        for _ in range(3):
+            provider_clients.twilio_client()
+
+        client_class.assert_called_once()
+
+    def test_new_credentials_get_a_new_client(self, mocker, settings):
+        client_class = mocker.patch('twilio.rest.Client')
+        settings.TWILIO_ACCOUNT_SID = 'ACtest'
+        settings.TWILIO_AUTH_TOKEN = 'authtest'
+        provider_clients.twilio_client()
+
+        settings.TWILIO_AUTH_TOKEN = 'rotated'
+        provider_clients.twilio_client()
+
+        assert [call.args for call in client_class.call_args_list] == [('ACtest', 'authtest'), ('ACtest', 'rotated')]
+
+    def test_client_uses_a_pooled_session(self, mocker, settings):
+        client_class = mocker.patch('twilio.rest.Client')
+        settings.TWILIO_ACCOUNT_SID = 'ACtest'
+        settings.TWILIO_AUTH_TOKEN = 'authtest'
+        settings.TWILIO_TIMEOUT = 9
+
+        provider_clients.twilio_client()
+
+        http_client = client_class.call_args.kwargs['http_client']
+        assert http_client.timeout == 9
+        assert http_client.session.get_adapter('https://api.twilio.com').max_retries.read == 0
+
+    def test_send_sms_uses_the_messaging_service(self, mocker, settings):
+        settings.TWILIO_MESSAGING_SERVICE_SID = 'MGtest'
+        client = mocker.patch.object(provider_clients, 'twilio_client').return_value
+
+        provider_clients.send_sms('Delivery today', '+61400000000')
+
+        client.messages.create.assert_called_once_with(
+            body='Delivery today', messaging_service_sid='MGtest', to='+61400000000',
+        )
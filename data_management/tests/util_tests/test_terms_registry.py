@@ -0,0 +1,71 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from data_management.models import TermsAcceptance
+from data_management.tests.factories.terms_and_conditions_factory import TermsAndConditionsFactory
+from data_management.utils import terms_registry
+from data_management.utils.generation_utils.terms_generator import TermsUpdateOrchestrator
+from users.tests.factories.user_factory import UserFactory
+
+
+@pytest.mark.django_db
+class TestTermsRegistry:
+
+    def test_latest_is_the_most_recently_published_of_its_type(self):
+        TermsAndConditionsFactory(terms_type='customer', version='1.0', published_at=timezone.now() - timedelta(days=5))
+        newest = TermsAndConditionsFactory(terms_type='customer', version='2.0', published_at=timezone.now())
+        TermsAndConditionsFactory(terms_type='florist', version='9.0', published_at=timezone.now())
+
+        latest = terms_registry.latest('customer')
+
+        assert (latest.id, latest.version) == (newest.pk, '2.0')
+        assert terms_registry.latest('affiliate') is None
+
+    def test_lookups_are_served_from_the_process(self, django_assert_num_queries):
+        TermsAndConditionsFactory(terms_type='customer')
+        terms_registry.latest('customer')
+
+        with django_assert_num_queries(0):
+            terms_registry.latest('customer')
+            terms_registry.latest('florist')
+
+    def test_publishing_through_the_orchestrator_is_seen_straight_away(self, tmp_path):
+        TermsAndConditionsFactory(terms_type='customer', version='1.0', published_at=timezone.now() - timedelta(days=1))
+        assert terms_registry.latest('customer').version == '1.0'
+        (tmp_path / 'customer_terms_v2.0.html').write_text('<p>New terms</p>', encoding='utf-8')
+        orchestrator = TermsUpdateOrchestrator(command=MagicMock())
+        orchestrator.data_dir = str(tmp_path)
+
+        orchestrator.run()
+
+        assert terms_registry.latest('customer').version == '2.0'
+
+    def test_a_cleared_cache_does_not_resurrect_a_stale_registry(self):
+        terms = TermsAndConditionsFactory(terms_type='customer')
+        terms_registry.latest('customer')
+        cache.clear()
+        terms.delete()
+        cache.clear()
+
+        assert terms_registry.latest('customer') is None
+
+    def test_has_accepted_latest_is_one_query(self, django_assert_num_queries):
+        terms = TermsAndConditionsFactory(terms_type='customer')
+        user = UserFactory()
+        TermsAcceptance.objects.create(user=user, terms=terms)
+        terms_registry.latest('customer')
+
+        with django_assert_num_queries(1):
+            assert terms_registry.has_accepted_latest(user.pk, 'customer')
+
+    def test_accepting_older_terms_does_not_count(self):
+        old = TermsAndConditionsFactory(terms_type='customer', version='1.0', published_at=timezone.now() - timedelta(days=1))
+        TermsAndConditionsFactory(terms_type='customer', version='2.0', published_at=timezone.now())
+        user = UserFactory()
+        TermsAcceptance.objects.create(user=user, terms=old)
+
+        assert not terms_registry.has_accepted_latest(user.pk, 'customer')
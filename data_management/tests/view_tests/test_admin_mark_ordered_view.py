@@ -54,6 +54,22 @@ class TestAdminMarkOrderedView:
         notif.refresh_from_db()
         assert notif.status == 'cancelled'
 
+    def test_cancels_notifications_awaiting_retry(self):
+        plan = OrderFactory(billing_mode='one_time', )
+        event = EventFactory(status='scheduled', order=plan)
+        notif = Notification.objects.create(
+            recipient_type='admin',
+            channel='sms',
+            body='Reminder',
+            scheduled_for=event.delivery_date,
+            status='failed',
+            next_attempt_at=timezone.now(),
+            related_event=event,
+        )
+        self.client.post(self._url(event.pk), self._payload(), format='json')
+        notif.refresh_from_db()
+        assert notif.status == 'cancelled'
+
     def test_does_not_cancel_sent_notifications(self):
         plan = OrderFactory(billing_mode='one_time', )
         event = EventFactory(status='scheduled', order=plan)
@@ -0,0 +1,37 @@
+"""
+Version numbers in the shared Django cache, for data held per process or in
+the cache that has to be rebuilt when the rows behind it change.
+
+A reader keeps the version it built its copy under and compares it with
+current(key); a writer calls bump(key). A missing key (cache cleared,
+evicted or expired) starts from a random number rather than 0, so neither a
+copy built before nor an ETag derived from an earlier version can match it
+again.
+"""
+import random
+
+from django.core.cache import cache
+
+
+def _seed(key, timeout):
+    cache.add(key, random.getrandbits(48), timeout=timeout)
+
+
+def current(key, timeout=None):
+    """The version stored under `key`, seeded if missing. `timeout` as for cache.set (None: never expires)."""
+    version = cache.get(key)
+    if version is None:
+        _seed(key, timeout)
+        version = cache.get(key)
+    return version
+
+
+def bump(key, timeout=None):
+    """Moves `key` to a new version, restarting its timeout."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        _seed(key, timeout)
+    else:
+        if timeout is not None:
+            cache.touch(key, timeout)
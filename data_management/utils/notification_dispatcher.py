@@ -0,0 +1,366 @@
+"""
+Concurrent sending of due notifications.
+
+Sends are network-bound (a Mailgun POST, a Twilio API call), so each channel
+gets its own bounded thread pool and its own rate limit, and a 429 from a
+provider pauses every worker of that channel, doubling the pause on each
+consecutive 429 (or honouring Retry-After), before the send is retried.
+Recipients are resolved on the calling thread, so workers never touch the
+database, and statuses are written back with one bulk_update per batch.
+Emails due together go out as Mailgun batch sends, up to
+MAILGUN_BATCH_SIZE recipients per API call (deliver_email_batch).
+
+Due notifications are claimed in batches under a lease (claim_due), so
+several dispatchers, e.g. send_notifications on more than one cron host, can
+run side by side without sending anything twice. The lease is renewed while
+a batch is still sending and cleared when its statuses are written; a
+worker that dies leaves leases that simply expire, after which another
+worker reclaims the rows.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from data_management.models import Notification
+from data_management.utils.send_notification import (
+    RECIPIENT_RELATED,
+    deliver,
+    deliver_email_batch,
+    email_batches,
+    mark_failed,
+    mark_sent,
+    resolve_recipient,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+MAX_THROTTLE_RETRIES = 5
+
+
+class RateLimiter:
+    """Spaces starts at least 1/rate seconds apart across all threads. A rate of 0 or less disables it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ProviderBackoff:
+    """A pause shared by every worker of one provider, set when it answers 429."""
+
+    def __init__(self, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+        self.base = base
+        self.cap = cap
+        self.throttles = 0
+        self._lock = threading.Lock()
+        self._until = 0.0
+        self._streak = 0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def throttled(self, retry_after=None):
+        """Extends the pause after a 429; returns its length in seconds."""
+        with self._lock:
+            self.throttles += 1
+            self._streak += 1
+            delay = min(self.cap, max(retry_after or 0, self.base * 2 ** (self._streak - 1)))
+            self._until = max(self._until, time.monotonic() + delay)
+            return delay
+
+    def recovered(self):
+        with self._lock:
+            self._streak = 0
+
+
+class Channel:
+    def __init__(self, name, workers, rate):
+        self.name = name
+        self.workers = max(1, workers)
+        self.limiter = RateLimiter(rate)
+        self.backoff = ProviderBackoff()
+
+
+def _retry_after(error):
+    """
+    None unless `error` is a provider 429; otherwise the seconds the provider
+    asked us to wait (0 if it did not say). Mailgun 429s arrive as
+    requests.HTTPError, Twilio's as TwilioRestException with .status.
+    """
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) == 429:
+        try:
+            return float(response.headers.get('Retry-After') or 0)
+        except ValueError:
+            return 0.0
+    if getattr(error, 'status', None) == 429:
+        return 0.0
+    return None
+
+
+def worker_id():
+    """Identifies this dispatcher run in Notification.claimed_by."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[-100:]
+
+
+def _claimable(now, today):
+    # Each branch has its own index, (status, scheduled_for) and
+    # (status, next_attempt_at), so neither scans the sent history.
+    due = Q(status='pending', scheduled_for__lte=today) | Q(status='failed', next_attempt_at__lte=now)
+    return Notification.objects.filter(due).filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    )
+
+
+def claim_due(claimed_by, limit, lease_seconds, today=None):
+    """
+    Leases up to `limit` due notifications (pending ones scheduled for
+    `today` or earlier, and failed ones whose retry is due) to `claimed_by` for
+    `lease_seconds` and returns them. Uses SKIP LOCKED where the database
+    supports it, so concurrent workers pass over each other's rows rather
+    than queueing behind them; the claiming UPDATE re-checks that each row
+    is still unleased, which keeps workers apart where it is not (SQLite).
+    Recipients are loaded with the rows, so a claim costs the same few
+    queries however many it returns.
+    """
+    now = timezone.now()
+    expires = now + timedelta(seconds=lease_seconds)
+    today = today or date.today()
+    with transaction.atomic():
+        due = _claimable(now, today).order_by('scheduled_for', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        _claimable(now, today).filter(pk__in=ids).update(claimed_by=claimed_by, lease_expires_at=expires)
+    return list(
+        Notification.objects
+        .filter(pk__in=ids, claimed_by=claimed_by, lease_expires_at=expires)
+        .select_related(*RECIPIENT_RELATED)
+        .order_by('scheduled_for', 'id')
+    )
+
+
+def renew_leases(claimed_by, ids, lease_seconds):
+    """Extends the lease on those of `ids` still held by `claimed_by`. Returns how many were."""
+    return Notification.objects.filter(pk__in=ids, claimed_by=claimed_by).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+    )
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications concurrently, per-channel pools and limits taken from
+    the NOTIFICATION_* settings unless given. `dispatch` returns counts and
+    throughput.
+    """
+
+    def __init__(self, email_workers=None, email_rate=None, sms_workers=None, sms_rate=None,
+                 batch_size=None, max_throttle_retries=MAX_THROTTLE_RETRIES, lease_seconds=None,
+                 mailgun_batch_size=None):
+        self.channels = {
+            'email': Channel(
+                'email',
+                email_workers or settings.NOTIFICATION_EMAIL_WORKERS,
+                settings.NOTIFICATION_EMAIL_RATE if email_rate is None else email_rate,
+            ),
+            'sms': Channel(
+                'sms',
+                sms_workers or settings.NOTIFICATION_SMS_WORKERS,
+                settings.NOTIFICATION_SMS_RATE if sms_rate is None else sms_rate,
+            ),
+        }
+        self.batch_size = max(1, batch_size or settings.NOTIFICATION_BATCH_SIZE)
+        self.max_throttle_retries = max_throttle_retries
+        self.lease_seconds = lease_seconds or settings.NOTIFICATION_LEASE_SECONDS
+        self.mailgun_batch_size = mailgun_batch_size or settings.MAILGUN_BATCH_SIZE
+        self.worker_id = worker_id()
+
+    def _send(self, channel, notifications, send, record_failure=True):
+        """
+        Calls send(), retrying it after a provider 429, and records the
+        outcome on each of `notifications`. Returns the error if it failed
+        for good, which record_failure=False leaves for the caller to record.
+        """
+        for attempt in range(self.max_throttle_retries + 1):
+            channel.backoff.wait()
+            channel.limiter.acquire()
+            try:
+                send()
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_throttle_retries:
+                    if record_failure:
+                        for notification in notifications:
+                            mark_failed(notification, e)
+                    return e
+                delay = channel.backoff.throttled(retry_after)
+                logger.warning(
+                    "%s provider throttled notifications %s; pausing the channel for %.1fs",
+                    channel.name, [n.pk for n in notifications], delay,
+                )
+            else:
+                channel.backoff.recovered()
+                for notification in notifications:
+                    mark_sent(notification)
+                return None
+
+    def _send_one(self, channel, notification, email, phone):
+        self._send(channel, [notification], partial(deliver, notification, email, phone))
+
+    def _send_email_batch(self, channel, recipients):
+        notifications = [n for n, _ in recipients]
+        error = self._send(channel, notifications, partial(deliver_email_batch, recipients), record_failure=False)
+        if error is None:
+            return
+        # Mailgun rejects the whole call over a single bad address, without
+        # sending anything, so only then is each recipient tried on its own.
+        response = getattr(error, 'response', None)
+        if response is not None and getattr(response, 'status_code', None) == 400:
+            for notification, email in recipients:
+                self._send_one(channel, notification, email, None)
+        else:
+            for notification in notifications:
+                mark_failed(notification, error)
+
+    def dispatch(self, notifications):
+        """
+        Sends every notification in `notifications` (any iterable), writing
+        statuses back one batch at a time. A queryset is streamed in chunks of
+        batch_size with its recipients, rather than loaded whole. Returns a
+        dict with 'sent', 'failed' (of which 'dead' will not be retried),
+        'throttled', 'seconds' and 'per_second'.
+        """
+        if isinstance(notifications, QuerySet):
+            notifications = notifications.select_related(*RECIPIENT_RELATED).iterator(chunk_size=self.batch_size)
+        return self._run(_batches(notifications, self.batch_size), leased=False)
+
+    def dispatch_due(self, today=None):
+        """Claims and sends due notifications, a leased batch at a time, until none are left. Returns as dispatch."""
+        claims = iter(lambda: claim_due(self.worker_id, self.batch_size, self.lease_seconds, today), [])
+        return self._run(claims, leased=True)
+
+    def _run(self, batches, leased):
+        started = time.monotonic()
+        sent, failed, dead = 0, 0, 0
+        pools = {
+            name: ThreadPoolExecutor(max_workers=channel.workers, thread_name_prefix=f'notify-{name}')
+            for name, channel in self.channels.items()
+        }
+        try:
+            for batch in batches:
+                futures, emails = [], []
+                for notification in batch:
+                    channel = self.channels.get(notification.channel)
+                    if channel is None:
+                        mark_failed(notification, ValueError(
+                            f"Unknown channel '{notification.channel}' for notification {notification.pk}"
+                        ))
+                        continue
+                    email, phone = resolve_recipient(notification)
+                    if channel.name == 'email' and email and self.mailgun_batch_size > 1:
+                        emails.append((notification, email))
+                        continue
+                    futures.append(pools[channel.name].submit(self._send_one, channel, notification, email, phone))
+                for recipients in email_batches(emails, self.mailgun_batch_size):
+                    if len(recipients) == 1:
+                        (notification, email), = recipients
+                        futures.append(pools['email'].submit(self._send_one, self.channels['email'], notification, email, None))
+                    else:
+                        futures.append(pools['email'].submit(self._send_email_batch, self.channels['email'], recipients))
+                self._wait(futures, batch, leased)
+                for notification in self._write(batch, leased):
+                    if notification.status == 'sent':
+                        sent += 1
+                    else:
+                        failed += 1
+                        dead += notification.status == 'dead'
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+        seconds = time.monotonic() - started
+        return {
+            'sent': sent,
+            'failed': failed,
+            'dead': dead,
+            'throttled': sum(channel.backoff.throttles for channel in self.channels.values()),
+            'seconds': round(seconds, 3),
+            'per_second': round((sent + failed) / seconds, 1) if seconds else 0.0,
+        }
+
+    def _wait(self, futures, batch, leased):
+        """Waits for a batch's sends, renewing its lease a few times per lease period while they run."""
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=self.lease_seconds / 3 if leased else None)
+            for future in done:
+                future.result()
+            if pending:
+                renew_leases(self.worker_id, [n.pk for n in batch], self.lease_seconds)
+
+    def _write(self, batch, leased):
+        """Writes the batch's outcomes back; returns the notifications it wrote."""
+        fields = ['status', 'sent_at', 'error_message', 'attempts', 'next_attempt_at', 'last_error_class']
+        if leased:
+            # A row whose lease lapsed may already belong to another worker,
+            # which owns its status now, and one cancelled mid-send (its order
+            # or event was) stays cancelled rather than being sent or retried.
+            ours = set(
+                Notification.objects
+                .filter(
+                    pk__in=[n.pk for n in batch],
+                    claimed_by=self.worker_id,
+                    status__in=Notification.OPEN_STATUSES,
+                )
+                .values_list('pk', flat=True)
+            )
+            lost = [n.pk for n in batch if n.pk not in ours]
+            if lost:
+                logger.warning(
+                    "Lost the lease on notifications %s, or they were cancelled, before writing their status.", lost,
+                )
+            batch = [n for n in batch if n.pk in ours]
+            for notification in batch:
+                notification.claimed_by = None
+                notification.lease_expires_at = None
+            fields += ['claimed_by', 'lease_expires_at']
+        Notification.objects.bulk_update(batch, fields)
+        return batch
@@ -60,9 +60,9 @@ def create_admin_event_notifications(event):
 def cancel_event_notifications(event):
     """
     Called when admin marks an event as 'ordered'.
-    Sets status='cancelled' on all pending notifications for this event.
+    Sets status='cancelled' on all unsent (pending or awaiting retry) notifications for this event.
     """
-    Notification.objects.filter(related_event=event, status='pending').update(status='cancelled')
+    Notification.objects.filter(related_event=event, status__in=Notification.OPEN_STATUSES).update(status='cancelled')
 
 
 def create_customer_delivery_day_notification(event):
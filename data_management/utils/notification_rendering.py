@@ -0,0 +1,63 @@
+"""
+Rendering of notification emails.
+
+Every notification email is the same pair of templates around the row's own
+subject and body, which are stored on the Notification when it is created,
+so rendering needs no related rows. Each template is rendered once per
+process with markers in place of the subject and body and split into a
+layout; rendering a notification is then joining its escaped subject and
+body into the layouts, which gives exactly what render_to_string would, for
+a fraction of the cost. A template edit is picked up on restart.
+"""
+import re
+from functools import lru_cache
+
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape
+
+EMAIL_HTML_TEMPLATE = 'notifications/emails/admin_notification.html'
+EMAIL_TEXT_TEMPLATE = 'notifications/emails/admin_notification.txt'
+
+_FIELDS = ('subject', 'body')
+_MARKER = re.compile('\x00(' + '|'.join(_FIELDS) + ')\x00')
+
+
+class _Layout:
+    """A template rendered around markers: literal text at even indexes, field names at odd ones."""
+
+    def __init__(self, template_name):
+        rendered = render_to_string(template_name, {field: f'\x00{field}\x00' for field in _FIELDS})
+        self.parts = _MARKER.split(rendered)
+
+    def fill(self, values):
+        """Joins already escaped `values` (by field name) into the layout."""
+        parts = self.parts[:]
+        for index in range(1, len(parts), 2):
+            parts[index] = values[parts[index]]
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def _layout(template_name):
+    return _Layout(template_name)
+
+
+def render_email(subject, body):
+    """The (html, text) bodies of a notification email, as render_to_string would give them."""
+    # The templates autoescape (the .txt one included), so the values are
+    # escaped the same way here.
+    values = {'subject': conditional_escape(subject), 'body': conditional_escape(body)}
+    return _layout(EMAIL_HTML_TEMPLATE).fill(values), _layout(EMAIL_TEXT_TEMPLATE).fill(values)
+
+
+def render_emails(notifications):
+    """render_email for each notification, in order."""
+    return [render_email(notification.subject, notification.body) for notification in notifications]
+
+
+def render_email_placeholders(values):
+    """
+    The (html, text) bodies with `values` (e.g. Mailgun %recipient.*%
+    placeholders) inserted as they are, unescaped.
+    """
+    return _layout(EMAIL_HTML_TEMPLATE).fill(values), _layout(EMAIL_TEXT_TEMPLATE).fill(values)
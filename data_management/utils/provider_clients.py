@@ -0,0 +1,89 @@
+"""
+Process-wide clients for Mailgun and Twilio.
+
+As stripe_client does for Stripe, every Mailgun call goes through one
+pooled, keep-alive requests.Session per process, and every SMS through one
+Twilio Client, itself on a pooled session. Consecutive sends, including the
+dispatcher's concurrent ones, therefore reuse TLS connections instead of
+opening one per message. Both sessions retry a failed connection a few
+times with backoff; nothing is retried once a request has been sent, since
+neither provider's send is idempotent (throttling and later failures are
+handled by the callers: see notification_dispatcher).
+"""
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_lock = threading.Lock()
+_mailgun_session = None
+_twilio = {'credentials': None, 'client': None}
+
+
+def _adapter():
+    retries = Retry(
+        total=settings.PROVIDER_CONNECT_RETRIES,
+        connect=settings.PROVIDER_CONNECT_RETRIES,
+        read=0,
+        status=0,
+        backoff_factor=0.5,
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=settings.PROVIDER_HTTP_POOL_SIZE, max_retries=retries)
+
+
+def _pooled_session():
+    session = requests.Session()
+    adapter = _adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def mailgun_session():
+    """The shared Mailgun session, created on first use."""
+    global _mailgun_session
+    if _mailgun_session is None:
+        with _lock:
+            if _mailgun_session is None:
+                _mailgun_session = _pooled_session()
+    return _mailgun_session
+
+
+def post_mailgun_message(data):
+    """POSTs one Mailgun messages call (`data` as its form fields) on the shared session. Returns the response."""
+    return mailgun_session().post(
+        f"{settings.MAILGUN_API_BASE_URL}/{settings.MAILGUN_DOMAIN}/messages",
+        auth=("api", settings.MAILGUN_API_KEY),
+        data=data,
+        timeout=settings.MAILGUN_TIMEOUT,
+    )
+
+
+def twilio_client():
+    """
+    The shared Twilio Client, created on first use (and again if the
+    credentials change), on its own pooled session.
+    """
+    credentials = (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    if _twilio['credentials'] != credentials:
+        with _lock:
+            if _twilio['credentials'] != credentials:
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+
+                http_client = TwilioHttpClient(pool_connections=True, timeout=settings.TWILIO_TIMEOUT)
+                http_client.session.mount('https://', _adapter())
+                _twilio['client'] = Client(*credentials, http_client=http_client)
+                _twilio['credentials'] = credentials
+    return _twilio['client']
+
+
+def send_sms(body, to):
+    """Sends one SMS through the messaging service on the shared Twilio client."""
+    return twilio_client().messages.create(
+        body=body,
+        messaging_service_sid=settings.TWILIO_MESSAGING_SERVICE_SID,
+        to=to,
+    )
@@ -1,13 +1,26 @@
+import json
 import logging
-from datetime import timezone
+import random
+from datetime import timedelta, timezone
 
-import requests
 from django.conf import settings
-from django.template.loader import render_to_string
 from django.utils import timezone as django_timezone
+from django.utils.html import conditional_escape
+
+from data_management.utils.notification_rendering import render_email, render_email_placeholders
+from data_management.utils.provider_clients import post_mailgun_message, send_sms
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SUBJECT = "FutureFlower Notification"
+
+# What a batch's email bodies carry: Mailgun fills in each recipient's own
+# values from recipient-variables.
+_BATCH_PLACEHOLDERS = {'subject': '%recipient.subject_html%', 'body': '%recipient.body_html%'}
+
+# What resolve_recipient reads, for select_related on querysets it will see.
+RECIPIENT_RELATED = ('recipient_partner__user', 'recipient_user')
+
 
 def resolve_recipient(notification):
     """Returns (email, phone) tuple. Either may be None depending on recipient_type."""
@@ -33,64 +46,160 @@ def resolve_recipient(notification):
     return None, None
 
 
+def deliver(notification, email, phone):
+    """
+    Sends one notification to an already resolved recipient through Mailgun
+    (email) or Twilio (SMS). Raises on any failure and saves nothing, so
+    callers decide how the outcome is recorded (see send_notification and
+    notification_dispatcher).
+    """
+    if notification.channel == 'email':
+        if not email:
+            raise ValueError(f"No email address for notification {notification.pk}")
+        html_body, text_body = render_email(notification.subject, notification.body)
+        response = post_mailgun_message({
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [email],
+            "subject": notification.subject or DEFAULT_SUBJECT,
+            "text": text_body,
+            "html": html_body,
+        })
+        response.raise_for_status()
+
+    elif notification.channel == 'sms':
+        if settings.DEBUG:
+            logger.info("DEBUG mode: skipping SMS for notification %s", notification.pk)
+            return
+        if not phone:
+            raise ValueError(f"No phone number for notification {notification.pk}")
+        send_sms(notification.body, phone)
+
+    else:
+        raise ValueError(f"Unknown channel '{notification.channel}' for notification {notification.pk}")
+
+
+def deliver_email_batch(recipients):
+    """
+    Sends one email per (notification, address) pair in `recipients` with a
+    single Mailgun call. The bodies carry %recipient.*% placeholders and each
+    address gets its own subject and body through
+    recipient-variables, which also makes Mailgun send every recipient a
+    separate message. Addresses must be unique within a call (see
+    email_batches). Raises on failure and saves nothing, like deliver.
+    """
+    html_body, text_body = render_email_placeholders(_BATCH_PLACEHOLDERS)
+    # The templates autoescape, so the values they would have rendered are
+    # escaped here the same way.
+    variables = {
+        email: {
+            'subject': notification.subject or DEFAULT_SUBJECT,
+            'subject_html': conditional_escape(notification.subject),
+            'body_html': conditional_escape(notification.body),
+        }
+        for notification, email in recipients
+    }
+    response = post_mailgun_message({
+        "from": settings.DEFAULT_FROM_EMAIL,
+        "to": list(variables),
+        "subject": "%recipient.subject%",
+        "text": text_body,
+        "html": html_body,
+        "recipient-variables": json.dumps(variables),
+    })
+    response.raise_for_status()
+
+
+def email_batches(recipients, size):
+    """
+    Splits (notification, address) pairs into batches for
+    deliver_email_batch: at most `size` per batch, and no address twice in
+    one, since recipient-variables are keyed by address. Order is kept.
+    """
+    batches = []
+    for notification, email in recipients:
+        key = email.strip().lower()
+        for batch in batches:
+            if len(batch['items']) < size and key not in batch['keys']:
+                break
+        else:
+            batch = {'items': [], 'keys': set()}
+            batches.append(batch)
+        batch['items'].append((notification, email))
+        batch['keys'].add(key)
+    return [batch['items'] for batch in batches]
+
+
+def is_transient(error):
+    """
+    Whether a send that raised `error` may succeed if tried again later:
+    network errors, provider 5xx and 429s are; a missing or rejected
+    address, or any other 4xx, is not.
+    """
+    if isinstance(error, ValueError):
+        return False
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) if response is not None else getattr(error, 'status', None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in (408, 429)
+    return True
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at NOTIFICATION_RETRY_MAX_SECONDS."""
+    delay = min(
+        settings.NOTIFICATION_RETRY_BASE_SECONDS * (2 ** (attempts - 1)),
+        settings.NOTIFICATION_RETRY_MAX_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def mark_sent(notification):
+    notification.attempts += 1
+    notification.status = 'sent'
+    notification.sent_at = django_timezone.now()
+    notification.next_attempt_at = None
+    notification.error_message = None
+
+
+def mark_failed(notification, error):
+    """
+    Records a failed attempt. A transient failure is retried at
+    next_attempt_at (status 'failed') until NOTIFICATION_MAX_ATTEMPTS is
+    reached; anything else, or the last attempt, dead-letters the row.
+    """
+    notification.attempts += 1
+    notification.error_message = str(error)
+    notification.last_error_class = type(error).__name__
+    if is_transient(error) and notification.attempts < settings.NOTIFICATION_MAX_ATTEMPTS:
+        notification.status = 'failed'
+        notification.next_attempt_at = django_timezone.now() + retry_delay(notification.attempts)
+        logger.warning(
+            "Failed to send notification %s (attempt %s), retrying at %s: %s",
+            notification.pk, notification.attempts, notification.next_attempt_at, error,
+        )
+    else:
+        notification.status = 'dead'
+        notification.next_attempt_at = None
+        logger.error(
+            "Failed to send notification %s after %s attempt(s): %s",
+            notification.pk, notification.attempts, error,
+        )
+
+
 def send_notification(notification):
     """
     Resolves recipient, sends via Mailgun (email) or Twilio (SMS).
     Updates notification.status, notification.sent_at, notification.error_message.
     Saves the notification record.
-    Does NOT raise exceptions — logs failures and marks status='failed'.
+    Does NOT raise exceptions — logs failures and marks status='failed'
+    (to be retried) or 'dead' (see mark_failed).
     """
     email, phone = resolve_recipient(notification)
 
     try:
-        if notification.channel == 'email':
-            if not email:
-                raise ValueError(f"No email address for notification {notification.pk}")
-            context = {'subject': notification.subject, 'body': notification.body}
-            html_body = render_to_string('notifications/emails/admin_notification.html', context)
-            text_body = render_to_string('notifications/emails/admin_notification.txt', context)
-            response = requests.post(
-                f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-                auth=("api", settings.MAILGUN_API_KEY),
-                data={
-                    "from": settings.DEFAULT_FROM_EMAIL,
-                    "to": [email],
-                    "subject": notification.subject or "FutureFlower Notification",
-                    "text": text_body,
-                    "html": html_body,
-                },
-                timeout=10,
-            )
-            response.raise_for_status()
-
-        elif notification.channel == 'sms':
-            if settings.DEBUG:
-                logger.info("DEBUG mode: skipping SMS for notification %s", notification.pk)
-                notification.status = 'sent'
-                notification.sent_at = django_timezone.now()
-                notification.error_message = None
-                notification.save()
-                return
-            if not phone:
-                raise ValueError(f"No phone number for notification {notification.pk}")
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=notification.body,
-                messaging_service_sid=settings.TWILIO_MESSAGING_SERVICE_SID,
-                to=phone,
-            )
-
-        else:
-            raise ValueError(f"Unknown channel '{notification.channel}' for notification {notification.pk}")
-
-        notification.status = 'sent'
-        notification.sent_at = django_timezone.now()
-        notification.error_message = None
-
+        deliver(notification, email, phone)
+        mark_sent(notification)
     except Exception as e:
-        logger.error("Failed to send notification %s: %s", notification.pk, e)
-        notification.status = 'failed'
-        notification.error_message = str(e)
+        mark_failed(notification, e)
 
     notification.save()
@@ -0,0 +1,64 @@
+"""
+The latest TermsAndConditions per terms_type, without a query per request.
+
+Each process keeps the id, version and publish date of the latest terms of
+every type (never the HTML content, which only the terms page needs). Saving
+or deleting terms, which is how TermsUpdateOrchestrator publishes a version,
+bumps a version number in the shared Django cache, and each process reloads
+its copy, in one query, the next time it sees a new version.
+"""
+import threading
+from collections import namedtuple
+
+from data_management.utils import cache_versions
+
+LatestTerms = namedtuple('LatestTerms', ['id', 'terms_type', 'version', 'published_at'])
+
+_VERSION_KEY = 'terms_registry_version'
+
+_lock = threading.Lock()
+_registry = {'version': None, 'latest': {}}
+
+
+def _current_version():
+    return cache_versions.current(_VERSION_KEY)
+
+
+def bump_version():
+    """Makes every process reload the latest terms on its next lookup."""
+    cache_versions.bump(_VERSION_KEY)
+
+
+def _load(version):
+    from data_management.models import TermsAndConditions
+
+    latest = {}
+    rows = TermsAndConditions.objects.order_by('terms_type', '-published_at', '-id').values_list(
+        'id', 'terms_type', 'version', 'published_at',
+    )
+    for row in rows:
+        latest.setdefault(row[1], LatestTerms(*row))
+    return {'version': version, 'latest': latest}
+
+
+def latest(terms_type):
+    """The LatestTerms of this type, or None if none have been published."""
+    global _registry
+    version = _current_version()
+    registry = _registry
+    if registry['version'] != version:
+        with _lock:
+            registry = _registry
+            if registry['version'] != version:
+                registry = _registry = _load(version)
+    return registry['latest'].get(terms_type)
+
+
+def has_accepted_latest(user_id, terms_type):
+    """Whether the user has accepted the latest terms of this type: one (user, terms) index probe."""
+    from data_management.models import TermsAcceptance
+
+    terms = latest(terms_type)
+    if terms is None or user_id is None:
+        return False
+    return TermsAcceptance.objects.filter(user_id=user_id, terms_id=terms.id).exists()
@@ -38,7 +38,7 @@ class AdminMarkOrderedView(APIView):
         event.ordering_evidence_text = ordering_evidence_text
         event.save()
 
-        Notification.objects.filter(related_event=event, status='pending').update(status='cancelled')
+        Notification.objects.filter(related_event=event, status__in=Notification.OPEN_STATUSES).update(status='cancelled')
 
         create_admin_delivery_day_notifications(event)
 
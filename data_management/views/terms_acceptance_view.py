@@ -2,7 +2,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from data_management.models import TermsAndConditions, TermsAcceptance
+from data_management.models import TermsAcceptance
+from data_management.utils import terms_registry
 
 VALID_TYPES = {'florist', 'customer', 'affiliate'}
 
@@ -26,7 +27,7 @@ class AcceptTermsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        latest = TermsAndConditions.objects.filter(terms_type=terms_type).order_by('-published_at').first()
+        latest = terms_registry.latest(terms_type)
         if not latest:
             return Response(
                 {"detail": f"No terms found for type '{terms_type}'."},
@@ -35,7 +36,7 @@ class AcceptTermsView(APIView):
 
         _, created = TermsAcceptance.objects.get_or_create(
             user=request.user,
-            terms=latest,
+            terms_id=latest.id,
         )
 
         return Response(
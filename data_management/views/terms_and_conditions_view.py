@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from data_management.models import TermsAndConditions
+from data_management.utils import terms_registry
 from data_management.serializers.terms_and_conditions_serializer import TermsAndConditionsSerializer
 
 from django.views.decorators.cache import cache_page
@@ -27,7 +28,8 @@ class LatestTermsAndConditionsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        latest_terms = TermsAndConditions.objects.filter(terms_type=terms_type).order_by('-published_at').first()
+        latest = terms_registry.latest(terms_type)
+        latest_terms = TermsAndConditions.objects.filter(pk=latest.id).first() if latest else None
         if not latest_terms:
             return Response({"detail": "No Terms and Conditions found."}, status=status.HTTP_404_NOT_FOUND)
 
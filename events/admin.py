@@ -1,5 +1,42 @@
-from django.contrib import admin
+import stripe
+from django.contrib import admin, messages
 from .models import Event, Order
+from .utils.order_cancellation import cancel_orders
 
 admin.site.register(Event)
-admin.site.register(Order)
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'billing_mode', 'status', 'next_payment_date', 'created_at']
+    list_filter = ['billing_mode', 'status']
+    actions = ['cancel_selected_orders']
+
+    def cancel_selected_orders(self, request, queryset):
+        """
+        Cancels the Stripe subscription of each recurring order, then cancels
+        every order whose subscription is gone in one bulk pass. An order
+        whose Stripe cancellation fails is left active and reported.
+        """
+        to_cancel = []
+        for order in queryset.exclude(status='cancelled'):
+            if order.billing_mode == 'recurring' and order.stripe_subscription_id:
+                try:
+                    stripe.Subscription.cancel(order.stripe_subscription_id)
+                except stripe.error.InvalidRequestError:
+                    pass  # Already cancelled (or gone) on Stripe's side.
+                except stripe.error.StripeError as e:
+                    self.message_user(request, f"Order {order.pk}: Stripe cancellation failed ({e}).", messages.ERROR)
+                    continue
+            to_cancel.append(order)
+
+        summary = cancel_orders(to_cancel)
+        self.message_user(
+            request,
+            f"{summary['orders']} order(s) cancelled, with {summary['events']} event(s) and "
+            f"{summary['notifications']} notification(s).",
+        )
+        if summary['ordered_event_ids']:
+            ordered = ', '.join(str(event_id) for ids in summary['ordered_event_ids'].values() for event_id in ids)
+            self.message_user(request, f"Already ordered from a florist: events {ordered}.", messages.WARNING)
+    cancel_selected_orders.short_description = "Cancel selected orders"
@@ -0,0 +1,22 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='next_delivery_date',
+            field=models.DateField(blank=True, db_index=True, help_text='Stored next delivery date (next_payment_date + the charge lead days).', null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='next_payment_date',
+            field=models.DateField(blank=True, db_index=True, help_text='Stored next billing date of a live recurring order, kept current on save and by the nightly roll_billing_dates command.', null=True),
+        ),
+    ]
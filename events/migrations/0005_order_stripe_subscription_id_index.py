@@ -0,0 +1,17 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_order_billing_dates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='stripe_subscription_id',
+            field=models.CharField(blank=True, db_index=True, help_text="The ID from Stripe for managing a recurring order's subscription.", max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,70 @@
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+PLACEHOLDER_DOMAIN = '@checkout.invalid'
+
+
+def detach_placeholder_users(apps, schema_editor):
+    """
+    Unclaimed guest drafts used to get a placeholder user on start. Move any
+    terms acceptance onto the session, detach the order and delete the user,
+    unless something else (another order, a payment) hangs off it.
+    """
+    CheckoutSession = apps.get_model('events', 'CheckoutSession')
+    Order = apps.get_model('events', 'Order')
+    TermsAcceptance = apps.get_model('data_management', 'TermsAcceptance')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    sessions = (
+        CheckoutSession.objects
+        .filter(customer_email='', order__user__email__endswith=PLACEHOLDER_DOMAIN)
+        .select_related('order')
+    )
+    for session in sessions.iterator(chunk_size=500):
+        user_id = session.order.user_id
+        accepted = (
+            TermsAcceptance.objects.filter(user_id=user_id)
+            .order_by('-terms__published_at').values_list('terms_id', flat=True).first()
+        )
+        if accepted:
+            session.accepted_terms_id = accepted
+            session.save(update_fields=['accepted_terms'])
+        Order.objects.filter(pk=session.order_id).update(user=None)
+        User.objects.filter(pk=user_id, orders__isnull=True, payments__isnull=True).delete()
+
+
+def restore_placeholder_users(apps, schema_editor):
+    Order = apps.get_model('events', 'Order')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    for order in Order.objects.filter(user__isnull=True).iterator(chunk_size=500):
+        placeholder = f'guest-{uuid.uuid4()}{PLACEHOLDER_DOMAIN}'
+        user = User.objects.create(username=placeholder, email=placeholder, password='!')
+        Order.objects.filter(pk=order.pk).update(user=user)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0003_initial'),
+        ('events', '0005_order_stripe_subscription_id_index'),
+        ('payments', '0007_invoicepaymentintent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkoutsession',
+            name='accepted_terms',
+            field=models.ForeignKey(blank=True, help_text='Terms accepted before the order had a user; recorded as a TermsAcceptance when the checkout is claimed.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='data_management.termsandconditions'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text='The user who owns this order. Empty for a guest checkout draft until the customer claims it with their details.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(detach_placeholder_users, restore_placeholder_users),
+    ]
@@ -0,0 +1,17 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_deferred_guest_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='checkoutsession',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
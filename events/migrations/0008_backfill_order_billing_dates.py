@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+
+from payments.utils.subscription_dates import get_next_payment_dates
+
+BATCH_SIZE = 1000
+
+
+def backfill_billing_dates(apps, schema_editor):
+    """
+    0004 added the stored dates as empty columns; fill them for the live
+    recurring orders that already existed, as Order.refresh_billing_dates
+    would, a primary-key batch at a time.
+    """
+    Order = apps.get_model('events', 'Order')
+    lead = timedelta(days=settings.SUBSCRIPTION_CHARGE_LEAD_DAYS)
+    missing = (
+        Order.objects.filter(
+            billing_mode='recurring',
+            status__in=['pending_payment', 'active'],
+            next_payment_date__isnull=True,
+        )
+        .only('id', 'start_date', 'frequency')
+        .order_by('id')
+    )
+
+    last_id = 0
+    while True:
+        batch = list(missing.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for order, next_payment in zip(batch, get_next_payment_dates(batch)):
+            order.next_payment_date = next_payment
+            order.next_delivery_date = next_payment + lead if next_payment else None
+        Order.objects.bulk_update(batch, ['next_payment_date', 'next_delivery_date'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_checkout_session_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_billing_dates, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from events.utils.checkout_session_cache import bump_order_version
+
 
 class CheckoutSession(models.Model):
     """Opaque, browser-held authority for an in-progress guest checkout."""
@@ -12,7 +14,15 @@ class CheckoutSession(models.Model):
     order = models.OneToOneField('events.Order', on_delete=models.CASCADE, related_name='checkout_session')
     token_hash = models.CharField(max_length=64, unique=True, editable=False)
     customer_email = models.EmailField(blank=True)
-    expires_at = models.DateTimeField()
+    accepted_terms = models.ForeignKey(
+        'data_management.TermsAndConditions',
+        null=True, blank=True,
+        on_delete=models.PROTECT,
+        related_name='+',
+        help_text="Terms accepted before the order had a user; recorded as a "
+                  "TermsAcceptance when the checkout is claimed."
+    )
+    expires_at = models.DateTimeField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -30,6 +40,10 @@ class CheckoutSession(models.Model):
         )
         return session, token
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_order_version(self.order_id)
+
     @property
     def is_expired(self):
         return self.expires_at <= timezone.now()
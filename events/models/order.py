@@ -2,7 +2,8 @@ from decimal import Decimal
 from django.db import models
 from django.conf import settings
 
-from events.utils.fee_calc import calculate_delivery_fee
+from events.utils.checkout_session_cache import bump_order_version
+from events.utils.pricing import price_breakdown
 
 class Order(models.Model):
     """
@@ -34,8 +35,10 @@ class Order(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        null=True, blank=True,
         related_name="orders",
-        help_text="The user who owns this order."
+        help_text="The user who owns this order. Empty for a guest checkout "
+                  "draft until the customer claims it with their details."
     )
     status = models.CharField(
         max_length=20,
@@ -132,9 +135,18 @@ class Order(models.Model):
         help_text="Optional notes about flower preferences."
     )
     stripe_subscription_id = models.CharField(
-        max_length=255, blank=True, null=True,
+        max_length=255, blank=True, null=True, db_index=True,
         help_text="The ID from Stripe for managing a recurring order's subscription."
     )
+    next_payment_date = models.DateField(
+        null=True, blank=True, db_index=True,
+        help_text="Stored next billing date of a live recurring order, kept current on save "
+                  "and by the nightly roll_billing_dates command."
+    )
+    next_delivery_date = models.DateField(
+        null=True, blank=True, db_index=True,
+        help_text="Stored next delivery date (next_payment_date + the charge lead days)."
+    )
 
     card_message = models.TextField(
         blank=True,
@@ -168,23 +180,46 @@ class Order(models.Model):
         self.frequency = None
         self.save()
 
+    def refresh_billing_dates(self):
+        """
+        Recomputes the stored next payment and delivery dates. Only recurring
+        orders that are still live (a draft or active) have them. Returns True
+        if either value changed.
+        """
+        from payments.utils.subscription_dates import get_next_delivery_date, get_next_payment_date
+
+        if self.billing_mode == 'recurring' and self.status in ('pending_payment', 'active'):
+            next_payment, next_delivery = get_next_payment_date(self), get_next_delivery_date(self)
+        else:
+            next_payment, next_delivery = None, None
+
+        changed = (next_payment, next_delivery) != (self.next_payment_date, self.next_delivery_date)
+        self.next_payment_date, self.next_delivery_date = next_payment, next_delivery
+        return changed
+
     def save(self, *args, **kwargs):
         if self.status == 'pending_payment':
             self._recalculate_price()
+        self.refresh_billing_dates()
         super().save(*args, **kwargs)
+        bump_order_version(self.pk)
 
     def _recalculate_price(self):
         if self.budget is not None:
             self.budget = self._meta.get_field('budget').to_python(self.budget)
-            self.delivery_fee = calculate_delivery_fee(self.budget)
-            self.subtotal = (self.budget + self.delivery_fee).quantize(Decimal('0.01'))
+            breakdown = price_breakdown(self.budget, self.discount_amount)
+            self.delivery_fee = breakdown['delivery_fee']
+            self.subtotal = breakdown['subtotal']
+            self.total_amount = breakdown['total_amount']
+            return
         self.total_amount = (
             (self.subtotal or Decimal('0'))
             - (self.discount_amount or Decimal('0'))
         )
 
     def __str__(self):
-        return f"Order {self.id} ({self.billing_mode}) for {self.user.username}"
+        owner = self.user.username if self.user_id else 'unclaimed guest checkout'
+        return f"Order {self.id} ({self.billing_mode}) for {owner}"
 
     class Meta:
         ordering = ['-created_at']
@@ -1,7 +1,12 @@
+from .checkout_order_serializer import CheckoutOrderSerializer
 from .event_serializer import EventSerializer
 from .order_serializer import OrderSerializer
+from .quote_serializer import QuoteRequestSerializer, QuoteSerializer
 
 __all__ = [
+    'CheckoutOrderSerializer',
     'EventSerializer',
     'OrderSerializer',
+    'QuoteRequestSerializer',
+    'QuoteSerializer',
 ]
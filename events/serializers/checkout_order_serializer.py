@@ -0,0 +1,19 @@
+from .order_serializer import OrderSerializer
+
+
+class CheckoutOrderSerializer(OrderSerializer):
+    """
+    The draft order as guest checkout reads and writes it. A draft has no
+    deliveries yet, so `events` is left out, along with the owner and the
+    Stripe subscription id, which the checkout pages never show.
+    """
+
+    class Meta(OrderSerializer.Meta):
+        fields = [
+            field for field in OrderSerializer.Meta.fields
+            if field not in ('events', 'user', 'stripe_subscription_id')
+        ]
+        read_only_fields = [
+            field for field in OrderSerializer.Meta.read_only_fields
+            if field not in ('events', 'user', 'stripe_subscription_id')
+        ]
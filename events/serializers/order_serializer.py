@@ -3,7 +3,6 @@ from rest_framework import serializers
 from events.models import Order
 from .event_serializer import EventSerializer
 from payments.serializers.payment_serializer import PaymentSerializer
-from payments.utils.subscription_dates import get_next_delivery_date, get_next_payment_date
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -39,13 +38,12 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_next_payment_date(self, obj):
         if obj.billing_mode != 'recurring':
             return None
-        return get_next_payment_date(obj)
+        return obj.next_payment_date
 
     def get_next_delivery_date(self, obj):
         if obj.billing_mode != 'recurring':
             return None
-        next_delivery = get_next_delivery_date(obj)
-        return next_delivery.isoformat() if next_delivery else None
+        return obj.next_delivery_date.isoformat() if obj.next_delivery_date else None
 
     def get_discount_code_display(self, obj):
         return obj.discount_code.code if obj.discount_code else None
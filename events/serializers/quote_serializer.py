@@ -0,0 +1,53 @@
+from django.conf import settings
+from rest_framework import serializers
+from events.models import Order
+from partners.utils import discount_codes
+
+MAX_QUOTE_BUDGETS = 50
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    """
+    The budgets (and optionally frequencies and a discount code) to price. As
+    query parameters, budgets and frequencies are repeated:
+    ?budget=75&budget=120&frequency=weekly&code=SAVE5
+    """
+    budget = serializers.ListField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2),
+        min_length=1, max_length=MAX_QUOTE_BUDGETS,
+    )
+    frequency = serializers.ListField(
+        child=serializers.ChoiceField(choices=Order.FREQUENCY_CHOICES),
+        required=False, default=list, max_length=len(Order.FREQUENCY_CHOICES),
+    )
+    code = serializers.CharField(max_length=30, required=False, allow_blank=True)
+
+    def validate_budget(self, value):
+        if any(budget < settings.MIN_BUDGET for budget in value):
+            raise serializers.ValidationError(
+                f"Budget must be at least ${settings.MIN_BUDGET}."
+            )
+        return list(dict.fromkeys(value))
+
+    def validate_frequency(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate(self, attrs):
+        code = attrs.get('code')
+        attrs['rule'] = discount_codes.lookup(code) if code else None
+        if code and not discount_codes.redeemable(attrs['rule']):
+            raise serializers.ValidationError({'code': "This discount code is not currently valid."})
+        return attrs
+
+
+class QuoteSerializer(serializers.Serializer):
+    billing_mode = serializers.CharField()
+    frequency = serializers.CharField(allow_null=True)
+    budget = serializers.DecimalField(max_digits=10, decimal_places=2)
+    delivery_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    first_charge = serializers.DecimalField(max_digits=10, decimal_places=2)
+    recurring_amount = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    referral_commission = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
@@ -73,3 +73,50 @@ class TestOrderModels:
     def test_order_str_representation(self):
         plan = OrderFactory(billing_mode='one_time')
         assert str(plan) == f"Order {plan.id} (one_time) for {plan.user.username}"
+
+    def test_recurring_order_stores_its_next_billing_dates(self, settings):
+        from datetime import date, timedelta
+        settings.SUBSCRIPTION_CHARGE_LEAD_DAYS = 7
+        start = date.today() + timedelta(days=20)
+
+        order = OrderFactory(billing_mode='recurring', frequency='weekly', start_date=start)
+
+        order.refresh_from_db()
+        assert order.next_payment_date == start - timedelta(days=7)
+        assert order.next_delivery_date == start
+
+    def test_cancelling_clears_the_stored_billing_dates(self):
+        from datetime import date, timedelta
+        order = OrderFactory(
+            billing_mode='recurring', frequency='monthly',
+            start_date=date.today() + timedelta(days=20), status='active',
+        )
+
+        order.status = 'cancelled'
+        order.save()
+
+        order.refresh_from_db()
+        assert order.next_payment_date is None
+        assert order.next_delivery_date is None
+
+    def test_one_time_orders_have_no_billing_dates(self):
+        order = OrderFactory(billing_mode='one_time')
+        assert order.next_payment_date is None
+
+    def test_billing_dates_migration_fills_orders_saved_before_the_columns(self, settings):
+        from datetime import date, timedelta
+        from importlib import import_module
+        from django.apps import apps
+        backfill = import_module('events.migrations.0008_backfill_order_billing_dates').backfill_billing_dates
+        settings.SUBSCRIPTION_CHARGE_LEAD_DAYS = 7
+        start = date.today() + timedelta(days=20)
+        live = OrderFactory(billing_mode='recurring', frequency='weekly', start_date=start, status='active')
+        cancelled = OrderFactory(billing_mode='recurring', frequency='weekly', start_date=start, status='cancelled')
+        Order.objects.update(next_payment_date=None, next_delivery_date=None)
+
+        backfill(apps, None)
+
+        live.refresh_from_db()
+        cancelled.refresh_from_db()
+        assert (live.next_payment_date, live.next_delivery_date) == (start - timedelta(days=7), start)
+        assert cancelled.next_payment_date is None
@@ -0,0 +1,88 @@
+import pytest
+from datetime import date, timedelta
+
+from data_management.models import Notification
+from data_management.tests.factories.notification_factory import NotificationFactory
+from events.models import Event, Order
+from events.tests.factories.event_factory import EventFactory
+from events.tests.factories.order_factory import OrderFactory
+from events.utils import checkout_session_cache
+from events.utils.order_cancellation import cancel_order, cancel_orders
+
+
+def _recurring_order_with_events(count=3, **overrides):
+    defaults = dict(billing_mode='recurring', frequency='weekly', status='active',
+                    start_date=date.today() + timedelta(days=7))
+    defaults.update(overrides)
+    order = OrderFactory(**defaults)
+    events = [
+        EventFactory(order=order, delivery_date=date.today() + timedelta(weeks=i + 1))
+        for i in range(count)
+    ]
+    for event in events:
+        NotificationFactory(related_event=event)
+    return order, events
+
+
+@pytest.mark.django_db
+class TestCancelOrders:
+
+    def test_cancels_order_events_and_pending_notifications(self):
+        order, events = _recurring_order_with_events()
+
+        summary = cancel_order(order)
+
+        assert summary == {'orders': 1, 'events': 3, 'notifications': 3, 'ordered_event_ids': {}}
+        order.refresh_from_db()
+        assert order.status == 'cancelled'
+        assert order.next_payment_date is None
+        assert not Event.objects.filter(order=order).exclude(status='cancelled').exists()
+
+    def test_keep_next_delivery_spares_the_earliest_scheduled_event(self):
+        order, events = _recurring_order_with_events()
+
+        summary = cancel_order(order, keep_next_delivery=True)
+
+        assert summary['events'] == 2
+        assert Event.objects.get(pk=events[0].pk).status == 'scheduled'
+        assert Notification.objects.get(related_event=events[0]).status == 'pending'
+
+    def test_keep_next_delivery_does_not_apply_to_one_time_orders(self):
+        order, events = _recurring_order_with_events(count=1, billing_mode='one_time', frequency=None)
+
+        assert cancel_order(order, keep_next_delivery=True)['events'] == 1
+
+    def test_ordered_events_are_reported_not_cancelled(self):
+        order, events = _recurring_order_with_events(count=2)
+        Event.objects.filter(pk=events[0].pk).update(status='ordered')
+
+        summary = cancel_order(order)
+
+        assert summary['ordered_event_ids'] == {order.pk: [events[0].pk]}
+        assert Event.objects.get(pk=events[0].pk).status == 'ordered'
+
+    def test_already_cancelled_orders_are_skipped(self):
+        order, _ = _recurring_order_with_events(count=1)
+        Order.objects.filter(pk=order.pk).update(status='cancelled')
+        order.refresh_from_db()
+
+        assert cancel_order(order) == {'orders': 0, 'events': 0, 'notifications': 0, 'ordered_event_ids': {}}
+
+    def test_cached_checkout_versions_are_bumped(self):
+        order, _ = _recurring_order_with_events(count=1)
+        before = checkout_session_cache.current_version(order.pk)
+
+        cancel_order(order)
+
+        assert checkout_session_cache.current_version(order.pk) != before
+
+    def test_query_count_does_not_grow_with_orders_or_events(self, django_assert_num_queries):
+        orders = [_recurring_order_with_events(count=4)[0] for _ in range(5)]
+
+        # savepoint, orders UPDATE, events SELECT, notifications UPDATE, events UPDATE, release
+        with django_assert_num_queries(6):
+            summary = cancel_orders(orders)
+
+        assert summary['orders'] == 5
+        assert summary['events'] == 20
+        assert summary['notifications'] == 20
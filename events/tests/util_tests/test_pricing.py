@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+from django.test import override_settings
+
+from events.tests.factories.order_factory import OrderFactory
+from events.utils.pricing import price_breakdown, quote
+
+
+@override_settings(DELIVERY_INCLUDED_THRESHOLD=100, DELIVERY_FEE=20)
+def test_breakdown_below_and_above_the_threshold():
+    assert price_breakdown(Decimal('75'), Decimal('5')) == {
+        'budget': Decimal('75.00'),
+        'delivery_fee': Decimal('20.00'),
+        'subtotal': Decimal('95.00'),
+        'discount_amount': Decimal('5.00'),
+        'total_amount': Decimal('90.00'),
+    }
+    assert price_breakdown(Decimal('150'))['total_amount'] == Decimal('150.00')
+
+
+def test_breakdown_follows_the_fee_settings():
+    with override_settings(DELIVERY_INCLUDED_THRESHOLD=100, DELIVERY_FEE=20):
+        assert price_breakdown(Decimal('80'))['delivery_fee'] == Decimal('20.00')
+    with override_settings(DELIVERY_INCLUDED_THRESHOLD=100, DELIVERY_FEE=15):
+        assert price_breakdown(Decimal('80'))['delivery_fee'] == Decimal('15.00')
+
+
+def test_memoized_breakdowns_are_not_shared():
+    price_breakdown(Decimal('80'))['total_amount'] = Decimal('0')
+    assert price_breakdown(Decimal('80'))['total_amount'] != Decimal('0')
+
+
+@pytest.mark.django_db
+def test_breakdown_matches_a_saved_order():
+    order = OrderFactory(budget=Decimal('72.50'), discount_amount=Decimal('5.00'))
+    breakdown = price_breakdown(order.budget, order.discount_amount)
+    assert (breakdown['delivery_fee'], breakdown['subtotal'], breakdown['total_amount']) == (
+        order.delivery_fee, order.subtotal, order.total_amount
+    )
+
+
+def test_quote_rows_per_budget_and_frequency():
+    rows = quote([Decimal('75'), Decimal('120')], ['weekly', 'monthly'])
+
+    assert [(row['budget'], row['billing_mode'], row['frequency']) for row in rows] == [
+        (Decimal('75.00'), 'one_time', None),
+        (Decimal('75.00'), 'recurring', 'weekly'),
+        (Decimal('75.00'), 'recurring', 'monthly'),
+        (Decimal('120.00'), 'one_time', None),
+        (Decimal('120.00'), 'recurring', 'weekly'),
+        (Decimal('120.00'), 'recurring', 'monthly'),
+    ]
+
+
+def test_recurring_charges_after_the_first_are_undiscounted():
+    rule = {'code': 'SAVE5', 'discount_amount': Decimal('5.00'), 'partner_type': 'delivery'}
+
+    row = quote([Decimal('120')], ['weekly'], rule)[1]
+
+    assert row['first_charge'] == row['total_amount'] == Decimal('115.00')
+    assert row['recurring_amount'] == Decimal('120.00')
+    assert 'referral_commission' not in row
+
+
+def test_commission_only_when_asked_for_a_referral_partner():
+    rule = {'code': 'REF', 'discount_amount': Decimal('5.00'), 'partner_type': 'non_delivery'}
+
+    assert quote([Decimal('120')], rule=rule, include_commission=True)[0]['referral_commission'] == Decimal('10')
+    assert 'referral_commission' not in quote([Decimal('120')], rule=rule)[0]
@@ -50,7 +50,6 @@ class TestGuestCheckoutClaim:
 
         client = APIClient()
         order = start_order(client, budget='125.00')
-        placeholder_user_id = order.user_id
 
         response = client.post(
             CLAIM_URL,
@@ -60,7 +59,7 @@ class TestGuestCheckoutClaim:
         assert response.status_code == 200, response.data
 
         order.refresh_from_db()
-        assert order.user_id == placeholder_user_id
+        assert order.user_id is not None
         assert order.user_id != staff.pk
         assert not order.user.is_staff
         assert order.total_amount == Decimal('125.00')
@@ -94,3 +93,44 @@ class TestGuestCheckoutClaim:
         assert first_order.pk != second_order.pk
         assert first_order.user_id != second_order.user_id
         assert first_order.user.email == second_order.user.email == 'repeat@example.com'
+
+    def test_starting_a_checkout_creates_no_user(self):
+        users_before = User.objects.count()
+
+        order = start_order(APIClient())
+
+        assert order.user_id is None
+        assert User.objects.count() == users_before
+
+    def test_claim_creates_the_user_once(self):
+        client = APIClient()
+        order = start_order(client)
+        details = {'email': 'once@example.com', 'first_name': 'On', 'last_name': 'Ce'}
+
+        client.post(CLAIM_URL, details, format='json')
+        order.refresh_from_db()
+        first_user_id = order.user_id
+        client.post(CLAIM_URL, dict(details, first_name='Twice'), format='json')
+
+        order.refresh_from_db()
+        assert order.user_id == first_user_id
+        assert order.user.first_name == 'Twice'
+        assert order.user.username.endswith('@checkout.invalid')
+        assert not order.user.has_usable_password()
+
+    def test_terms_accepted_before_claim_are_recorded_for_the_new_user(self):
+        from data_management.models import TermsAcceptance
+        from data_management.tests.factories.terms_and_conditions_factory import TermsAndConditionsFactory
+        terms = TermsAndConditionsFactory(terms_type='customer')
+        client = APIClient()
+        order = start_order(client)
+
+        response = client.post('/api/events/guest-checkout/accept-terms/', format='json')
+        assert response.status_code == 201
+        assert client.get('/api/events/guest-checkout/order/').data['terms_accepted'] is True
+
+        client.post(CLAIM_URL, {'email': 't@example.com', 'first_name': 'T', 'last_name': 'C'}, format='json')
+
+        order.refresh_from_db()
+        assert TermsAcceptance.objects.filter(user=order.user, terms=terms).exists()
+        assert client.get('/api/events/guest-checkout/order/').data['terms_accepted'] is True
@@ -51,12 +51,14 @@ class TestGuestCheckoutDiscount:
 
     def test_applying_a_code_attributes_the_order_to_the_partner(self):
         """Attribution is what pays the affiliate; process_referral_commission
-        reads it off the order's user at payment time."""
+        reads it off the order's user at payment time. The draft has no user
+        until it is claimed, so the attribution lands then."""
         client = APIClient()
         order = start_order(client)
         code = DiscountCodeFactory(code='SAVE5', discount_amount=Decimal('5.00'))
 
         client.post(DISCOUNT_URL, {'code': 'SAVE5'}, format='json')
+        client.post(CLAIM_URL, {'email': 'ref@example.com', 'first_name': 'Ref', 'last_name': 'Erred'}, format='json')
 
         order.refresh_from_db()
         assert order.user.referred_by_partner == code.partner
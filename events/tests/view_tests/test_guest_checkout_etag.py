@@ -0,0 +1,99 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from events.models import Order
+
+START_URL = '/api/events/guest-checkout/start/'
+ORDER_URL = '/api/events/guest-checkout/order/'
+CLAIM_URL = '/api/events/guest-checkout/claim/'
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+def start_order(client, budget='125.00'):
+    response = client.post(START_URL, {'brief': {'budget': budget}}, format='json')
+    assert response.status_code == 201, response.data
+    return Order.objects.get(pk=response.data['id'])
+
+
+@pytest.mark.django_db
+class TestGuestCheckoutConditionalGet:
+
+    def test_order_response_carries_an_etag(self):
+        client = APIClient()
+        start_order(client)
+
+        response = client.get(ORDER_URL)
+
+        assert response.status_code == 200
+        assert response['ETag']
+        assert 'private' in response['Cache-Control']
+        assert 'no-cache' in response['Cache-Control']
+
+    def test_matching_etag_returns_not_modified_without_queries(self, django_assert_num_queries):
+        client = APIClient()
+        start_order(client)
+        etag = client.get(ORDER_URL)['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_stale_etag_returns_the_order(self):
+        client = APIClient()
+        start_order(client)
+
+        response = client.get(ORDER_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+        assert response.status_code == 200
+        assert response.data['budget'] == '125.00'
+
+    def test_order_update_changes_the_etag(self):
+        client = APIClient()
+        start_order(client)
+        etag = client.get(ORDER_URL)['ETag']
+
+        client.post(ORDER_URL, {'budget': '150.00'}, format='json')
+        response = client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert response.data['budget'] == '150.00'
+
+    def test_claim_changes_the_etag(self):
+        client = APIClient()
+        start_order(client)
+        etag = client.get(ORDER_URL)['ETag']
+
+        client.post(CLAIM_URL, {'email': 'etag@example.com', 'first_name': 'E', 'last_name': 'Tag'}, format='json')
+        response = client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.data['customer_email'] == 'etag@example.com'
+
+    def test_etag_does_not_survive_a_cache_reset(self):
+        client = APIClient()
+        start_order(client)
+        etag = client.get(ORDER_URL)['ETag']
+
+        cache.clear()
+
+        assert client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_checkout_payload_leaves_out_what_the_funnel_does_not_use(self):
+        client = APIClient()
+        start_order(client)
+
+        data = client.get(ORDER_URL).data
+
+        assert 'events' not in data
+        assert 'user' not in data
+        assert 'stripe_subscription_id' not in data
+        assert {'id', 'budget', 'subtotal', 'total_amount', 'payments'} <= set(data)
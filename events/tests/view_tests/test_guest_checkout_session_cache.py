@@ -0,0 +1,175 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from events.models import CheckoutSession, Order
+from events.utils import checkout_session_cache
+from payments.tests.factories.payment_factory import PaymentFactory
+from users.tests.factories.user_factory import UserFactory
+from payments.utils.webhook_handlers import handle_payment_intent_failed, handle_payment_intent_succeeded
+
+START_URL = '/api/events/guest-checkout/start/'
+ORDER_URL = '/api/events/guest-checkout/order/'
+CLAIM_URL = '/api/events/guest-checkout/claim/'
+RECURRING_URL = '/api/events/guest-checkout/make-recurring/'
+CHECKOUT_URL = '/api/events/guest-checkout/checkout/'
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+def start_order(client, budget='125.00'):
+    response = client.post(START_URL, {'brief': {'budget': budget}}, format='json')
+    assert response.status_code == 201, response.data
+    return Order.objects.get(pk=response.data['id'])
+
+
+def start_claimed_order(client):
+    """A draft that has reached payment, so it has its user."""
+    start_order(client)
+    client.post(CLAIM_URL, {'email': 'pay@example.com', 'first_name': 'Pay', 'last_name': 'Er'}, format='json')
+    return Order.objects.select_related('user').get(checkout_session__customer_email='pay@example.com')
+
+
+@pytest.mark.django_db
+class TestGuestCheckoutSessionCache:
+
+    def test_repeated_order_reads_do_not_touch_the_database(self, django_assert_num_queries):
+        client = APIClient()
+        start_order(client)
+        first = client.get(ORDER_URL)
+
+        with django_assert_num_queries(0):
+            second = client.get(ORDER_URL)
+
+        assert second.status_code == 200
+        assert second.data == first.data
+
+    def test_order_update_is_visible_on_the_next_read(self):
+        client = APIClient()
+        start_order(client)
+        client.get(ORDER_URL)
+
+        client.post(ORDER_URL, {'budget': '150.00'}, format='json')
+
+        assert Decimal(client.get(ORDER_URL).data['budget']) == Decimal('150.00')
+
+    def test_claim_is_visible_on_the_next_read(self):
+        client = APIClient()
+        start_order(client)
+        client.get(ORDER_URL)
+
+        client.post(CLAIM_URL, {'email': 'a@example.com', 'first_name': 'Al', 'last_name': 'Lee'}, format='json')
+
+        data = client.get(ORDER_URL).data
+        assert data['customer_email'] == 'a@example.com'
+        assert data['customer_first_name'] == 'Al'
+
+    def test_make_recurring_is_visible_on_the_next_read(self):
+        client = APIClient()
+        start_order(client)
+        client.get(ORDER_URL)
+
+        client.post(RECURRING_URL, {'frequency': 'weekly'}, format='json')
+
+        assert client.get(ORDER_URL).data['billing_mode'] == 'recurring'
+
+    def test_payment_webhook_invalidates_the_cached_order(self, mocker):
+        mocker.patch('payments.utils.outbox.send_customer_payment_notification')
+        client = APIClient()
+        order = start_claimed_order(client)
+        order.start_date = date.today() + timedelta(days=10)
+        order.save()
+        PaymentFactory(order=order, user=order.user, stripe_payment_intent_id='pi_cache', status='pending')
+        client.get(ORDER_URL)
+
+        handle_payment_intent_succeeded({'id': 'pi_cache'})
+
+        assert client.get(ORDER_URL).data['status'] == 'active'
+
+    def test_failed_payment_is_visible_on_the_next_read(self):
+        client = APIClient()
+        order = start_claimed_order(client)
+        PaymentFactory(order=order, user=order.user, stripe_payment_intent_id='pi_fail_cache', status='pending')
+        client.get(ORDER_URL)
+
+        handle_payment_intent_failed({'id': 'pi_fail_cache'})
+
+        assert client.get(ORDER_URL).data['payments'][0]['status'] == 'failed'
+
+    def test_expired_session_is_not_served_from_cache(self):
+        from django.utils import timezone
+        client = APIClient()
+        order = start_order(client)
+        client.get(ORDER_URL)
+
+        session = CheckoutSession.objects.get(order=order)
+        session.expires_at = timezone.now()
+        session.save()
+
+        assert client.get(ORDER_URL).status_code == 410
+
+    def test_version_is_bumped_again_when_the_transaction_commits(self, django_capture_on_commit_callbacks):
+        client = APIClient()
+        order = start_order(client)
+        before = checkout_session_cache.current_version(order.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                order.save()
+                bumped_in_transaction = checkout_session_cache.current_version(order.pk)
+
+        assert bumped_in_transaction == before + 1
+        assert checkout_session_cache.current_version(order.pk) == before + 2
+
+    def test_change_behind_the_cache_is_not_written_over(self):
+        client = APIClient()
+        order = start_order(client)
+        client.get(ORDER_URL)
+        # As if the payment webhook's commit landed after a reload cached the draft.
+        Order.objects.filter(pk=order.pk).update(status='active')
+
+        response = client.post(ORDER_URL, {'budget': '150.00'}, format='json')
+
+        order.refresh_from_db()
+        assert response.status_code == 400
+        assert order.status == 'active'
+        assert order.budget == Decimal('125.00')
+
+    def test_claim_behind_the_cache_is_seen_by_the_next_claim(self):
+        client = APIClient()
+        order = start_order(client)
+        client.get(ORDER_URL)
+        customer = UserFactory()
+        Order.objects.filter(pk=order.pk).update(user=customer)
+
+        client.post(CLAIM_URL, {'email': 'new@example.com', 'first_name': 'Al', 'last_name': 'Lee'}, format='json')
+
+        order.refresh_from_db()
+        customer.refresh_from_db()
+        assert order.user_id == customer.pk
+        assert customer.email == 'new@example.com'
+
+    def test_checkout_calls_stripe_after_its_transaction_has_committed(self, mocker):
+        client = APIClient()
+        start_claimed_order(client)
+        outer_blocks = len(connection.atomic_blocks)
+        blocks_during_stripe = []
+
+        def start_order_payment(order):
+            blocks_during_stripe.append(len(connection.atomic_blocks))
+            return 'pi_secret'
+
+        mocker.patch('events.views.guest_checkout_view.validate_order_ready_for_payment', return_value=None)
+        mocker.patch('events.views.guest_checkout_view.start_order_payment', side_effect=start_order_payment)
+
+        response = client.post(CHECKOUT_URL, {}, format='json')
+
+        assert response.status_code == 200, response.data
+        assert blocks_during_stripe == [outer_blocks]
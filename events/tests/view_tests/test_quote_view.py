@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from events.models import Order
+from partners.tests.factories.discount_code_factory import DiscountCodeFactory
+
+QUOTE_URL = '/api/events/quote/'
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestQuoteView:
+
+    def test_quotes_every_budget_and_frequency(self, settings):
+        settings.DELIVERY_INCLUDED_THRESHOLD = 100
+        settings.DELIVERY_FEE = 20
+
+        response = APIClient().get(QUOTE_URL, {'budget': ['75', '150'], 'frequency': ['weekly']})
+
+        assert response.status_code == 200, response.data
+        assert response.data['code'] is None
+        quotes = response.data['quotes']
+        assert [(q['budget'], q['billing_mode'], q['total_amount']) for q in quotes] == [
+            ('75.00', 'one_time', '95.00'),
+            ('75.00', 'recurring', '95.00'),
+            ('150.00', 'one_time', '150.00'),
+            ('150.00', 'recurring', '150.00'),
+        ]
+
+    def test_applies_a_discount_code(self):
+        DiscountCodeFactory(code='SAVE5', discount_amount=Decimal('5.00'))
+
+        response = APIClient().get(QUOTE_URL, {'budget': '150', 'code': 'SAVE5'})
+
+        assert response.data['code'] == 'SAVE5'
+        assert response.data['quotes'][0]['total_amount'] == '145.00'
+        assert 'referral_commission' not in response.data['quotes'][0]
+
+    def test_the_codes_partner_sees_their_commission(self):
+        code = DiscountCodeFactory(code='SAVE5', discount_amount=Decimal('5.00'))
+        client = APIClient()
+        client.force_authenticate(code.partner.user)
+
+        response = client.get(QUOTE_URL, {'budget': '150', 'code': 'SAVE5'})
+
+        assert response.data['quotes'][0]['referral_commission'] == '15.00'
+
+    def test_rejects_an_invalid_code(self):
+        response = APIClient().get(QUOTE_URL, {'budget': '150', 'code': 'NOPE'})
+
+        assert response.status_code == 400
+        assert 'code' in response.data
+
+    def test_rejects_budgets_below_the_minimum(self, settings):
+        settings.MIN_BUDGET = 65
+
+        response = APIClient().get(QUOTE_URL, {'budget': ['80', '10']})
+
+        assert response.status_code == 400
+        assert 'budget' in response.data
+
+    def test_requires_a_budget(self):
+        assert APIClient().get(QUOTE_URL).status_code == 400
+
+    def test_writes_nothing(self, django_assert_num_queries):
+        DiscountCodeFactory(code='SAVE5')
+        client = APIClient()
+        client.get(QUOTE_URL, {'budget': '150', 'code': 'SAVE5'})
+
+        with django_assert_num_queries(0):
+            response = client.get(QUOTE_URL, {'budget': ['80', '120', '150'], 'frequency': ['weekly', 'monthly'], 'code': 'SAVE5'})
+
+        assert response.status_code == 200
+        assert len(response.data['quotes']) == 9
+        assert not Order.objects.exists()
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views.event_view import EventViewSet
 from .views.order_view import OrderViewSet
 from .views.guest_checkout_view import GuestCheckoutView
+from .views.quote_view import QuoteView
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='order')
@@ -10,5 +11,6 @@ router.register(r'', EventViewSet, basename='event')
 
 urlpatterns = [
     path('guest-checkout/<str:action>/', GuestCheckoutView.as_view(), name='guest-checkout'),
+    path('quote/', QuoteView.as_view(), name='quote'),
     path('', include(router.urls)),
 ]
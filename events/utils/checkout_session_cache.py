@@ -0,0 +1,108 @@
+"""
+Cache of resolved guest checkout sessions, keyed on the cookie's token hash.
+
+A checkout funnel resolves its session on every call, and the GET of the
+order is repeated constantly, so both the CheckoutSession (with its order and
+user) and the rendered GET payload are cached here.
+
+Freshness comes from a per-order version number rather than from deleting
+entries: anything that changes the order bumps the version (Order.save,
+CheckoutSession.save, bulk writers such as cancel_orders and
+roll_billing_dates, and the view actions that touch rows hanging off the
+order), and an entry stored under an older version is simply ignored. The
+version is read *before* the database on a miss, so a write racing the
+reload can only make the new entry look stale. A write inside a transaction
+is invisible to that reload until it commits, so the version is bumped
+again on commit. The same version is part of the ETag of the GET payload.
+
+Entries can still trail a write by a moment, so they are for reading only:
+the checkout view re-reads and locks the order before changing it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from data_management.utils import cache_versions
+
+_ENTRY_PREFIX = 'checkout_session:'
+_ORDER_PREFIX = 'checkout_session_order:'
+_VERSION_PREFIX = 'checkout_order_version:'
+
+
+def _version_timeout():
+    return int(settings.GUEST_CHECKOUT_LIFETIME.total_seconds())
+
+
+def current_version(order_id):
+    return cache_versions.current(f"{_VERSION_PREFIX}{order_id}", timeout=_version_timeout())
+
+
+def _bump(order_ids):
+    for order_id in order_ids:
+        cache_versions.bump(f"{_VERSION_PREFIX}{order_id}", timeout=_version_timeout())
+
+
+def bump_order_versions(order_ids):
+    """
+    Marks every cached checkout entry for these orders as stale, now and,
+    inside a transaction, again once it commits.
+    """
+    order_ids = [order_id for order_id in set(order_ids) if order_id is not None]
+    if not order_ids:
+        return
+    _bump(order_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(order_ids))
+
+
+def bump_order_version(order_id):
+    """Marks every cached checkout entry for this order as stale (see bump_order_versions)."""
+    bump_order_versions([order_id])
+
+
+def _order_id_for(token_hash, stale_entry):
+    if stale_entry:
+        return stale_entry['order_id']
+    order_id = cache.get(f"{_ORDER_PREFIX}{token_hash}")
+    if order_id is None:
+        from events.models import CheckoutSession
+        order_id = CheckoutSession.objects.filter(token_hash=token_hash).values_list('order_id', flat=True).first()
+        if order_id is not None:
+            cache.set(f"{_ORDER_PREFIX}{token_hash}", order_id, timeout=_version_timeout())
+    return order_id
+
+
+def get_entry(token_hash):
+    """
+    The cached entry for a session token: a dict with 'session' (the
+    CheckoutSession, order and user loaded) and optionally 'order_payload'.
+    Returns None if no such session exists.
+    """
+    entry = cache.get(f"{_ENTRY_PREFIX}{token_hash}")
+    if entry and entry['version'] == cache.get(f"{_VERSION_PREFIX}{entry['order_id']}"):
+        return entry
+
+    order_id = _order_id_for(token_hash, entry)
+    if order_id is None:
+        return None
+    version = current_version(order_id)
+
+    from events.models import CheckoutSession
+    try:
+        session = CheckoutSession.objects.select_related('order__user').get(token_hash=token_hash)
+    except CheckoutSession.DoesNotExist:
+        return None
+
+    entry = {'order_id': order_id, 'version': version, 'session': session}
+    _store(token_hash, entry)
+    return entry
+
+
+def remember_order_payload(token_hash, entry, payload):
+    """Caches the rendered GET payload alongside the session, at the entry's version."""
+    entry = dict(entry, order_payload=payload)
+    _store(token_hash, entry)
+
+
+def _store(token_hash, entry):
+    cache.set(f"{_ENTRY_PREFIX}{token_hash}", entry, timeout=settings.GUEST_CHECKOUT_CACHE_TIMEOUT)
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.utils import timezone
+
+from data_management.models.notification import Notification
+from events.models import Event, Order
+from events.utils.checkout_session_cache import bump_order_versions
+
+
+@transaction.atomic
+def cancel_orders(orders, keep_next_delivery=False):
+    """
+    Cancels orders together with their scheduled deliveries and those
+    deliveries' pending notifications, using a fixed number of set-based
+    UPDATEs however many orders and events are involved.
+
+    With keep_next_delivery, each recurring order keeps its earliest
+    scheduled delivery (the one the customer has already paid for).
+    Events already 'ordered' from a florist are left alone and reported, so
+    the caller can warn an admin.
+
+    Orders that are already cancelled are skipped. Stripe is not touched;
+    cancelling the subscription is the caller's job.
+
+    Returns {'orders', 'events', 'notifications'} counts plus
+    'ordered_event_ids', a dict of order id -> ids of its ordered events.
+    """
+    orders = [order for order in orders if order.status != 'cancelled']
+    order_ids = [order.pk for order in orders]
+    summary = {'orders': 0, 'events': 0, 'notifications': 0, 'ordered_event_ids': {}}
+    if not order_ids:
+        return summary
+
+    now = timezone.now()
+    summary['orders'] = Order.objects.filter(pk__in=order_ids).exclude(status='cancelled').update(
+        status='cancelled', next_payment_date=None, next_delivery_date=None, updated_at=now,
+    )
+    bump_order_versions(order_ids)
+    for order in orders:
+        order.status = 'cancelled'
+        order.next_payment_date = order.next_delivery_date = None
+
+    recurring_ids = {order.pk for order in orders if order.billing_mode == 'recurring'}
+    kept_order_ids = set()
+    event_ids_to_cancel = []
+    upcoming = (
+        Event.objects
+        .filter(order_id__in=order_ids, status__in=['scheduled', 'ordered'])
+        .order_by('order_id', 'delivery_date', 'id')
+        .values_list('id', 'order_id', 'status')
+    )
+    for event_id, order_id, event_status in upcoming:
+        if event_status == 'ordered':
+            summary['ordered_event_ids'].setdefault(order_id, []).append(event_id)
+            continue
+        if keep_next_delivery and order_id in recurring_ids and order_id not in kept_order_ids:
+            kept_order_ids.add(order_id)
+            continue
+        event_ids_to_cancel.append(event_id)
+
+    if event_ids_to_cancel:
+        summary['notifications'] = Notification.objects.filter(
+            related_event_id__in=event_ids_to_cancel, status__in=Notification.OPEN_STATUSES,
+        ).update(status='cancelled')
+        summary['events'] = Event.objects.filter(pk__in=event_ids_to_cancel).update(
+            status='cancelled', updated_at=now,
+        )
+    return summary
+
+
+def cancel_order(order, keep_next_delivery=False):
+    """`cancel_orders` for a single order."""
+    return cancel_orders([order], keep_next_delivery=keep_next_delivery)
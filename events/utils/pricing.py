@@ -0,0 +1,67 @@
+"""
+Order pricing without touching an order.
+
+`price_breakdown` is the formula `Order._recalculate_price` applies on save;
+`quote` evaluates it, plus a discount code and the partner's referral
+commission, for many budget/frequency combinations at once and writes
+nothing. Breakdowns are memoized per process (they only depend on their
+arguments and the fee settings). Discount codes come from the process-level
+index in partners/utils/discount_codes.py.
+"""
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+
+from events.utils.fee_calc import calculate_delivery_fee
+
+_CENT = Decimal('0.01')
+
+
+@lru_cache(maxsize=4096)
+def _breakdown(budget, discount_amount, threshold, fee):
+    delivery_fee = calculate_delivery_fee(budget)
+    subtotal = (budget + delivery_fee).quantize(_CENT)
+    return {
+        'budget': budget,
+        'delivery_fee': delivery_fee,
+        'subtotal': subtotal,
+        'discount_amount': discount_amount,
+        'total_amount': subtotal - discount_amount,
+    }
+
+
+def price_breakdown(budget, discount_amount=Decimal('0')):
+    """Delivery fee, subtotal and total for a budget and discount, as an order would store them."""
+    budget = Decimal(budget).quantize(_CENT)
+    discount_amount = Decimal(discount_amount or 0).quantize(_CENT)
+    # The fee settings are part of the key so overriding them is never masked.
+    return dict(_breakdown(budget, discount_amount, settings.DELIVERY_INCLUDED_THRESHOLD, settings.DELIVERY_FEE))
+
+
+def quote(budgets, frequencies=(), rule=None, include_commission=False):
+    """
+    One row per budget for a one-time order and per budget and frequency for
+    a recurring one. `rule` is a redeemable discount_codes.lookup() result.
+    The first charge is discounted; recurring charges after it are the
+    undiscounted subtotal.
+    """
+    from partners.utils.commission_utils import get_referral_commission_amount
+    from payments.utils.checkout import STRIPE_MINIMUM_CHARGE
+
+    discount_amount = rule['discount_amount'] if rule else Decimal('0')
+    earns_commission = include_commission and rule and rule['partner_type'] == 'non_delivery'
+
+    rows = []
+    for budget in budgets:
+        breakdown = price_breakdown(budget, discount_amount)
+        breakdown['first_charge'] = max(breakdown['total_amount'], STRIPE_MINIMUM_CHARGE)
+        if earns_commission:
+            breakdown['referral_commission'] = get_referral_commission_amount(breakdown['budget'])
+        rows.append(dict(breakdown, billing_mode='one_time', frequency=None, recurring_amount=None))
+        for frequency in frequencies:
+            rows.append(dict(
+                breakdown, billing_mode='recurring', frequency=frequency,
+                recurring_amount=breakdown['subtotal'],
+            ))
+    return rows
@@ -4,15 +4,20 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from data_management.models import TermsAcceptance, TermsAndConditions
+from data_management.models import TermsAcceptance
+from data_management.utils import terms_registry
 from events.models import CheckoutSession, Order
-from events.serializers import OrderSerializer
+from events.serializers import CheckoutOrderSerializer
+from events.utils import checkout_session_cache
 from partners.serializers import ValidateDiscountCodeSerializer
+from partners.utils import discount_codes
 from payments.utils.checkout import (
     start_order_payment,
     validate_order_ready_for_payment,
@@ -23,18 +28,14 @@ User = get_user_model()
 CHECKOUT_COOKIE = 'guest_checkout_token'
 
 
-def _discount_already_used_by_email(code, email):
+def _discount_already_used_by_email(discount_code_id, email):
     """
     Whether this discount code has already been redeemed by this email.
-    Guests get a fresh placeholder user per order, so the email — set at claim
-    time — is the only identity that persists across checkouts. (Card
+    Guests get a fresh user per order, created at claim time, so the email is
+    the only identity that persists across checkouts. (Card
     fingerprint tracking would be stronger; deliberately deferred.)
     """
-    from partners.models import DiscountUsage
-    return DiscountUsage.objects.filter(
-        discount_code__code__iexact=code,
-        user__email__iexact=email,
-    ).exists()
+    return discount_codes.used_by_email(discount_code_id, email)
 
 
 class GuestCheckoutView(APIView):
@@ -55,20 +56,42 @@ class GuestCheckoutView(APIView):
             samesite='Lax',
         )
 
-    def _session(self, request):
+    def _session_entry(self, request):
+        """The token hash and cached entry (see checkout_session_cache) for the cookie, if live."""
         token = request.COOKIES.get(CHECKOUT_COOKIE)
         if not token:
+            return None, None
+        token_hash = CheckoutSession.hash_token(token)
+        entry = checkout_session_cache.get_entry(token_hash)
+        if not entry or entry['session'].is_expired:
+            return None, None
+        return token_hash, entry
+
+    def _session(self, request):
+        _, entry = self._session_entry(request)
+        return entry['session'] if entry else None
+
+    def _locked(self, session):
+        """
+        `session` re-read from the database with its order locked until the
+        surrounding transaction ends, or None if it is gone. A cached entry can trail a
+        concurrent write (the payment webhook activating the order, say), so
+        actions that change the order never save the cached instance.
+        """
+        order = (
+            Order.objects.select_related('user').select_for_update(of=('self',))
+            .filter(pk=session.order_id).first()
+        )
+        session = CheckoutSession.objects.filter(pk=session.pk).first()
+        if order is None or session is None:
             return None
-        try:
-            session = CheckoutSession.objects.select_related('order__user').get(
-                token_hash=CheckoutSession.hash_token(token)
-            )
-        except CheckoutSession.DoesNotExist:
-            return None
-        return None if session.is_expired else session
+        session.order = order
+        return session
 
     def _require_session(self, request):
         session = self._session(request)
+        if session:
+            session = self._locked(session)
         if not session:
             return None, Response({'detail': 'Your checkout session has expired. Please start again.'}, status=410)
         if session.order.status != 'pending_payment':
@@ -77,72 +100,95 @@ class GuestCheckoutView(APIView):
 
     def post(self, request, action):
         if action == 'start':
-            return self.start(request)
-        session, error = self._require_session(request)
-        if error:
-            return error
-        if action == 'order':
-            return self.update_order(request, session)
-        if action == 'claim':
-            return self.claim(request, session)
-        if action == 'make-recurring':
-            return self.make_recurring(request, session)
-        if action == 'make-one-time':
-            return self.make_one_time(session)
-        if action == 'accept-terms':
-            return self.accept_terms(session)
-        if action == 'discount':
-            return self.discount(request, session)
+            with transaction.atomic():
+                return self.start(request)
         if action == 'checkout':
-            return self.checkout(session)
+            return self.checkout(request)
+        with transaction.atomic():
+            session, error = self._require_session(request)
+            if error:
+                return error
+            if action == 'order':
+                return self.update_order(request, session)
+            if action == 'claim':
+                return self.claim(request, session)
+            if action == 'make-recurring':
+                return self.make_recurring(request, session)
+            if action == 'make-one-time':
+                return self.make_one_time(session)
+            if action == 'accept-terms':
+                return self.accept_terms(session)
+            if action == 'discount':
+                return self.discount(request, session)
         return Response({'detail': 'Unknown checkout action.'}, status=404)
 
     def get(self, request, action):
-        session = self._session(request)
-        if not session:
+        token_hash, entry = self._session_entry(request)
+        if not entry:
             return Response({'detail': 'Your checkout session has expired. Please start again.'}, status=410)
         if action == 'order':
-            data = OrderSerializer(session.order).data
-            data['customer_email'] = session.customer_email or ''
-            data['customer_first_name'] = session.order.user.first_name or ''
-            data['customer_last_name'] = session.order.user.last_name or ''
-            data['terms_accepted'] = self._has_accepted_current_terms(session.order.user)
-            return Response(data)
+            etag = self._order_etag(entry)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                return self._revalidatable(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+            data = entry.get('order_payload')
+            if data is None:
+                session = entry['session']
+                data = dict(CheckoutOrderSerializer(session.order).data)
+                customer = session.order.user
+                data['customer_email'] = session.customer_email or ''
+                data['customer_first_name'] = customer.first_name if customer else ''
+                data['customer_last_name'] = customer.last_name if customer else ''
+                data['terms_accepted'] = self._has_accepted_current_terms(session)
+                checkout_session_cache.remember_order_payload(token_hash, entry, data)
+            return self._revalidatable(Response(data), etag)
         return Response({'detail': 'Unknown checkout action.'}, status=404)
 
-    def _has_accepted_current_terms(self, user):
-        latest = TermsAndConditions.objects.filter(terms_type='customer').order_by('-published_at').first()
-        if not latest:
-            return False
-        return TermsAcceptance.objects.filter(user=user, terms=latest).exists()
+    def _order_etag(self, entry):
+        """
+        Changes whenever the GET payload can: on Order.updated_at, and on the
+        checkout cache version, which the session, terms and payment changes
+        that leave the order row alone also bump.
+        """
+        order = entry['session'].order
+        return f'"{order.pk}-{entry["version"]}-{order.updated_at.timestamp():.6f}"'
+
+    def _revalidatable(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def _has_accepted_current_terms(self, session):
+        if session.order.user_id is None:
+            latest = terms_registry.latest('customer')
+            return latest is not None and session.accepted_terms_id == latest.id
+        return terms_registry.has_accepted_latest(session.order.user_id, 'customer')
 
-    @transaction.atomic
     def start(self, request):
         existing = self._session(request)
+        if existing:
+            existing = self._locked(existing)
         if existing and existing.order.status == 'pending_payment':
             order = existing.order
         else:
-            placeholder = f'guest-{uuid.uuid4()}@checkout.invalid'
-            user = User.objects.create_user(username=placeholder, email=placeholder)
-            user.set_unusable_password()
-            user.save(update_fields=['password'])
-            order = Order.objects.create(user=user, billing_mode='one_time')
+            # No user yet: most drafts are abandoned before the customer gives
+            # their details, and claim() creates the user for the ones that aren't.
+            order = Order.objects.create(billing_mode='one_time')
             _, token = CheckoutSession.create_for_order(order)
 
-        serializer = OrderSerializer(order, data=request.data.get('brief', {}), partial=True)
+        serializer = CheckoutOrderSerializer(order, data=request.data.get('brief', {}), partial=True)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
-        response = Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+        response = Response(CheckoutOrderSerializer(order).data, status=status.HTTP_201_CREATED)
         if not (existing and existing.order.status == 'pending_payment'):
             self._set_cookie(response, token, request)
         return response
 
     def update_order(self, request, session):
-        serializer = OrderSerializer(session.order, data=request.data, partial=True)
+        serializer = CheckoutOrderSerializer(session.order, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        return Response(OrderSerializer(serializer.save()).data)
+        return Response(CheckoutOrderSerializer(serializer.save()).data)
 
-    @transaction.atomic
     def claim(self, request, session):
         email = str(request.data.get('email', '')).strip().lower()
         first_name = str(request.data.get('first_name', '')).strip()
@@ -150,15 +196,43 @@ class GuestCheckoutView(APIView):
         if not email or not first_name or not last_name:
             return Response({'detail': 'First name, last name, and email are required.'}, status=400)
 
-        customer = session.order.user
-        customer.email = email
-        customer.first_name = first_name
-        customer.last_name = last_name
-        customer.save(update_fields=['email', 'first_name', 'last_name'])
+        order = session.order
+        customer = order.user
+        if customer is None:
+            customer = self._create_customer(email, first_name, last_name, session)
+            order.user = customer
+            order.save(update_fields=['user'])
+        else:
+            customer.email = email
+            customer.first_name = first_name
+            customer.last_name = last_name
+            customer.save(update_fields=['email', 'first_name', 'last_name'])
 
         session.customer_email = email
         session.save(update_fields=['customer_email', 'updated_at'])
-        return Response(OrderSerializer(session.order).data)
+        return Response(CheckoutOrderSerializer(session.order).data)
+
+    def _create_customer(self, email, first_name, last_name, session):
+        """
+        A new user for a draft being claimed. It is never an existing account
+        looked up by email: the email is unverified, so that would hand this
+        order to whoever holds the address. The username stays an opaque
+        placeholder so that orders sharing an email don't collide.
+        """
+        customer = User.objects.create_user(
+            username=f'guest-{uuid.uuid4()}@checkout.invalid',
+            email=email,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        customer.set_unusable_password()
+        order = session.order
+        if order.discount_code_id:
+            customer.referred_by_partner = order.discount_code.partner
+        customer.save(update_fields=['password', 'referred_by_partner'])
+        if session.accepted_terms_id:
+            TermsAcceptance.objects.get_or_create(user=customer, terms_id=session.accepted_terms_id)
+        return customer
 
     def make_recurring(self, request, session):
         frequency = request.data.get('frequency')
@@ -167,47 +241,65 @@ class GuestCheckoutView(APIView):
 
         order = session.order
         order.make_recurring(frequency)
-        return Response(OrderSerializer(order).data)
+        return Response(CheckoutOrderSerializer(order).data)
 
     def make_one_time(self, session):
         order = session.order
         order.make_one_time()
-        return Response(OrderSerializer(order).data)
+        return Response(CheckoutOrderSerializer(order).data)
 
     def discount(self, request, session):
         serializer = ValidateDiscountCodeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        code = serializer.validated_data.get('code', '')
-        if code and session.customer_email and _discount_already_used_by_email(code, session.customer_email):
+        rule = discount_codes.lookup(serializer.validated_data.get('code', ''))
+        if rule and session.customer_email and _discount_already_used_by_email(rule['id'], session.customer_email):
             return Response({'code': ['This discount code has already been used.']}, status=400)
         return Response(serializer.apply_discount(session.order))
 
     def accept_terms(self, session):
-        latest = TermsAndConditions.objects.filter(terms_type='customer').order_by('-published_at').first()
+        latest = terms_registry.latest('customer')
         if not latest:
             return Response({'detail': 'Customer terms are unavailable.'}, status=404)
-        _, created = TermsAcceptance.objects.get_or_create(user=session.order.user, terms=latest)
+        if session.order.user_id is None:
+            created = session.accepted_terms_id != latest.id
+            session.accepted_terms_id = latest.id
+            session.save(update_fields=['accepted_terms', 'updated_at'])
+        else:
+            _, created = TermsAcceptance.objects.get_or_create(user_id=session.order.user_id, terms_id=latest.id)
+        checkout_session_cache.bump_order_version(session.order_id)
         return Response({'accepted': True, 'created': created}, status=201 if created else 200)
 
-    def checkout(self, session):
-        order = session.order
-        if not session.customer_email:
-            return Response({'detail': 'Enter your contact details before payment.'}, status=400)
-
-        if order.discount_code and _discount_already_used_by_email(
-            order.discount_code.code, session.customer_email
-        ):
-            order.discount_code = None
-            order.discount_amount = 0
-            order.save()
-            return Response(
-                {'detail': 'This discount code has already been used with this email. '
-                           'It has been removed — please review your total and try again.'},
-                status=400,
-            )
-
-        problem = validate_order_ready_for_payment(order)
-        if problem:
-            return Response({'detail': problem}, status=400)
-
-        return Response({'clientSecret': start_order_payment(order)})
+    def checkout(self, request):
+        """
+        Checks the draft under a short lock, then starts the payment after
+        that transaction has committed: no row lock is held across the Stripe
+        calls, and a failure among them cannot roll back the customer,
+        subscription or pending Payment already recorded for what Stripe
+        created.
+        """
+        with transaction.atomic():
+            session, error = self._require_session(request)
+            if error:
+                return error
+            order = session.order
+            if not session.customer_email or order.user_id is None:
+                return Response({'detail': 'Enter your contact details before payment.'}, status=400)
+
+            if order.discount_code_id and _discount_already_used_by_email(order.discount_code_id, session.customer_email):
+                order.discount_code = None
+                order.discount_amount = 0
+                order.save()
+                return Response(
+                    {'detail': 'This discount code has already been used with this email. '
+                               'It has been removed — please review your total and try again.'},
+                    status=400,
+                )
+
+            problem = validate_order_ready_for_payment(order)
+            if problem:
+                return Response({'detail': problem}, status=400)
+
+        client_secret = start_order_payment(order)
+        # New or replaced pending Payment rows show in the order payload.
+        checkout_session_cache.bump_order_version(order.pk)
+        return Response({'clientSecret': client_secret})
@@ -1,5 +1,4 @@
 import stripe
-from django.conf import settings
 from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -7,10 +6,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from events.models import Order
 from events.serializers import OrderSerializer
-from data_management.models.notification import Notification
-from payments.utils.send_admin_payment_notification import send_admin_cancellation_notification
-
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from events.utils.order_cancellation import cancel_order
+from payments.utils.outbox import enqueue
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -59,31 +56,17 @@ class OrderViewSet(viewsets.ModelViewSet):
             if subscription.status != 'canceled':
                 stripe.Subscription.cancel(order.stripe_subscription_id)
 
-        order.status = 'cancelled'
-        order.save()
-
-        upcoming_events = list(order.events.filter(status__in=['scheduled', 'ordered']))
-        scheduled_events = [e for e in upcoming_events if e.status == 'scheduled']
-        ordered_events = [e for e in upcoming_events if e.status == 'ordered']
-
-        if cancel_type == 'cancel_all' or order.billing_mode != 'recurring':
-            events_to_cancel = scheduled_events
-        else:
-            scheduled_sorted = sorted(scheduled_events, key=lambda e: e.delivery_date)
-            events_to_cancel = scheduled_sorted[1:]
-
-        for event in events_to_cancel:
-            Notification.objects.filter(
-                related_event=event, status='pending'
-            ).update(status='cancelled')
-            event.status = 'cancelled'
-            event.save()
+        summary = cancel_order(order, keep_next_delivery=cancel_type == 'keep_current')
 
-        if ordered_events:
-            ordered_ids = ', '.join(str(e.id) for e in ordered_events)
-            send_admin_cancellation_notification(
-                f"User cancelled order {order.id}. "
-                f"The following events are already ordered and may require florist contact: {ordered_ids}"
+        ordered_event_ids = summary['ordered_event_ids'].get(order.pk)
+        if ordered_event_ids:
+            ordered_ids = ', '.join(str(event_id) for event_id in ordered_event_ids)
+            enqueue(
+                'admin_cancellation',
+                message=(
+                    f"User cancelled order {order.id}. "
+                    f"The following events are already ordered and may require florist contact: {ordered_ids}"
+                ),
             )
 
         return Response({'status': 'cancelled'}, status=status.HTTP_200_OK)
@@ -0,0 +1,33 @@
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from events.serializers import QuoteRequestSerializer, QuoteSerializer
+from events.utils.pricing import quote
+
+
+class QuoteView(APIView):
+    """
+    Prices budgets and frequencies the way a draft order would be priced,
+    without creating or saving anything. Meant for the budget slider, which
+    would otherwise save the order on every move just to show a total.
+    The referral commission is only shown to the partner who owns the code.
+    """
+
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request):
+        serializer = QuoteRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rule = data['rule']
+
+        include_commission = bool(
+            rule and request.user.is_authenticated and rule['partner_user_id'] == request.user.pk
+        )
+        rows = quote(data['budget'], data['frequency'], rule, include_commission=include_commission)
+        return Response({
+            'code': rule['code'] if rule else None,
+            'quotes': QuoteSerializer(rows, many=True).data,
+        })
@@ -32,7 +32,7 @@ export function parseOrder(raw: unknown): Order {
     subtotal: money(order.subtotal, 'subtotal'),
     discount_amount: money(order.discount_amount, 'discount_amount'),
     total_amount: nullableMoney(order.total_amount, 'total_amount'),
-    events: list(order.events, 'events'),
+    events: list(order.events ?? [], 'events'),
     payments: list(order.payments, 'payments'),
   } as Order;
 }
@@ -1,15 +1,13 @@
 import stripe
 from decimal import Decimal
 from datetime import date, timedelta
-from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from partners.models import (
     Partner, Commission, DeliveryRequest,
     Payout, PayoutLineItem,
 )
-
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from payments.utils.stripe_client import idempotency_key
 
 
 class Command(BaseCommand):
@@ -90,6 +88,7 @@ class Command(BaseCommand):
                         currency='usd',
                         destination=partner.stripe_connect_account_id,
                         metadata={'payout_id': payout.id},
+                        idempotency_key=idempotency_key('payout', payout.id),
                     )
                     payout.stripe_transfer_id = transfer.id
                     payout.status = 'completed'
@@ -160,6 +159,7 @@ class Command(BaseCommand):
                         currency='usd',
                         destination=partner.stripe_connect_account_id,
                         metadata={'payout_id': payout.id},
+                        idempotency_key=idempotency_key('payout', payout.id),
                     )
                     payout.stripe_transfer_id = transfer.id
                     payout.status = 'completed'
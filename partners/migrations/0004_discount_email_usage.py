@@ -0,0 +1,44 @@
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_email_usages(apps, schema_editor):
+    DiscountUsage = apps.get_model('partners', 'DiscountUsage')
+    DiscountEmailUsage = apps.get_model('partners', 'DiscountEmailUsage')
+
+    seen = set()
+    batch = []
+    for discount_code_id, email in DiscountUsage.objects.values_list('discount_code_id', 'user__email').iterator():
+        key = (discount_code_id, (email or '').strip().lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append(DiscountEmailUsage(discount_code_id=key[0], email=key[1]))
+        if len(batch) >= 1000:
+            DiscountEmailUsage.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    DiscountEmailUsage.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partners', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscountEmailUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('discount_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_usages', to='partners.discountcode')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('discount_code', 'email'), name='unique_discount_code_email')],
+            },
+        ),
+        migrations.RunPython(backfill_email_usages, migrations.RunPython.noop),
+    ]
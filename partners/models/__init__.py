@@ -1,6 +1,7 @@
 from .partner import Partner
 from .discount_code import DiscountCode
 from .discount_usage import DiscountUsage
+from .discount_email_usage import DiscountEmailUsage
 from .commission import Commission
 from .delivery_request import DeliveryRequest
 from .payout import Payout
@@ -10,6 +11,7 @@ __all__ = [
     'Partner',
     'DiscountCode',
     'DiscountUsage',
+    'DiscountEmailUsage',
     'Commission',
     'DeliveryRequest',
     'Payout',
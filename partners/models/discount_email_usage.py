@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class DiscountEmailUsage(models.Model):
+    """
+    That a normalized customer email has redeemed a discount code. Written
+    alongside every DiscountUsage; the unique index makes the once-per-email
+    check a single point lookup.
+    """
+    discount_code = models.ForeignKey(
+        'partners.DiscountCode',
+        on_delete=models.CASCADE,
+        related_name='email_usages'
+    )
+    email = models.CharField(max_length=254)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['discount_code', 'email'], name='unique_discount_code_email'),
+        ]
+
+    def __str__(self):
+        return f"{self.discount_code_id} used by {self.email}"
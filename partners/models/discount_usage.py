@@ -20,5 +20,15 @@ class DiscountUsage(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        from partners.models import DiscountEmailUsage
+        from partners.utils.discount_codes import normalize_email
+
+        super().save(*args, **kwargs)
+        DiscountEmailUsage.objects.get_or_create(
+            discount_code_id=self.discount_code_id,
+            email=normalize_email(self.user.email),
+        )
+
     def __str__(self):
         return f"{self.discount_code.code} used by {self.user.email}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from partners.models import DiscountCode
+from partners.utils import discount_codes
 
 
 class ValidateDiscountCodeSerializer(serializers.Serializer):
@@ -10,24 +10,18 @@ class ValidateDiscountCodeSerializer(serializers.Serializer):
     """
     code = serializers.CharField(max_length=30, required=False, allow_blank=True)
 
-    def _lookup(self, code):
-        return DiscountCode.objects.select_related('partner', 'partner__user').get(
-            code=code, is_active=True
-        )
-
     def validate_code(self, value):
         if not value:
             return value
 
-        try:
-            discount_code = self._lookup(value)
-        except DiscountCode.DoesNotExist:
+        rule = discount_codes.lookup(value)
+        if rule is None:
             raise serializers.ValidationError("This discount code does not exist.")
 
-        if discount_code.partner.status != 'active':
+        if not discount_codes.redeemable(rule):
             raise serializers.ValidationError("This discount code is not currently valid.")
 
-        return value
+        return rule['code']
 
     def apply_discount(self, order):
         code = self.validated_data.get('code', '')
@@ -43,19 +37,24 @@ class ValidateDiscountCodeSerializer(serializers.Serializer):
                 'new_total_amount': str(order.total_amount),
             }
 
-        discount_code = self._lookup(code)
-        order.discount_code = discount_code
-        order.discount_amount = discount_code.discount_amount
+        rule = discount_codes.lookup(code)
+        if not discount_codes.redeemable(rule):
+            # Deactivated since validation.
+            raise serializers.ValidationError({'code': ["This discount code is not currently valid."]})
+        order.discount_code_id = rule['id']
+        order.discount_amount = rule['discount_amount']
         order.save()
 
+        # An unclaimed guest draft has no user yet; claiming it attributes the
+        # partner from the order's discount code instead.
         customer = order.user
-        if not customer.referred_by_partner:
-            customer.referred_by_partner = discount_code.partner
+        if customer and not customer.referred_by_partner_id:
+            customer.referred_by_partner_id = rule['partner_id']
             customer.save(update_fields=['referred_by_partner'])
 
         return {
-            'code': discount_code.code,
-            'discount_amount': str(discount_code.discount_amount),
-            'partner_name': discount_code.partner.business_name or 'Partner',
+            'code': rule['code'],
+            'discount_amount': str(rule['discount_amount']),
+            'partner_name': rule['partner_name'] or 'Partner',
             'new_total_amount': str(order.total_amount),
         }
@@ -1,6 +1,8 @@
-from django.db.models.signals import pre_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from partners.models import Partner
+from partners.models import DiscountCode, Partner
+from partners.utils import discount_codes
 
 
 @receiver(pre_delete, sender=Partner)
@@ -8,3 +10,17 @@ def deactivate_discount_code_on_partner_delete(sender, instance, **kwargs):
     """When a partner is deleted, deactivate their discount code instead of losing it."""
     from partners.models import DiscountCode
     DiscountCode.objects.filter(partner=instance).update(is_active=False)
+
+
+@receiver(post_save, sender=DiscountCode)
+@receiver(post_delete, sender=DiscountCode)
+@receiver(post_save, sender=Partner)
+@receiver(post_delete, sender=Partner)
+def invalidate_discount_code_index(sender, **kwargs):
+    """
+    Any code or partner change makes the discount code index stale
+    (partners/utils/discount_codes.py). Bumped again on commit, so a process
+    that rebuilt from the not-yet-committed state rebuilds once more.
+    """
+    discount_codes.bump_version()
+    transaction.on_commit(discount_codes.bump_version)
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+
+from partners.models import DiscountEmailUsage, DiscountUsage
+from partners.tests.factories.discount_code_factory import DiscountCodeFactory
+from partners.utils import discount_codes
+from payments.tests.factories.payment_factory import PaymentFactory
+from users.tests.factories.user_factory import UserFactory
+
+
+@pytest.mark.django_db
+class TestLookup:
+
+    def test_unknown_and_inactive_codes_are_not_found(self):
+        DiscountCodeFactory(code='OFF', is_active=False)
+
+        assert discount_codes.lookup('NOPE') is None
+        assert discount_codes.lookup('OFF') is None
+
+    def test_codes_match_once_normalized(self):
+        DiscountCodeFactory(code='SAVE5')
+
+        assert discount_codes.lookup(' save5 ')['code'] == 'SAVE5'
+
+    def test_an_exact_match_wins_over_a_normalized_one(self):
+        DiscountCodeFactory(code='SAVE5')
+        lower = DiscountCodeFactory(code='save5')
+
+        assert discount_codes.lookup('save5')['id'] == lower.pk
+
+    def test_lookups_are_served_from_the_process_index(self, django_assert_num_queries):
+        DiscountCodeFactory(code='SAVE5', discount_amount=Decimal('5.00'))
+        discount_codes.lookup('SAVE5')
+
+        with django_assert_num_queries(0):
+            assert discount_codes.lookup('SAVE5')['discount_amount'] == Decimal('5.00')
+            assert discount_codes.lookup('OTHER') is None
+
+    def test_editing_a_code_rebuilds_the_index(self):
+        code = DiscountCodeFactory(code='SAVE5', discount_amount=Decimal('5.00'))
+        discount_codes.lookup('SAVE5')
+
+        code.discount_amount = Decimal('8.00')
+        code.save()
+
+        assert discount_codes.lookup('SAVE5')['discount_amount'] == Decimal('8.00')
+
+    def test_suspending_the_partner_makes_the_code_unredeemable(self):
+        code = DiscountCodeFactory(code='SAVE5')
+        assert discount_codes.redeemable(discount_codes.lookup('SAVE5'))
+
+        code.partner.status = 'suspended'
+        code.partner.save()
+
+        assert not discount_codes.redeemable(discount_codes.lookup('SAVE5'))
+
+
+@pytest.mark.django_db
+class TestUsedByEmail:
+
+    def test_recording_a_usage_records_the_normalized_email(self):
+        code = DiscountCodeFactory(code='SAVE5')
+        user = UserFactory(email='Repeat@Example.com ')
+
+        DiscountUsage.objects.create(discount_code=code, user=user, payment=PaymentFactory(user=user))
+
+        assert DiscountEmailUsage.objects.filter(discount_code=code, email='repeat@example.com').exists()
+        assert discount_codes.used_by_email(code.pk, 'REPEAT@example.com')
+        assert not discount_codes.used_by_email(code.pk, 'other@example.com')
+
+    def test_a_second_usage_by_the_same_email_is_one_row(self):
+        code = DiscountCodeFactory(code='SAVE5')
+        for _ in range(2):
+            user = UserFactory(email='repeat@example.com')
+            DiscountUsage.objects.create(discount_code=code, user=user, payment=PaymentFactory(user=user))
+
+        assert DiscountEmailUsage.objects.filter(discount_code=code).count() == 1
+
+    def test_is_one_query(self, django_assert_num_queries):
+        code = DiscountCodeFactory(code='SAVE5')
+
+        with django_assert_num_queries(1):
+            discount_codes.used_by_email(code.pk, 'a@example.com')
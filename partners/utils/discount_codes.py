@@ -0,0 +1,95 @@
+"""
+Discount code lookups without a query per request.
+
+Every active code is held in a per-process index, keyed both by the code as
+stored and by its normalized form, with what checkout and quoting need:
+amount, partner status, type and name. A DiscountCode or Partner save or
+delete bumps a version number in the shared Django cache
+(partners/signals.py), and each process rebuilds its index, in one query,
+the next time it sees a new version. A lookup therefore costs one cache read.
+
+Whether an email has already redeemed a code is answered by
+DiscountEmailUsage, a (code, normalized email) table with a unique index.
+"""
+import threading
+
+from data_management.utils import cache_versions
+
+_VERSION_KEY = 'discount_codes_version'
+
+_lock = threading.Lock()
+_index = {'version': None, 'by_code': {}, 'by_normalized': {}}
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def _current_version():
+    return cache_versions.current(_VERSION_KEY)
+
+
+def bump_version():
+    """Makes every process rebuild its index on its next lookup."""
+    cache_versions.bump(_VERSION_KEY)
+
+
+def _build_index(version):
+    from partners.models import DiscountCode
+
+    by_code = {}
+    rows = DiscountCode.objects.filter(is_active=True).values(
+        'id', 'code', 'discount_amount', 'partner_id',
+        'partner__status', 'partner__partner_type', 'partner__user_id', 'partner__business_name',
+    )
+    for row in rows:
+        by_code[row['code']] = {
+            'id': row['id'],
+            'code': row['code'],
+            'discount_amount': row['discount_amount'],
+            'partner_id': row['partner_id'],
+            'partner_status': row['partner__status'],
+            'partner_type': row['partner__partner_type'],
+            'partner_user_id': row['partner__user_id'],
+            'partner_name': row['partner__business_name'],
+        }
+    by_normalized = {}
+    for code, rule in by_code.items():
+        by_normalized.setdefault(normalize_code(code), rule)
+    return {'version': version, 'by_code': by_code, 'by_normalized': by_normalized}
+
+
+def lookup(code):
+    """
+    The active discount code matching `code` (exactly, else once normalized)
+    as a dict: 'id', 'code', 'discount_amount', 'partner_id',
+    'partner_status', 'partner_type', 'partner_user_id', 'partner_name'.
+    None if there is no such active code. Callers check 'partner_status'.
+    """
+    global _index
+    version = _current_version()
+    index = _index
+    if index['version'] != version:
+        with _lock:
+            index = _index
+            if index['version'] != version:
+                index = _index = _build_index(version)
+    return index['by_code'].get(code) or index['by_normalized'].get(normalize_code(code))
+
+
+def redeemable(rule):
+    """Whether a lookup() result can be applied: the code has an active partner."""
+    return rule is not None and rule['partner_status'] == 'active'
+
+
+def used_by_email(discount_code_id, email):
+    """Whether this email has already redeemed this discount code. One indexed query."""
+    from partners.models import DiscountEmailUsage
+
+    return DiscountEmailUsage.objects.filter(
+        discount_code_id=discount_code_id, email=normalize_email(email),
+    ).exists()
@@ -1,5 +1,4 @@
 import stripe
-from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -40,8 +39,6 @@ class AdminApproveCommissionView(APIView):
             if raw:
                 currency = raw.lower()
 
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-
         try:
             transfer = stripe.Transfer.create(
                 amount=int(commission.amount * 100),
@@ -6,8 +6,6 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from partners.models import Partner
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 
 class StripeConnectOnboardView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1,11 +1,9 @@
 import stripe
-from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from partners.models import Partner
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
 class StripeConnectStatusView(APIView):
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import stripe
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import InvoicePaymentIntent
+
+
+class Command(BaseCommand):
+    help = 'Fills the invoice -> PaymentIntent map from Stripe\'s paid invoice payments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='How far back to read invoice payments.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Mappings written per INSERT.',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        invoice_payments = stripe.InvoicePayment.list(
+            status='paid',
+            created={'gte': int(since.timestamp())},
+            limit=100,
+        ).auto_paging_iter()
+
+        seen, written = 0, 0
+        batch = []
+        for invoice_payment in invoice_payments:
+            seen += 1
+            payment = invoice_payment.get('payment') or {}
+            payment_intent = payment.get('payment_intent')
+            if payment.get('type') != 'payment_intent' or not payment_intent:
+                continue
+            batch.append(InvoicePaymentIntent(
+                stripe_invoice_id=invoice_payment['invoice'],
+                stripe_payment_intent_id=payment_intent if isinstance(payment_intent, str) else payment_intent['id'],
+            ))
+            if len(batch) >= options['batch_size']:
+                written += self._write(batch)
+                batch = []
+        if batch:
+            written += self._write(batch)
+
+        self.stdout.write(f'Done. Seen: {seen}, Written: {written}')
+
+    def _write(self, batch):
+        """Inserts the batch's mappings for invoices not yet mapped; returns how many that was."""
+        known = set(
+            InvoicePaymentIntent.objects.filter(stripe_invoice_id__in=[m.stripe_invoice_id for m in batch])
+            .values_list('stripe_invoice_id', flat=True)
+        )
+        new = {}
+        for mapping in batch:
+            if mapping.stripe_invoice_id not in known:
+                new.setdefault(mapping.stripe_invoice_id, mapping)
+        # ignore_conflicts still covers a webhook mapping the same invoice meanwhile.
+        InvoicePaymentIntent.objects.bulk_create(new.values(), ignore_conflicts=True)
+        return len(new)
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from payments.utils.outbox import dispatch_pending, release_stale_sends
+
+
+class Command(BaseCommand):
+    help = 'Sends outbox messages whose on-commit dispatch never ran (e.g. the process died).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry messages whose previous send failed.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help='Only send messages at least this many seconds old, leaving fresh ones to their on-commit hook.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of messages to send in this run.',
+        )
+
+    def handle(self, *args, **options):
+        released = release_stale_sends()
+        if released:
+            self.stdout.write(self.style.WARNING(f'Requeued {released} message(s) left sending by a crashed process.'))
+
+        sent, failed = dispatch_pending(
+            include_failed=options['retry_failed'],
+            older_than=timedelta(seconds=options['min_age']),
+            limit=options['limit'],
+        )
+        self.stdout.write(f'Done. Sent: {sent}, Failed: {failed}')
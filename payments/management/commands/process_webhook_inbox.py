@@ -0,0 +1,108 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from payments.utils.webhook_inbox import (
+    claim_batch,
+    group_by_ordering_key,
+    process_lane,
+    queue_depth,
+    release_stale_locks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _run_lane(rows, max_attempts):
+    try:
+        return process_lane(rows, max_attempts=max_attempts)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Drains the Stripe webhook inbox, dispatching stored events to their handlers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of ordering lanes processed concurrently.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Events claimed per batch.',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=None,
+            help='Attempts before an event is dead-lettered (defaults to STRIPE_WEBHOOK_MAX_ATTEMPTS).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new events instead of exiting once the inbox is drained.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep between polls when --loop is set and the inbox is empty.',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print the current queue depth and exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report_depth()
+            return
+
+        max_attempts = options['max_attempts'] or settings.STRIPE_WEBHOOK_MAX_ATTEMPTS
+        workers = max(1, options['workers'])
+        processed, failed = 0, 0
+
+        released = release_stale_locks()
+        if released:
+            self.stdout.write(self.style.WARNING(f'Released {released} stale inbox lock(s).'))
+
+        while True:
+            rows = claim_batch(options['batch_size'])
+            if not rows:
+                if not options['loop']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            lanes = group_by_ordering_key(rows)
+            if workers == 1 or len(lanes) == 1:
+                results = [process_lane(lane, max_attempts) for lane in lanes]
+            else:
+                with ThreadPoolExecutor(max_workers=min(workers, len(lanes))) as pool:
+                    results = list(pool.map(lambda lane: _run_lane(lane, max_attempts), lanes))
+
+            for lane_processed, lane_failed in results:
+                processed += lane_processed
+                failed += lane_failed
+            self._report_depth()
+
+        self.stdout.write(f'Done. Processed: {processed}, Failed: {failed}')
+
+    def _report_depth(self):
+        depth = queue_depth()
+        logger.info("stripe_webhook_inbox_depth %s", depth)
+        self.stdout.write(
+            f"Inbox depth — pending: {depth['pending']}, processing: {depth['processing']}, "
+            f"retrying: {depth['failed']}, dead: {depth['dead']}, "
+            f"oldest waiting: {depth['oldest_age_seconds']}s"
+        )
@@ -0,0 +1,53 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.utils.checkout_reaper import expired_session_batches, reap_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired guest checkout drafts (orders, sessions, pending payments and their guest users) '
+        'in small batches, cancelling the PaymentIntents and incomplete subscriptions they left on Stripe. '
+        'Safe to run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Expired sessions handled per batch (one short transaction each).',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.2,
+            help='Seconds to pause between batches, to leave room for live traffic.',
+        )
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=60,
+            help='Only reap sessions that expired at least this long ago.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        reclaimed = Counter()
+        for n, batch in enumerate(expired_session_batches(cutoff, options['batch_size'])):
+            if n and options['sleep']:
+                time.sleep(options['sleep'])
+            reclaimed.update(reap_batch(batch, cutoff))
+
+        skipped = reclaimed.pop('skipped', 0)
+        for label, rows in sorted(reclaimed.items()):
+            self.stdout.write(f"{label}: {rows}")
+        self.stdout.write(
+            f"Done. Orders: {reclaimed['events.Order']}, Sessions: {reclaimed['events.CheckoutSession']}, "
+            f"Payments: {reclaimed['payments.Payment']}, Users: {reclaimed['users.User']}, Skipped: {skipped}"
+        )
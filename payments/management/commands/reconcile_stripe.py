@@ -0,0 +1,145 @@
+import csv
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import ReconciliationCheckpoint, ReconciliationDiscrepancy
+from payments.utils.reconciliation import (
+    RESOURCES,
+    batched,
+    check_batch,
+    stream,
+    stream_open,
+    stream_unresolved,
+    windows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares Stripe PaymentIntents, Invoices, Subscriptions and Transfers with local rows, '
+        'resuming from the last checkpoint, and reports (optionally replays) discrepancies. '
+        'Open subscriptions and payments, and unresolved discrepancies, are checked on every run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            action='append',
+            choices=list(RESOURCES),
+            help='Resource to reconcile; repeatable. Defaults to all of them.',
+        )
+        parser.add_argument(
+            '--since',
+            type=lambda value: timezone.make_aware(datetime.strptime(value, '%Y-%m-%d')),
+            help='Start from this date (YYYY-MM-DD) instead of the checkpoint.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='How far back to start for a resource with no checkpoint.',
+        )
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            default=7,
+            help='Size of each created-time window; the checkpoint advances after each one.',
+        )
+        parser.add_argument(
+            '--settle-minutes',
+            type=int,
+            default=60,
+            help='Skip objects younger than this, whose webhooks may still be in flight.',
+        )
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Run the webhook handler for discrepancies a missed event explains.',
+        )
+        parser.add_argument(
+            '--report',
+            help='Also write discrepancies to this CSV file.',
+        )
+
+    def handle(self, *args, **options):
+        resources = options['resource'] or list(RESOURCES)
+        end = timezone.now() - timedelta(minutes=options['settle_minutes'])
+        window_size = timedelta(days=options['window_days'])
+
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        self.writer = csv.writer(report_file) if report_file else None
+        if self.writer:
+            self.writer.writerow(['resource', 'stripe_id', 'problem', 'detail', 'replayed'])
+
+        self.checked, self.found, self.replayed, resolved = 0, 0, 0, 0
+        try:
+            for resource in resources:
+                # Earlier discrepancies and still-open objects come first,
+                # whatever the checkpoint; then the new created-time windows.
+                self.seen, self.still_wrong = set(), set()
+                self._check(resource, stream_unresolved(resource), options)
+                self._check(resource, stream_open(resource, end), options)
+                start = options['since'] or self._checkpoint(resource) or end - timedelta(days=options['days'])
+                for window_start, window_end in windows(start, end, window_size):
+                    self._check(resource, stream(resource, window_start, window_end), options)
+                    ReconciliationCheckpoint.objects.update_or_create(
+                        resource=resource, defaults={'reconciled_until': window_end},
+                    )
+                resolved += self._resolve(resource)
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stdout.write(
+            f'Done. Checked: {self.checked}, Discrepancies: {self.found}, Replayed: {self.replayed}, '
+            f'Resolved: {resolved}'
+        )
+
+    def _check(self, resource, objects, options):
+        """Checks objects not yet checked this run, recording and reporting each discrepancy."""
+        fresh = (stripe_object for stripe_object in objects if stripe_object['id'] not in self.seen)
+        for batch in batched(fresh):
+            self.seen.update(stripe_object['id'] for stripe_object in batch)
+            self.checked += len(batch)
+            for discrepancy in check_batch(resource, batch):
+                self.found += 1
+                self.still_wrong.add((discrepancy.stripe_id, discrepancy.problem))
+                ReconciliationDiscrepancy.objects.update_or_create(
+                    resource=resource, stripe_id=discrepancy.stripe_id, problem=discrepancy.problem,
+                    defaults={'detail': discrepancy.detail, 'last_seen_at': timezone.now(), 'resolved_at': None},
+                )
+                was_replayed = options['replay'] and self._replay(discrepancy)
+                self.replayed += was_replayed
+                self.stdout.write(
+                    f"{resource} {discrepancy.stripe_id}: {discrepancy.problem} ({discrepancy.detail})"
+                    + (' - replayed' if was_replayed else '')
+                )
+                if self.writer:
+                    self.writer.writerow([
+                        resource, discrepancy.stripe_id, discrepancy.problem,
+                        discrepancy.detail, was_replayed,
+                    ])
+
+    def _resolve(self, resource):
+        """Closes this resource's open discrepancies whose object was checked this run and now agrees."""
+        open_rows = ReconciliationDiscrepancy.objects.filter(
+            resource=resource, resolved_at__isnull=True, stripe_id__in=self.seen,
+        ).values_list('pk', 'stripe_id', 'problem')
+        fixed = [pk for pk, stripe_id, problem in open_rows if (stripe_id, problem) not in self.still_wrong]
+        return ReconciliationDiscrepancy.objects.filter(pk__in=fixed).update(resolved_at=timezone.now())
+
+    def _checkpoint(self, resource):
+        checkpoint = ReconciliationCheckpoint.objects.filter(resource=resource).first()
+        return checkpoint.reconciled_until if checkpoint else None
+
+    def _replay(self, discrepancy):
+        if discrepancy.replay is None:
+            return False
+        try:
+            discrepancy.replay(discrepancy.stripe_object)
+        except Exception as e:
+            self.stderr.write(f"Replay failed for {discrepancy.stripe_id}: {e}")
+            return False
+        return True
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from events.models import Order
+from events.utils.checkout_session_cache import bump_order_versions
+from payments.utils.subscription_dates import get_next_payment_dates
+
+
+class Command(BaseCommand):
+    help = 'Rolls stored next payment/delivery dates of live recurring orders past today (run nightly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Orders recomputed and written per batch.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # A null date means the order predates the stored columns (or was
+        # written with update_fields that skipped them), so it is filled here.
+        due = Order.objects.filter(
+            billing_mode='recurring',
+            status__in=['pending_payment', 'active'],
+        ).filter(
+            Q(next_payment_date__isnull=True) | Q(next_payment_date__lte=date.today())
+        ).only('id', 'start_date', 'frequency', 'next_payment_date', 'next_delivery_date').order_by('id')
+
+        updated = 0
+        batch = []
+        for order in due.iterator(chunk_size=batch_size):
+            batch.append(order)
+            if len(batch) >= batch_size:
+                updated += self._roll(batch)
+                batch = []
+        if batch:
+            updated += self._roll(batch)
+
+        self.stdout.write(f'Done. Updated: {updated}')
+
+    def _roll(self, orders):
+        lead = timedelta(days=settings.SUBSCRIPTION_CHARGE_LEAD_DAYS)
+        for order, next_payment in zip(orders, get_next_payment_dates(orders)):
+            order.next_payment_date = next_payment
+            order.next_delivery_date = next_payment + lead if next_payment else None
+        updated = Order.objects.bulk_update(orders, ['next_payment_date', 'next_delivery_date'])
+        bump_order_versions(order.pk for order in orders)
+        return updated
@@ -0,0 +1,17 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='duration_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='How long the handler took on its most recent run.', null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_reconciliationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoicePaymentIntent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_invoice_id', models.CharField(max_length=255, unique=True)),
+                ('stripe_payment_intent_id', models.CharField(db_index=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_webhookevent_failed_inline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='sending_started_at',
+            field=models.DateTimeField(blank=True, help_text="When the current send was claimed; see outbox.release_stale_sends.", null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_outboxmessage_sending_started_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50)),
+                ('stripe_id', models.CharField(max_length=255)),
+                ('problem', models.CharField(max_length=50)),
+                ('detail', models.TextField(blank=True)),
+                ('first_seen_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['first_seen_at'],
+                'indexes': [models.Index(fields=['resource', 'resolved_at'], name='payments_re_resourc_11e2c5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'stripe_id', 'problem'), name='unique_reconciliation_discrepancy')],
+            },
+        ),
+    ]
@@ -1,5 +1,15 @@
 from .payment import Payment
+from .webhook_event import WebhookEvent
+from .outbox_message import OutboxMessage
+from .reconciliation_checkpoint import ReconciliationCheckpoint
+from .reconciliation_discrepancy import ReconciliationDiscrepancy
+from .invoice_payment_intent import InvoicePaymentIntent
 
 __all__ = [
     'Payment',
+    'WebhookEvent',
+    'OutboxMessage',
+    'ReconciliationCheckpoint',
+    'ReconciliationDiscrepancy',
+    'InvoicePaymentIntent',
 ]
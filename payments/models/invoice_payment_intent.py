@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class InvoicePaymentIntent(models.Model):
+    """
+    Which PaymentIntent paid a Stripe invoice. Since API 2025-03-31 invoice
+    payloads no longer name it, so this is filled from `invoice_payment.paid`
+    (and older `payment_intent.*`) events, letting the renewal webhook
+    resolve it without calling Stripe.
+    """
+    stripe_invoice_id = models.CharField(max_length=255, unique=True)
+    stripe_payment_intent_id = models.CharField(max_length=255, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.stripe_invoice_id} -> {self.stripe_payment_intent_id}"
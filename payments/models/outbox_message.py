@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """
+    An outbound email/SMS written inside the transaction that caused it and
+    sent only once that transaction commits, so no row lock is ever held
+    across a Mailgun or Twilio round-trip.
+    """
+    KIND_CHOICES = (
+        ('customer_payment_confirmation', 'Customer Payment Confirmation'),
+        ('admin_payment_received', 'Admin Payment Received'),
+        ('admin_cancellation', 'Admin Cancellation'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, help_text="Arguments the sender needs, e.g. the order id.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sending_started_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="When the current send was claimed; see outbox.release_stale_sends."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} message {self.id} ({self.status})"
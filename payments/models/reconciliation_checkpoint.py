@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class ReconciliationCheckpoint(models.Model):
+    """
+    How far `reconcile_stripe` has got for one Stripe resource: every object
+    created before `reconciled_until` has been compared with our rows, so
+    the next run starts there instead of re-reading a year of history.
+    """
+    resource = models.CharField(max_length=50, unique=True)
+    reconciled_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.resource} reconciled until {self.reconciled_until:%Y-%m-%d %H:%M}"
@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class ReconciliationDiscrepancy(models.Model):
+    """
+    A disagreement `reconcile_stripe` found between a Stripe object and our
+    rows. It stays open (no `resolved_at`) and is re-checked on every run
+    until the two agree, so it outlives the checkpoint moving past the
+    object's created-time window.
+    """
+    resource = models.CharField(max_length=50)
+    stripe_id = models.CharField(max_length=255)
+    problem = models.CharField(max_length=50)
+    detail = models.TextField(blank=True)
+    first_seen_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['first_seen_at']
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'stripe_id', 'problem'], name='unique_reconciliation_discrepancy'),
+        ]
+        indexes = [
+            models.Index(fields=['resource', 'resolved_at']),
+        ]
+
+    def __str__(self):
+        state = 'resolved' if self.resolved_at else 'open'
+        return f"{self.resource} {self.stripe_id}: {self.problem} ({state})"
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+class WebhookEvent(models.Model):
+    """
+    A verified Stripe webhook event. Doubles as the inbox (rows wait here
+    until `process_webhook_inbox` dispatches them) and as the idempotency
+    ledger of every event id we have handled, with its outcome and duration.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+        ('failed_inline', 'Failed inline (Stripe retries)'),
+        ('dead', 'Dead'),
+    )
+
+    stripe_event_id = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="The unique identifier of the Stripe Event."
+    )
+    event_type = models.CharField(max_length=100)
+    ordering_key = models.CharField(
+        max_length=255,
+        blank=True,
+        db_index=True,
+        help_text="Events sharing a key (usually one order) are processed in arrival order."
+    )
+    payload = models.JSONField(help_text="The raw event body as sent by Stripe.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    duration_ms = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="How long the handler took on its most recent run."
+    )
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.stripe_event_id} ({self.status})"
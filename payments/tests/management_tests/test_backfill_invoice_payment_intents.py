@@ -0,0 +1,47 @@
+import pytest
+import stripe
+from io import StringIO
+from django.core.management import call_command
+
+from payments.models import InvoicePaymentIntent
+
+
+@pytest.mark.django_db
+class TestBackfillInvoicePaymentIntentsCommand:
+
+    def test_writes_new_mappings_and_skips_known_ones(self, mocker):
+        InvoicePaymentIntent.objects.create(stripe_invoice_id='in_known', stripe_payment_intent_id='pi_known')
+        invoice_payments = [
+            {'invoice': 'in_known', 'payment': {'type': 'payment_intent', 'payment_intent': 'pi_known'}},
+            {'invoice': 'in_new', 'payment': {'type': 'payment_intent', 'payment_intent': 'pi_new'}},
+            {'invoice': 'in_record', 'payment': {'type': 'payment_record', 'payment_record': 'pr_1'}},
+        ]
+        listing = mocker.patch.object(
+            stripe.InvoicePayment, 'list',
+            return_value=mocker.Mock(auto_paging_iter=lambda: iter(invoice_payments)),
+        )
+        out = StringIO()
+
+        call_command('backfill_invoice_payment_intents', '--batch-size', '1', stdout=out)
+
+        assert listing.call_args.kwargs['status'] == 'paid'
+        assert InvoicePaymentIntent.objects.get(stripe_invoice_id='in_new').stripe_payment_intent_id == 'pi_new'
+        assert 'Seen: 3, Written: 1' in out.getvalue()
+
+    def test_a_batch_costs_one_lookup_and_one_insert(self, mocker, django_assert_num_queries):
+        InvoicePaymentIntent.objects.create(stripe_invoice_id='in_known', stripe_payment_intent_id='pi_known')
+        invoice_payments = [
+            {'invoice': invoice, 'payment': {'type': 'payment_intent', 'payment_intent': f'pi_{invoice}'}}
+            for invoice in ('in_known', 'in_a', 'in_b', 'in_a')
+        ]
+        mocker.patch.object(
+            stripe.InvoicePayment, 'list',
+            return_value=mocker.Mock(auto_paging_iter=lambda: iter(invoice_payments)),
+        )
+        out = StringIO()
+
+        with django_assert_num_queries(2):
+            call_command('backfill_invoice_payment_intents', stdout=out)
+
+        assert 'Seen: 4, Written: 2' in out.getvalue()
+        assert InvoicePaymentIntent.objects.count() == 3
@@ -0,0 +1,40 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+
+from payments.models import WebhookEvent
+from payments.tests.factories.payment_factory import PaymentFactory
+from payments.utils.webhook_inbox import store_webhook_event
+
+
+@pytest.mark.django_db
+class TestProcessWebhookInboxCommand:
+
+    def test_drains_inbox_through_handlers(self):
+        payment = PaymentFactory(stripe_payment_intent_id='pi_cmd', status='pending')
+        store_webhook_event({
+            'id': 'evt_cmd',
+            'type': 'payment_intent.payment_failed',
+            'data': {'object': {'id': 'pi_cmd'}},
+        })
+        out = StringIO()
+
+        call_command('process_webhook_inbox', '--workers', '1', stdout=out)
+
+        payment.refresh_from_db()
+        assert payment.status == 'failed'
+        assert WebhookEvent.objects.get(stripe_event_id='evt_cmd').status == 'processed'
+        assert 'Processed: 1, Failed: 0' in out.getvalue()
+
+    def test_stats_reports_depth(self):
+        store_webhook_event({
+            'id': 'evt_stats',
+            'type': 'account.updated',
+            'data': {'object': {'id': 'acct_1'}},
+        })
+        out = StringIO()
+
+        call_command('process_webhook_inbox', '--stats', stdout=out)
+
+        assert 'pending: 1' in out.getvalue()
+        assert WebhookEvent.objects.get(stripe_event_id='evt_stats').status == 'pending'
@@ -0,0 +1,153 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import stripe
+from django.core.management import call_command
+from django.utils import timezone
+
+from events.models import CheckoutSession, Order
+from events.tests.factories.order_factory import OrderFactory
+from payments.models import Payment
+from payments.tests.factories.payment_factory import PaymentFactory
+from users.models import User
+from users.tests.factories.user_factory import UserFactory
+
+
+def guest_user():
+    user = UserFactory(username=f'guest-{uuid.uuid4()}@checkout.invalid', email='guest@example.com')
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+def draft(expired=True, user=None, **order_fields):
+    order = OrderFactory(user=user, **order_fields)
+    session, _ = CheckoutSession.create_for_order(order)
+    if expired:
+        CheckoutSession.objects.filter(pk=session.pk).update(expires_at=timezone.now() - timedelta(days=1))
+    return order
+
+
+def stripe_object(status):
+    return stripe.StripeObject.construct_from({'status': status}, 'sk_test')
+
+
+@pytest.mark.django_db
+class TestReapCheckoutDraftsCommand:
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('reap_checkout_drafts', '--sleep', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_expired_unclaimed_drafts_and_keeps_live_ones(self):
+        expired = draft()
+        live = draft(expired=False)
+
+        out = self._run()
+
+        assert not Order.objects.filter(pk=expired.pk).exists()
+        assert not CheckoutSession.objects.filter(order_id=expired.pk).exists()
+        assert Order.objects.filter(pk=live.pk).exists()
+        assert 'Orders: 1, Sessions: 1' in out
+
+    def test_cancels_a_dangling_payment_intent_and_deletes_the_guest_user(self, mocker):
+        user = guest_user()
+        order = draft(user=user)
+        PaymentFactory(order=order, user=user, status='pending', stripe_payment_intent_id='pi_dangling')
+        mocker.patch('stripe.PaymentIntent.retrieve', return_value=stripe_object('requires_payment_method'))
+        cancel = mocker.patch('stripe.PaymentIntent.cancel')
+
+        out = self._run()
+
+        cancel.assert_called_once_with('pi_dangling')
+        assert not Order.objects.filter(pk=order.pk).exists()
+        assert not Payment.objects.filter(stripe_payment_intent_id='pi_dangling').exists()
+        assert not User.objects.filter(pk=user.pk).exists()
+        assert 'Payments: 1, Users: 1' in out
+
+    def test_keeps_a_draft_whose_payment_went_through(self, mocker):
+        user = guest_user()
+        order = draft(user=user)
+        PaymentFactory(order=order, user=user, status='pending', stripe_payment_intent_id='pi_paid')
+        mocker.patch('stripe.PaymentIntent.retrieve', return_value=stripe_object('succeeded'))
+        cancel = mocker.patch('stripe.PaymentIntent.cancel')
+
+        out = self._run()
+
+        cancel.assert_not_called()
+        assert Order.objects.filter(pk=order.pk).exists()
+        assert User.objects.filter(pk=user.pk).exists()
+        assert 'Skipped: 1' in out
+
+    def test_keeps_a_draft_when_stripe_is_unreachable(self, mocker):
+        user = guest_user()
+        order = draft(user=user)
+        PaymentFactory(order=order, user=user, status='pending', stripe_payment_intent_id='pi_down')
+        mocker.patch('stripe.PaymentIntent.retrieve', side_effect=stripe.error.APIConnectionError('down'))
+
+        self._run()
+
+        assert Order.objects.filter(pk=order.pk).exists()
+
+    def test_cancels_an_incomplete_subscription(self, mocker):
+        order = draft(user=guest_user(), billing_mode='recurring', stripe_subscription_id='sub_incomplete')
+        mocker.patch('stripe.Subscription.retrieve', return_value=stripe_object('incomplete'))
+        cancel = mocker.patch('stripe.Subscription.cancel')
+
+        self._run()
+
+        cancel.assert_called_once_with('sub_incomplete')
+        assert not Order.objects.filter(pk=order.pk).exists()
+
+    def test_keeps_a_draft_with_a_live_subscription(self, mocker):
+        order = draft(user=guest_user(), billing_mode='recurring', stripe_subscription_id='sub_live')
+        mocker.patch('stripe.Subscription.retrieve', return_value=stripe_object('active'))
+        cancel = mocker.patch('stripe.Subscription.cancel')
+
+        self._run()
+
+        cancel.assert_not_called()
+        assert Order.objects.filter(pk=order.pk).exists()
+
+    def test_paid_orders_only_lose_their_expired_session(self):
+        user = guest_user()
+        order = draft(user=user, status='active')
+
+        out = self._run()
+
+        assert Order.objects.filter(pk=order.pk).exists()
+        assert User.objects.filter(pk=user.pk).exists()
+        assert not CheckoutSession.objects.filter(order_id=order.pk).exists()
+        assert 'Orders: 0, Sessions: 1' in out
+
+    def test_keeps_users_that_are_not_disposable_guests(self):
+        account = UserFactory()
+        guest = guest_user()
+        draft(user=account)
+        draft(user=guest)
+        OrderFactory(user=guest, status='active')
+
+        self._run()
+
+        assert User.objects.filter(pk=account.pk).exists()
+        assert User.objects.filter(pk=guest.pk).exists()
+        assert Order.objects.filter(status='pending_payment').count() == 0
+
+    def test_works_through_several_batches(self):
+        for _ in range(5):
+            draft()
+
+        out = self._run('--batch-size', '2')
+
+        assert Order.objects.count() == 0
+        assert 'Orders: 5' in out
+
+    def test_respects_the_grace_period(self):
+        order = draft()
+
+        self._run('--grace-minutes', str(60 * 48))
+
+        assert Order.objects.filter(pk=order.pk).exists()
@@ -0,0 +1,169 @@
+import pytest
+import stripe
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+
+from events.tests.factories.order_factory import OrderFactory
+from partners.tests.factories.payout_factory import PayoutFactory
+from payments.models import ReconciliationCheckpoint, ReconciliationDiscrepancy
+from payments.tests.factories.payment_factory import PaymentFactory
+
+
+@pytest.fixture
+def stripe_lists(mocker):
+    """
+    Patches every list endpoint; tests fill `objects[resource]`. A list for one
+    status leaves out objects in any other status. `retrieve` finds any
+    object in `objects` and raises resource_missing for the rest.
+    """
+    objects = {'PaymentIntent': [], 'Invoice': [], 'Subscription': [], 'Transfer': []}
+
+    def listed(name, status=None, **kwargs):
+        found = [o for o in objects[name] if status in (None, 'all') or o.get('status', status) == status]
+        return mocker.Mock(auto_paging_iter=lambda: iter(found))
+
+    def retrieve(name, stripe_id):
+        for stripe_object in objects[name]:
+            if stripe_object['id'] == stripe_id:
+                return stripe_object
+        raise stripe.error.InvalidRequestError('No such object', 'id', code='resource_missing')
+
+    mocks = {}
+    for name in objects:
+        mocks[name] = mocker.patch.object(
+            getattr(stripe, name), 'list', side_effect=lambda name=name, **kwargs: listed(name, **kwargs),
+        )
+        mocker.patch.object(getattr(stripe, name), 'retrieve', side_effect=lambda stripe_id, name=name: retrieve(name, stripe_id))
+    return objects, mocks
+
+
+def _settled(instance, **fields):
+    """Backdates `instance` past the settle delay (auto_now fields need a queryset update)."""
+    fields = fields or {'updated_at': timezone.now() - timedelta(hours=2)}
+    type(instance).objects.filter(pk=instance.pk).update(**fields)
+
+
+@pytest.mark.django_db
+class TestReconcileStripeCommand:
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('reconcile_stripe', '--window-days', '400', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_a_succeeded_intent_whose_payment_is_still_pending(self, stripe_lists):
+        objects, _ = stripe_lists
+        PaymentFactory(stripe_payment_intent_id='pi_stuck', status='pending')
+        objects['PaymentIntent'].append({'id': 'pi_stuck', 'status': 'succeeded', 'metadata': {}})
+
+        output = self._run('--resource', 'payment_intents')
+
+        assert 'pi_stuck: payment_not_succeeded' in output
+        assert 'Checked: 1, Discrepancies: 1, Replayed: 0' in output
+
+    def test_replay_runs_the_missed_handler(self, stripe_lists):
+        objects, _ = stripe_lists
+        order = OrderFactory(billing_mode='recurring', status='active', stripe_subscription_id='sub_gone')
+        objects['Subscription'].append({'id': 'sub_gone', 'status': 'canceled'})
+
+        output = self._run('--resource', 'subscriptions', '--replay')
+
+        order.refresh_from_db()
+        assert order.status == 'cancelled'
+        assert 'order_not_cancelled (stripe status canceled) - replayed' in output
+
+    def test_missing_renewal_event_is_reported(self, stripe_lists):
+        objects, _ = stripe_lists
+        order = OrderFactory(billing_mode='recurring', status='active', stripe_subscription_id='sub_renew')
+        objects['Invoice'].append({
+            'id': 'in_renew', 'subscription': 'sub_renew', 'billing_reason': 'subscription_cycle',
+            'created': int(timezone.now().timestamp()),
+        })
+
+        output = self._run('--resource', 'invoices')
+
+        assert f'in_renew: missing_renewal_event (order {order.pk}' in output
+
+    def test_transfers_without_a_payout_are_reported(self, stripe_lists):
+        objects, _ = stripe_lists
+        PayoutFactory(stripe_transfer_id='tr_known', status='completed')
+        objects['Transfer'] += [{'id': 'tr_known'}, {'id': 'tr_unknown', 'metadata': {'payout_id': '9'}}]
+
+        output = self._run('--resource', 'transfers')
+
+        assert 'tr_unknown: missing_payout (payout 9)' in output
+        assert 'tr_known' not in output
+
+    def test_checkpoint_is_saved_and_resumed(self, stripe_lists):
+        _, mocks = stripe_lists
+        self._run('--resource', 'transfers')
+        checkpoint = ReconciliationCheckpoint.objects.get(resource='transfers').reconciled_until
+
+        self._run('--resource', 'transfers')
+
+        created = mocks['Transfer'].call_args.kwargs['created']
+        assert created['gte'] == int(checkpoint.timestamp())
+        assert created['lt'] >= created['gte']
+
+    def test_history_is_read_in_windows(self, stripe_lists):
+        _, mocks = stripe_lists
+
+        call_command('reconcile_stripe', '--resource', 'transfers', '--days', '30', '--window-days', '7', stdout=StringIO())
+
+        assert mocks['Transfer'].call_count == 5
+        assert ReconciliationCheckpoint.objects.get(resource='transfers').reconciled_until > timezone.now() - timedelta(hours=2)
+
+    def test_writes_a_csv_report(self, stripe_lists, tmp_path):
+        objects, _ = stripe_lists
+        objects['Transfer'].append({'id': 'tr_csv'})
+        report = tmp_path / 'report.csv'
+
+        self._run('--resource', 'transfers', '--report', str(report))
+
+        lines = report.read_text().splitlines()
+        assert lines[0] == 'resource,stripe_id,problem,detail,replayed'
+        assert lines[1].startswith('transfers,tr_csv,missing_payout')
+
+    def test_subscription_cancelled_before_the_checkpoint_is_still_found(self, stripe_lists):
+        objects, _ = stripe_lists
+        order = OrderFactory(billing_mode='recurring', status='active', stripe_subscription_id='sub_old')
+        _settled(order)
+        objects['Subscription'].append({'id': 'sub_old', 'status': 'canceled'})
+        ReconciliationCheckpoint.objects.create(resource='subscriptions', reconciled_until=timezone.now())
+
+        output = self._run('--resource', 'subscriptions')
+
+        assert 'sub_old: order_not_cancelled' in output
+
+    def test_pending_payment_is_checked_after_its_window(self, stripe_lists):
+        objects, _ = stripe_lists
+        payment = PaymentFactory(stripe_payment_intent_id='pi_late', status='pending')
+        _settled(payment, created_at=timezone.now() - timedelta(days=3))
+        objects['PaymentIntent'].append({'id': 'pi_late', 'status': 'succeeded', 'metadata': {}})
+        ReconciliationCheckpoint.objects.create(resource='payment_intents', reconciled_until=timezone.now())
+
+        output = self._run('--resource', 'payment_intents')
+
+        assert 'pi_late: payment_not_succeeded' in output
+
+    def test_discrepancy_stays_open_until_the_objects_agree(self, stripe_lists):
+        objects, _ = stripe_lists
+        objects['Transfer'].append({'id': 'tr_lost', 'metadata': {'payout_id': '9'}})
+
+        self._run('--resource', 'transfers')
+        output = self._run('--resource', 'transfers')
+
+        discrepancy = ReconciliationDiscrepancy.objects.get(stripe_id='tr_lost')
+        assert discrepancy.problem == 'missing_payout'
+        assert discrepancy.resolved_at is None
+        assert 'Checked: 1, Discrepancies: 1' in output
+
+        PayoutFactory(stripe_transfer_id='tr_lost', status='completed')
+        output = self._run('--resource', 'transfers')
+
+        discrepancy.refresh_from_db()
+        assert discrepancy.resolved_at is not None
+        assert 'Resolved: 1' in output
+        assert ReconciliationDiscrepancy.objects.count() == 1
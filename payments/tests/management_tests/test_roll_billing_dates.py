@@ -0,0 +1,66 @@
+import pytest
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+
+from events.models import Order
+from events.tests.factories.order_factory import OrderFactory
+from events.utils import checkout_session_cache
+
+
+@pytest.mark.django_db
+class TestRollBillingDatesCommand:
+
+    def _order(self, **overrides):
+        defaults = dict(billing_mode='recurring', frequency='weekly', status='active',
+                        start_date=date.today() - timedelta(days=60))
+        defaults.update(overrides)
+        return OrderFactory(**defaults)
+
+    def test_rolls_past_dates_forward(self, settings):
+        settings.SUBSCRIPTION_CHARGE_LEAD_DAYS = 7
+        order = self._order()
+        Order.objects.filter(pk=order.pk).update(
+            next_payment_date=date.today() - timedelta(days=3),
+            next_delivery_date=date.today() + timedelta(days=4),
+        )
+        out = StringIO()
+
+        call_command('roll_billing_dates', stdout=out)
+
+        order.refresh_from_db()
+        assert date.today() < order.next_payment_date <= date.today() + timedelta(weeks=1)
+        assert order.next_delivery_date == order.next_payment_date + timedelta(days=7)
+        assert 'Updated: 1' in out.getvalue()
+
+    def test_rolled_orders_have_their_checkout_version_bumped(self):
+        order = self._order()
+        Order.objects.filter(pk=order.pk).update(next_payment_date=date.today() - timedelta(days=3))
+        before = checkout_session_cache.current_version(order.pk)
+
+        call_command('roll_billing_dates', stdout=StringIO())
+
+        assert checkout_session_cache.current_version(order.pk) != before
+
+    def test_fills_missing_dates_and_leaves_current_ones(self):
+        missing = self._order()
+        current = self._order()
+        Order.objects.filter(pk=missing.pk).update(next_payment_date=None, next_delivery_date=None)
+        current_date = Order.objects.get(pk=current.pk).next_payment_date
+        out = StringIO()
+
+        call_command('roll_billing_dates', '--batch-size', '1', stdout=out)
+
+        missing.refresh_from_db()
+        assert missing.next_payment_date is not None
+        assert Order.objects.get(pk=current.pk).next_payment_date == current_date
+        assert 'Updated: 1' in out.getvalue()
+
+    def test_ignores_cancelled_orders(self):
+        order = self._order(status='cancelled')
+        Order.objects.filter(pk=order.pk).update(next_payment_date=date.today() - timedelta(days=1))
+        out = StringIO()
+
+        call_command('roll_billing_dates', stdout=out)
+
+        assert 'Updated: 0' in out.getvalue()
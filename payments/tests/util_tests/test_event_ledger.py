@@ -0,0 +1,85 @@
+import pytest
+
+from payments.models import WebhookEvent
+from payments.utils import event_ledger
+
+
+@pytest.fixture(autouse=True)
+def empty_ledger_cache():
+    event_ledger.forget_all()
+    yield
+    event_ledger.forget_all()
+
+
+def make_event(event_id):
+    return {
+        'id': event_id,
+        'type': 'payment_intent.payment_failed',
+        'data': {'object': {'id': 'pi_ledger', 'object': 'payment_intent'}},
+    }
+
+
+@pytest.mark.django_db
+class TestEventLedger:
+
+    def test_unknown_event_is_not_seen(self):
+        assert event_ledger.already_seen('evt_new') is False
+
+    def test_event_without_id_is_never_seen(self):
+        assert event_ledger.already_seen(None) is False
+
+    def test_tracked_success_is_recorded_with_duration(self):
+        with event_ledger.track(make_event('evt_ok')):
+            pass
+
+        row = WebhookEvent.objects.get(stripe_event_id='evt_ok')
+        assert row.status == 'processed'
+        assert row.duration_ms is not None
+        assert event_ledger.already_seen('evt_ok') is True
+
+    def test_tracked_failure_is_recorded_and_reraised(self):
+        with pytest.raises(RuntimeError):
+            with event_ledger.track(make_event('evt_fail')):
+                raise RuntimeError('boom')
+
+        row = WebhookEvent.objects.get(stripe_event_id='evt_fail')
+        assert row.status == 'failed_inline'
+        assert row.last_error == 'RuntimeError: boom'
+        assert event_ledger.already_seen('evt_fail') is False
+
+    def test_retry_after_failure_updates_same_row(self):
+        with pytest.raises(RuntimeError):
+            with event_ledger.track(make_event('evt_again')):
+                raise RuntimeError('boom')
+        with event_ledger.track(make_event('evt_again')):
+            pass
+
+        row = WebhookEvent.objects.get(stripe_event_id='evt_again')
+        assert row.status == 'processed'
+        assert row.attempts == 2
+
+    def test_cached_id_answers_without_a_query(self, django_assert_num_queries):
+        event_ledger.remember('evt_cached')
+
+        with django_assert_num_queries(0):
+            assert event_ledger.already_seen('evt_cached') is True
+
+    def test_database_hit_warms_the_cache(self, django_assert_num_queries):
+        WebhookEvent.objects.create(
+            stripe_event_id='evt_db', event_type='account.updated', payload={}, status='processed',
+        )
+        assert event_ledger.already_seen('evt_db') is True
+
+        with django_assert_num_queries(0):
+            assert event_ledger.already_seen('evt_db') is True
+
+    def test_cache_evicts_least_recently_used(self):
+        recent = event_ledger._RecentEventIds(maxsize=2)
+        recent.add('a')
+        recent.add('b')
+        assert 'a' in recent
+        recent.add('c')
+
+        assert 'a' in recent
+        assert 'b' not in recent
+        assert 'c' in recent
@@ -0,0 +1,69 @@
+import pytest
+import stripe
+from django.core.cache import cache
+
+from payments.models import InvoicePaymentIntent
+from payments.utils.invoice_payments import (
+    handle_invoice_payment_paid,
+    lookup_payment_intent_id,
+    record_invoice_payment_intent,
+)
+from payments.utils.webhook_handlers import _invoice_payment_intent_id
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestInvoicePaymentIntentMap:
+
+    def test_invoice_payment_paid_event_records_the_mapping(self):
+        handle_invoice_payment_paid({
+            'id': 'inpay_1', 'invoice': 'in_1',
+            'payment': {'type': 'payment_intent', 'payment_intent': 'pi_1'},
+        })
+
+        assert lookup_payment_intent_id('in_1') == 'pi_1'
+
+    def test_non_payment_intent_payments_are_ignored(self):
+        handle_invoice_payment_paid({'invoice': 'in_2', 'payment': {'type': 'payment_record', 'payment_record': 'pr_1'}})
+
+        assert not InvoicePaymentIntent.objects.exists()
+
+    def test_first_recorded_payment_intent_wins(self):
+        record_invoice_payment_intent('in_3', 'pi_first')
+        record_invoice_payment_intent('in_3', 'pi_second')
+
+        assert lookup_payment_intent_id('in_3') == 'pi_first'
+
+    def test_lookups_are_cached(self, django_assert_num_queries):
+        record_invoice_payment_intent('in_4', 'pi_4')
+        lookup_payment_intent_id('in_4')
+
+        with django_assert_num_queries(0):
+            assert lookup_payment_intent_id('in_4') == 'pi_4'
+
+    def test_unknown_invoice_returns_none(self):
+        assert lookup_payment_intent_id('in_unknown') is None
+
+
+@pytest.mark.django_db
+class TestInvoicePaymentIntentResolution:
+
+    def test_known_invoice_resolves_without_calling_stripe(self, mocker):
+        retrieve = mocker.patch.object(stripe.Invoice, 'retrieve')
+        record_invoice_payment_intent('in_5', 'pi_5')
+
+        assert _invoice_payment_intent_id({'id': 'in_5'}) == 'pi_5'
+        retrieve.assert_not_called()
+
+    def test_stripe_fallback_result_is_remembered(self, mocker):
+        retrieve = mocker.patch.object(stripe.Invoice, 'retrieve', return_value={
+            'payments': {'data': [{'payment': {'payment_intent': 'pi_6'}}]},
+        })
+
+        assert _invoice_payment_intent_id({'id': 'in_6'}) == 'pi_6'
+        assert _invoice_payment_intent_id({'id': 'in_6'}) == 'pi_6'
+        retrieve.assert_called_once()
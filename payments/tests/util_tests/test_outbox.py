@@ -0,0 +1,112 @@
+import pytest
+import requests
+from datetime import timedelta
+from django.utils import timezone
+
+from payments.models import OutboxMessage
+from payments.utils import outbox
+from payments.utils.webhook_handlers import handle_payment_intent_succeeded
+from payments.tests.factories.payment_factory import PaymentFactory
+from events.tests.factories.order_factory import OrderFactory
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_enqueue_sends_only_after_commit(self, mocker, django_capture_on_commit_callbacks):
+        sender = mocker.patch.dict(outbox.SENDERS, {'admin_cancellation': mocker.Mock()})
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            message = outbox.enqueue('admin_cancellation', message='Order 1 cancelled')
+
+        assert OutboxMessage.objects.get(pk=message.pk).status == 'pending'
+        sender['admin_cancellation'].assert_not_called()
+
+        for callback in callbacks:
+            callback()
+
+        sender['admin_cancellation'].assert_called_once_with({'message': 'Order 1 cancelled'})
+        assert OutboxMessage.objects.get(pk=message.pk).status == 'sent'
+
+    def test_message_is_only_sent_once(self, mocker):
+        sender = mocker.Mock()
+        mocker.patch.dict(outbox.SENDERS, {'admin_cancellation': sender})
+        message = OutboxMessage.objects.create(kind='admin_cancellation', payload={'message': 'x'})
+
+        assert outbox.dispatch_message(message.pk) is True
+        assert outbox.dispatch_message(message.pk) is False
+        sender.assert_called_once()
+
+    def test_sender_error_marks_failed(self, mocker):
+        mocker.patch.dict(outbox.SENDERS, {'admin_cancellation': mocker.Mock(side_effect=RuntimeError('down'))})
+        message = OutboxMessage.objects.create(kind='admin_cancellation', payload={'message': 'x'})
+
+        assert outbox.dispatch_message(message.pk) is False
+
+        message.refresh_from_db()
+        assert message.status == 'failed'
+        assert message.attempts == 1
+        assert 'RuntimeError: down' in message.last_error
+
+    def test_message_left_sending_is_requeued_once_stale(self, mocker):
+        sender = mocker.Mock()
+        mocker.patch.dict(outbox.SENDERS, {'admin_cancellation': sender})
+        stuck = OutboxMessage.objects.create(
+            kind='admin_cancellation', payload={'message': 'stuck'}, status='sending',
+            sending_started_at=timezone.now() - timedelta(hours=1),
+        )
+        OutboxMessage.objects.create(
+            kind='admin_cancellation', payload={'message': 'in flight'}, status='sending',
+            sending_started_at=timezone.now(),
+        )
+
+        assert outbox.release_stale_sends() == 1
+        assert outbox.dispatch_message(stuck.pk) is True
+        sender.assert_called_once_with({'message': 'stuck'})
+
+    def test_dispatch_pending_skips_fresh_and_failed_messages(self, mocker):
+        sender = mocker.Mock()
+        mocker.patch.dict(outbox.SENDERS, {'admin_cancellation': sender})
+        old = OutboxMessage.objects.create(kind='admin_cancellation', payload={'message': 'old'})
+        OutboxMessage.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        OutboxMessage.objects.create(kind='admin_cancellation', payload={'message': 'fresh'})
+        OutboxMessage.objects.create(kind='admin_cancellation', payload={'message': 'failed'}, status='failed')
+
+        sent, failed = outbox.dispatch_pending(older_than=timedelta(minutes=1))
+
+        assert (sent, failed) == (1, 0)
+        sender.assert_called_once_with({'message': 'old'})
+
+    def test_customer_confirmation_sender_loads_order(self, mocker):
+        send = mocker.patch('payments.utils.outbox.send_customer_payment_notification')
+        order = OrderFactory()
+
+        outbox.SENDERS['customer_payment_confirmation']({'order_id': order.pk})
+
+        send.assert_called_once_with(order.user, order, raise_errors=True)
+
+    def test_provider_failure_marks_the_message_failed(self, mocker):
+        response = requests.Response()
+        response.status_code = 503
+        mocker.patch('payments.utils.send_customer_payment_notification.post_mailgun_message', return_value=response)
+        order = OrderFactory()
+        message = OutboxMessage.objects.create(kind='customer_payment_confirmation', payload={'order_id': order.pk})
+
+        assert outbox.dispatch_message(message.pk) is False
+
+        message.refresh_from_db()
+        assert message.status == 'failed'
+        assert message.last_error.startswith('HTTPError: 503')
+
+
+@pytest.mark.django_db
+def test_payment_webhook_queues_notifications_instead_of_sending(mocker):
+    send = mocker.patch('payments.utils.outbox.send_customer_payment_notification')
+    order = OrderFactory(billing_mode='one_time', status='pending_payment')
+    PaymentFactory(user=order.user, order=order, stripe_payment_intent_id='pi_outbox', status='pending')
+
+    handle_payment_intent_succeeded({'id': 'pi_outbox'})
+
+    send.assert_not_called()
+    kinds = sorted(OutboxMessage.objects.values_list('kind', flat=True))
+    assert kinds == ['admin_payment_received', 'customer_payment_confirmation']
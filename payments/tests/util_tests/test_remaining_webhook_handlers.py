@@ -28,3 +28,29 @@ class TestHandlePaymentIntentFailed:
         handle_payment_intent_failed({'id': 'pi_fail_3'})
         payment.refresh_from_db()
         assert payment.status == 'failed'
+
+
+@pytest.mark.django_db
+class TestHandleInvoicePaymentSucceededBillingDates:
+
+    def test_paid_invoice_rolls_the_stored_billing_dates(self):
+        from datetime import date, timedelta
+        from events.models import Order
+        from events.tests.factories.order_factory import OrderFactory
+        from payments.utils.webhook_handlers import handle_invoice_payment_succeeded
+
+        order = OrderFactory(
+            billing_mode='recurring', frequency='weekly', status='active',
+            start_date=date.today() - timedelta(days=30), stripe_subscription_id='sub_roll',
+        )
+        Order.objects.filter(pk=order.pk).update(next_payment_date=date.today() - timedelta(days=1))
+
+        handle_invoice_payment_succeeded({
+            'id': 'in_roll',
+            'subscription': 'sub_roll',
+            'payment_intent': 'pi_roll',
+            'amount_paid': 5000,
+        })
+
+        order.refresh_from_db()
+        assert order.next_payment_date > date.today()
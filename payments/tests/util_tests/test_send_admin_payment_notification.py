@@ -18,7 +18,7 @@ class TestSendAdminPaymentNotification:
         settings.ADMIN_EMAIL = ''
         settings.ADMIN_NUMBER = '+15550001111'
 
-        with patch('payments.utils.send_admin_payment_notification.requests.post') as mock_post:
+        with patch('payments.utils.send_admin_payment_notification.post_mailgun_message') as mock_post:
             send_admin_payment_notification('pay_456')
 
         mock_post.assert_not_called()
@@ -27,7 +27,7 @@ class TestSendAdminPaymentNotification:
         settings.ADMIN_EMAIL = 'admin@example.com'
         settings.ADMIN_NUMBER = ''
 
-        with patch('payments.utils.send_admin_payment_notification.requests.post') as mock_post:
+        with patch('payments.utils.send_admin_payment_notification.post_mailgun_message') as mock_post:
             send_admin_payment_notification('pay_789')
 
         mock_post.assert_not_called()
@@ -45,7 +45,7 @@ class TestSendAdminPaymentNotification:
         mock_response = MagicMock()
         mock_response.raise_for_status.side_effect = Exception('503 error')
 
-        with patch('payments.utils.send_admin_payment_notification.requests.post',
+        with patch('payments.utils.send_admin_payment_notification.post_mailgun_message',
                    return_value=mock_response):
             send_admin_payment_notification('pay_fail')  # must not raise
 
@@ -58,7 +58,7 @@ class TestSendAdminCancellationNotification:
         settings.ADMIN_EMAIL = ''
         settings.ADMIN_NUMBER = '+15550001111'
 
-        with patch('payments.utils.send_admin_payment_notification.requests.post') as mock_post:
+        with patch('payments.utils.send_admin_payment_notification.post_mailgun_message') as mock_post:
             send_admin_cancellation_notification('some event')
 
         mock_post.assert_not_called()
@@ -76,6 +76,6 @@ class TestSendAdminCancellationNotification:
         mock_response = MagicMock()
         mock_response.raise_for_status.side_effect = Exception('error')
 
-        with patch('payments.utils.send_admin_payment_notification.requests.post',
+        with patch('payments.utils.send_admin_payment_notification.post_mailgun_message',
                    return_value=mock_response):
             send_admin_cancellation_notification('event')  # must not raise
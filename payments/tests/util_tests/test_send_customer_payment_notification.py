@@ -18,25 +18,25 @@ class TestSendCustomerPaymentNotification:
         plan = OrderFactory(billing_mode='one_time', user=user)
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
             return_value=self._make_mock_response(),
         ) as mock_post:
             send_customer_payment_notification(user, plan)
 
         mock_post.assert_called_once()
-        assert 'customer@example.com' in mock_post.call_args.kwargs['data']['to']
+        assert 'customer@example.com' in mock_post.call_args.args[0]['to']
 
     def test_email_body_contains_customer_first_name(self):
         user = UserFactory(first_name='Bob', email='bob@example.com')
         plan = OrderFactory(billing_mode='one_time', user=user)
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
             return_value=self._make_mock_response(),
         ) as mock_post:
             send_customer_payment_notification(user, plan)
 
-        body = mock_post.call_args.kwargs['data']['text']
+        body = mock_post.call_args.args[0]['text']
         assert 'Bob' in body
 
     def test_email_body_contains_recipient_name(self):
@@ -48,12 +48,12 @@ class TestSendCustomerPaymentNotification:
         )
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
             return_value=self._make_mock_response(),
         ) as mock_post:
             send_customer_payment_notification(user, plan)
 
-        body = mock_post.call_args.kwargs['data']['text']
+        body = mock_post.call_args.args[0]['text']
         assert 'Carol Smith' in body
 
     def test_email_body_contains_start_date_and_budget(self):
@@ -61,12 +61,12 @@ class TestSendCustomerPaymentNotification:
         plan = OrderFactory(billing_mode='one_time', user=user)
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
             return_value=self._make_mock_response(),
         ) as mock_post:
             send_customer_payment_notification(user, plan)
 
-        body = mock_post.call_args.kwargs['data']['text']
+        body = mock_post.call_args.args[0]['text']
         assert str(plan.start_date) in body
         assert str(plan.budget) in body
 
@@ -75,7 +75,7 @@ class TestSendCustomerPaymentNotification:
         plan = OrderFactory(billing_mode='one_time', user=user)
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
         ) as mock_post:
             send_customer_payment_notification(user, plan)
 
@@ -89,7 +89,20 @@ class TestSendCustomerPaymentNotification:
         mock_response.raise_for_status.side_effect = Exception('503 Service Unavailable')
 
         with patch(
-            'payments.utils.send_customer_payment_notification.requests.post',
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
             return_value=mock_response,
         ):
             send_customer_payment_notification(user, plan)  # must not raise
+
+    def test_mailgun_error_is_raised_when_asked(self):
+        user = UserFactory(email='fail@example.com')
+        plan = OrderFactory(billing_mode='one_time', user=user)
+
+        mock_response = MagicMock()
+        mock_response.raise_for_status.side_effect = Exception('503 Service Unavailable')
+
+        with patch(
+            'payments.utils.send_customer_payment_notification.post_mailgun_message',
+            return_value=mock_response,
+        ), pytest.raises(Exception, match='503'):
+            send_customer_payment_notification(user, plan, raise_errors=True)
@@ -42,6 +42,12 @@ def no_stripe_customer_call(mocker):
     )
 
 
+@pytest.fixture(autouse=True)
+def empty_stripe_object_cache():
+    from django.core.cache import cache
+    cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def fake_product_cache(mocker):
     store = {}
@@ -0,0 +1,87 @@
+import pytest
+import stripe
+from django.core.cache import cache
+
+from payments.utils import stripe_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+class TestPaymentIntentSnapshot:
+
+    def test_second_read_skips_stripe(self, mocker):
+        retrieve = mocker.patch.object(
+            stripe.PaymentIntent, 'retrieve',
+            return_value=mocker.Mock(status='requires_payment_method', amount=5000, client_secret='pi_1_secret'),
+        )
+
+        first = stripe_cache.payment_intent_snapshot('pi_1')
+        second = stripe_cache.payment_intent_snapshot('pi_1')
+
+        assert first == second == {'status': 'requires_payment_method', 'amount': 5000, 'client_secret': 'pi_1_secret'}
+        retrieve.assert_called_once_with('pi_1')
+
+    def test_invalidate_forces_a_fresh_read(self, mocker):
+        retrieve = mocker.patch.object(
+            stripe.PaymentIntent, 'retrieve',
+            return_value=mocker.Mock(status='succeeded', amount=5000, client_secret='s'),
+        )
+
+        stripe_cache.payment_intent_snapshot('pi_1')
+        stripe_cache.invalidate('pi_1', None)
+        stripe_cache.payment_intent_snapshot('pi_1')
+
+        assert retrieve.call_count == 2
+
+    def test_stripe_errors_are_not_cached(self, mocker):
+        retrieve = mocker.patch.object(stripe.PaymentIntent, 'retrieve', side_effect=stripe.error.APIConnectionError('down'))
+
+        for _ in range(2):
+            with pytest.raises(stripe.error.StripeError):
+                stripe_cache.payment_intent_snapshot('pi_1')
+
+        assert retrieve.call_count == 2
+
+
+class TestSubscriptionSnapshot:
+
+    def test_flattens_the_latest_invoice(self, mocker):
+        mocker.patch.object(stripe.Subscription, 'retrieve', return_value=mocker.Mock(
+            status='incomplete',
+            latest_invoice=mocker.Mock(amount_due=8000, confirmation_secret=mocker.Mock(client_secret='pi_2_secret')),
+        ))
+
+        assert stripe_cache.subscription_snapshot('sub_1') == {
+            'status': 'incomplete', 'amount_due': 8000, 'client_secret': 'pi_2_secret',
+        }
+
+    def test_missing_invoice_gives_empty_fields(self, mocker):
+        mocker.patch.object(stripe.Subscription, 'retrieve', return_value=mocker.Mock(status='active', latest_invoice=None))
+
+        snapshot = stripe_cache.subscription_snapshot('sub_1')
+
+        assert snapshot['amount_due'] is None
+        assert snapshot['client_secret'] is None
+
+
+class TestInvalidateForEvent:
+
+    def test_invoice_event_drops_its_subscription(self):
+        cache.set('stripe_object:sub_9', {'status': 'incomplete'})
+        cache.set('stripe_object:pi_9', {'status': 'requires_payment_method'})
+        event = {
+            'type': 'invoice.payment_succeeded',
+            'data': {'object': {
+                'id': 'in_9',
+                'payment_intent': 'pi_9',
+                'parent': {'subscription_details': {'subscription': 'sub_9'}},
+            }},
+        }
+
+        stripe_cache.invalidate_for_event(event)
+
+        assert cache.get('stripe_object:sub_9') is None
+        assert cache.get('stripe_object:pi_9') is None
@@ -0,0 +1,75 @@
+import logging
+
+import stripe
+
+from payments.utils.stripe_client import (
+    InstrumentedRequestsClient,
+    configure_stripe,
+    idempotency_key,
+)
+
+
+class TestConfigureStripe:
+
+    def test_sets_key_retries_and_pooled_client(self, settings):
+        settings.STRIPE_SECRET_KEY = 'sk_test_configured'
+        settings.STRIPE_MAX_NETWORK_RETRIES = 3
+        settings.STRIPE_CONNECT_TIMEOUT = 2
+        settings.STRIPE_READ_TIMEOUT = 9
+
+        configure_stripe(force=True)
+
+        assert stripe.api_key == 'sk_test_configured'
+        assert stripe.max_network_retries == 3
+        client = stripe.default_http_client
+        assert isinstance(client, InstrumentedRequestsClient)
+        assert client._timeout == (2, 9)
+        assert client._session.get_adapter('https://api.stripe.com')._pool_maxsize == settings.STRIPE_HTTP_POOL_SIZE
+
+    def test_is_a_no_op_once_configured(self):
+        configure_stripe(force=True)
+        client = stripe.default_http_client
+
+        configure_stripe()
+
+        assert stripe.default_http_client is client
+
+
+class TestInstrumentedRequestsClient:
+
+    def test_logs_method_path_and_status(self, mocker, caplog):
+        mocker.patch('stripe.RequestsClient.request', return_value=('{}', 200, {}))
+        client = InstrumentedRequestsClient()
+
+        with caplog.at_level(logging.DEBUG, logger='payments.utils.stripe_client'):
+            result = client.request('post', 'https://api.stripe.com/v1/transfers?expand=x', {}, 'a=1')
+
+        assert result == ('{}', 200, {})
+        assert 'Stripe POST /v1/transfers -> 200' in caplog.text
+
+    def test_slow_calls_log_a_warning(self, mocker, caplog, settings):
+        settings.STRIPE_SLOW_CALL_MS = 0
+        mocker.patch('stripe.RequestsClient.request', return_value=('{}', 200, {}))
+
+        with caplog.at_level(logging.WARNING, logger='payments.utils.stripe_client'):
+            InstrumentedRequestsClient().request('get', 'https://api.stripe.com/v1/accounts/acct_1', {})
+
+        assert caplog.records[0].levelno == logging.WARNING
+
+    def test_failed_calls_are_still_logged(self, mocker, caplog):
+        mocker.patch('stripe.RequestsClient.request', side_effect=stripe.APIConnectionError('boom'))
+
+        with caplog.at_level(logging.DEBUG, logger='payments.utils.stripe_client'):
+            try:
+                InstrumentedRequestsClient().request('get', 'https://api.stripe.com/v1/charges', {})
+            except stripe.APIConnectionError:
+                pass
+
+        assert '/v1/charges -> error' in caplog.text
+
+
+class TestIdempotencyKey:
+
+    def test_is_deterministic_per_parts(self):
+        assert idempotency_key('payout', 7) == idempotency_key('payout', 7)
+        assert idempotency_key('payout', 7) != idempotency_key('payout', 8)
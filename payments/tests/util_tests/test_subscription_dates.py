@@ -1,7 +1,14 @@
 import pytest
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
-from payments.utils.subscription_dates import get_next_payment_date, get_next_delivery_date
+from payments.utils.subscription_dates import (
+    get_next_delivery_date,
+    get_next_delivery_dates,
+    get_next_payment_date,
+    get_next_payment_dates,
+    next_payment_date,
+    next_payment_dates,
+)
 from events.tests.factories.order_factory import OrderFactory
 
 @pytest.mark.django_db
@@ -20,16 +27,14 @@ def test_get_next_payment_date_past_anchor(settings):
     start = date.today() - relativedelta(months=1)
     plan = OrderFactory(billing_mode='recurring', start_date=start, frequency='monthly')
     
-    # Next payment should be anchor + 2 months (since anchor + 1 month is also in the past or today)
-    # Wait, anchor = start - 6 days.
-    # next_date = anchor
-    # while next_date <= today: next_date += 1 month
-    
+    # Next payment is the first anchor + n months after today, counted from
+    # the anchor itself so a 31st anchor does not drift to the 28th.
     anchor = start - timedelta(days=6)
-    expected = anchor
-    while expected <= date.today():
-        expected += relativedelta(months=1)
-        
+    months = 1
+    while anchor + relativedelta(months=months) <= date.today():
+        months += 1
+    expected = anchor + relativedelta(months=months)
+
     assert get_next_payment_date(plan) == expected
 
 @pytest.mark.django_db
@@ -40,3 +45,50 @@ def test_get_next_delivery_date(settings):
     
     # next payment is in 4 days, so next delivery is in 4+6 = 10 days (the start_date)
     assert get_next_delivery_date(plan) == start
+
+
+def test_monthly_dates_do_not_drift_from_a_month_end_anchor():
+    # Anchor Jan 31: the loop this replaced gave Feb 28 -> Mar 28.
+    assert next_payment_date(date(2025, 2, 7), 'monthly', 7, today=date(2025, 3, 1)) == date(2025, 3, 31)
+    assert next_payment_date(date(2025, 2, 7), 'monthly', 7, today=date(2025, 2, 1)) == date(2025, 2, 28)
+
+
+def test_old_weekly_subscription_is_computed_directly():
+    start = date(2000, 1, 10)
+    today = date(2025, 6, 15)
+
+    result = next_payment_date(start, 'weekly', 7, today=today)
+
+    assert today < result <= today + timedelta(weeks=1)
+    assert (result - (start - timedelta(days=7))).days % 7 == 0
+
+
+def test_billing_date_equal_to_today_rolls_forward():
+    assert next_payment_date(date(2025, 1, 8), 'fortnightly', 7, today=date(2025, 1, 15)) == date(2025, 1, 29)
+
+
+def test_leap_day_anchor_bills_on_feb_28_in_common_years():
+    assert next_payment_date(date(2024, 3, 7), 'annually', 7, today=date(2024, 3, 1)) == date(2025, 2, 28)
+
+
+def test_batch_matches_scalar_for_every_frequency():
+    today = date(2025, 6, 15)
+    starts = [date(2021, 1, 31), date(2024, 2, 29), date(2025, 7, 1), None, date(2020, 5, 5), date(2019, 8, 31), date(2023, 3, 3)]
+    frequencies = ['monthly', 'annually', 'weekly', 'monthly', 'fortnightly', 'bogus', 'weekly']
+
+    batch = next_payment_dates(starts, frequencies, 7, today=today)
+
+    assert batch == [next_payment_date(s, f, 7, today=today) for s, f in zip(starts, frequencies)]
+    assert batch[3] is None and batch[5] is None
+
+
+@pytest.mark.django_db
+def test_order_batch_helpers_match_the_single_order_versions(settings):
+    settings.SUBSCRIPTION_CHARGE_LEAD_DAYS = 6
+    orders = [
+        OrderFactory(billing_mode='recurring', start_date=date.today() - timedelta(days=400), frequency='weekly'),
+        OrderFactory(billing_mode='recurring', start_date=date.today() + timedelta(days=3), frequency='monthly'),
+    ]
+
+    assert get_next_payment_dates(orders) == [get_next_payment_date(o) for o in orders]
+    assert get_next_delivery_dates(orders) == [get_next_delivery_date(o) for o in orders]
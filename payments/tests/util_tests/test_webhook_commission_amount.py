@@ -11,7 +11,7 @@ class TestWebhookCommissionAmount:
 
     def test_one_time_order_event_gets_commission_amount(self, mocker):
         """Event created for a one-time order has commission_amount set from budget."""
-        mocker.patch('payments.utils.webhook_handlers.send_customer_payment_notification')
+        mocker.patch('payments.utils.outbox.send_customer_payment_notification')
 
         # budget=150: not < 150, is < 200 → tier gives $15
         plan = OrderFactory(billing_mode='one_time', status='pending_payment', budget=Decimal('150'), frequency='annually')
@@ -36,7 +36,7 @@ class TestWebhookCommissionAmount:
 
     def test_one_time_order_commission_amount_varies_with_budget(self, mocker):
         """Commission amount snapshot reflects the tier for the plan's budget."""
-        mocker.patch('payments.utils.webhook_handlers.send_customer_payment_notification')
+        mocker.patch('payments.utils.outbox.send_customer_payment_notification')
 
         # budget=75 → tier gives $5
         plan = OrderFactory(billing_mode='one_time', status='pending_payment', budget=Decimal('75'), frequency='annually')
@@ -59,7 +59,7 @@ class TestWebhookCommissionAmount:
 
     def test_subscription_plan_first_event_gets_commission_amount(self, mocker):
         """First event created for a new subscription has commission_amount set."""
-        mocker.patch('payments.utils.webhook_handlers.send_customer_payment_notification')
+        mocker.patch('payments.utils.outbox.send_customer_payment_notification')
 
         # stripe_subscription_id already set → skips Stripe Subscription.create block
         plan = OrderFactory(
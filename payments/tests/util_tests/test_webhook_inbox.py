@@ -0,0 +1,190 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from payments.models import WebhookEvent
+from payments.utils import event_ledger, webhook_dispatch
+from payments.utils.webhook_inbox import (
+    claim_batch,
+    group_by_ordering_key,
+    process_lane,
+    process_webhook_event,
+    queue_depth,
+    release_stale_locks,
+    store_webhook_event,
+)
+
+
+def make_event(event_id, event_type='payment_intent.payment_failed', obj=None):
+    return {
+        'id': event_id,
+        'type': event_type,
+        'data': {'object': obj or {'id': f'pi_{event_id}', 'object': 'payment_intent'}},
+    }
+
+
+@pytest.mark.django_db
+class TestStoreWebhookEvent:
+
+    def test_stores_event_as_pending(self):
+        assert store_webhook_event(make_event('evt_1')) is True
+
+        row = WebhookEvent.objects.get(stripe_event_id='evt_1')
+        assert row.status == 'pending'
+        assert row.payload['type'] == 'payment_intent.payment_failed'
+
+    def test_duplicate_event_is_stored_once(self):
+        store_webhook_event(make_event('evt_dup'))
+        assert store_webhook_event(make_event('evt_dup')) is False
+        assert WebhookEvent.objects.filter(stripe_event_id='evt_dup').count() == 1
+
+    def test_order_metadata_sets_ordering_key(self):
+        store_webhook_event(make_event('evt_o', obj={'id': 'pi_1', 'metadata': {'order_id': '42'}}))
+        assert WebhookEvent.objects.get(stripe_event_id='evt_o').ordering_key == 'order:42'
+
+    def test_invoice_events_share_subscription_key(self):
+        invoice = {'id': 'in_1', 'object': 'invoice', 'parent': {'subscription_details': {'subscription': 'sub_9'}}}
+        store_webhook_event(make_event('evt_in', 'invoice.payment_succeeded', invoice))
+        store_webhook_event(make_event('evt_del', 'customer.subscription.deleted', {'id': 'sub_9'}))
+
+        keys = set(WebhookEvent.objects.values_list('ordering_key', flat=True))
+        assert keys == {'sub:sub_9'}
+
+
+@pytest.mark.django_db
+class TestProcessWebhookEvent:
+
+    def test_success_marks_processed(self, mocker):
+        handler = mocker.Mock()
+        mocker.patch.dict(webhook_dispatch.WEBHOOK_HANDLERS, {'payment_intent.payment_failed': handler})
+        store_webhook_event(make_event('evt_ok'))
+        row = claim_batch(10)[0]
+
+        assert process_webhook_event(row) is True
+
+        row.refresh_from_db()
+        assert row.status == 'processed'
+        assert row.attempts == 1
+        handler.assert_called_once_with({'id': 'pi_evt_ok', 'object': 'payment_intent'})
+
+    def test_failure_schedules_retry(self, mocker):
+        mocker.patch.dict(
+            webhook_dispatch.WEBHOOK_HANDLERS,
+            {'payment_intent.payment_failed': mocker.Mock(side_effect=RuntimeError('boom'))},
+        )
+        store_webhook_event(make_event('evt_retry'))
+        row = claim_batch(10)[0]
+
+        assert process_webhook_event(row, max_attempts=3) is False
+
+        row.refresh_from_db()
+        assert row.status == 'failed'
+        assert row.next_attempt_at > timezone.now()
+        assert 'RuntimeError: boom' in row.last_error
+
+    def test_failure_on_last_attempt_dead_letters(self, mocker):
+        mocker.patch.dict(
+            webhook_dispatch.WEBHOOK_HANDLERS,
+            {'payment_intent.payment_failed': mocker.Mock(side_effect=RuntimeError('boom'))},
+        )
+        store_webhook_event(make_event('evt_dead'))
+        WebhookEvent.objects.filter(stripe_event_id='evt_dead').update(attempts=2)
+        row = claim_batch(10)[0]
+
+        process_webhook_event(row, max_attempts=3)
+
+        row.refresh_from_db()
+        assert row.status == 'dead'
+
+
+@pytest.mark.django_db
+class TestClaimBatch:
+
+    def test_claimed_rows_are_marked_processing(self):
+        store_webhook_event(make_event('evt_a'))
+        store_webhook_event(make_event('evt_b'))
+
+        rows = claim_batch(10)
+
+        assert [r.stripe_event_id for r in rows] == ['evt_a', 'evt_b']
+        assert claim_batch(10) == []
+
+    def test_retry_not_due_is_not_claimed(self):
+        store_webhook_event(make_event('evt_later'))
+        WebhookEvent.objects.update(status='failed', next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        assert claim_batch(10) == []
+
+    def test_event_waits_behind_older_retry_for_same_order(self):
+        obj = {'id': 'pi_1', 'metadata': {'order_id': '7'}}
+        store_webhook_event(make_event('evt_first', obj=obj))
+        store_webhook_event(make_event('evt_second', obj=obj))
+        WebhookEvent.objects.filter(stripe_event_id='evt_first').update(
+            status='failed', next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        assert claim_batch(10) == []
+
+    def test_lanes_keep_arrival_order(self):
+        store_webhook_event(make_event('evt_1', obj={'id': 'pi_1', 'metadata': {'order_id': '1'}}))
+        store_webhook_event(make_event('evt_2', obj={'id': 'pi_2', 'metadata': {'order_id': '2'}}))
+        store_webhook_event(make_event('evt_3', obj={'id': 'pi_3', 'metadata': {'order_id': '1'}}))
+
+        lanes = group_by_ordering_key(claim_batch(10))
+
+        assert [[r.stripe_event_id for r in lane] for lane in lanes] == [['evt_1', 'evt_3'], ['evt_2']]
+
+    def test_inline_failure_is_left_to_stripe(self):
+        obj = {'id': 'pi_1', 'metadata': {'order_id': '7'}}
+        with pytest.raises(RuntimeError):
+            with event_ledger.track(make_event('evt_inline', obj=obj)):
+                raise RuntimeError('boom')
+        store_webhook_event(make_event('evt_queued', obj=obj))
+
+        assert [r.stripe_event_id for r in claim_batch(10)] == ['evt_queued']
+
+    def test_redelivered_inline_failure_is_queued(self):
+        with pytest.raises(RuntimeError):
+            with event_ledger.track(make_event('evt_switched')):
+                raise RuntimeError('boom')
+
+        assert store_webhook_event(make_event('evt_switched')) is False
+        assert [r.stripe_event_id for r in claim_batch(10)] == ['evt_switched']
+
+    def test_stale_lock_is_released(self):
+        store_webhook_event(make_event('evt_stuck'))
+        WebhookEvent.objects.update(status='processing', locked_at=timezone.now() - timedelta(hours=1))
+
+        assert release_stale_locks() == 1
+        assert [r.stripe_event_id for r in claim_batch(10)] == ['evt_stuck']
+
+
+@pytest.mark.django_db
+class TestProcessLane:
+
+    def test_failure_hands_rest_of_lane_back(self, mocker):
+        mocker.patch.dict(
+            webhook_dispatch.WEBHOOK_HANDLERS,
+            {'payment_intent.payment_failed': mocker.Mock(side_effect=RuntimeError('boom'))},
+        )
+        obj = {'id': 'pi_1', 'metadata': {'order_id': '3'}}
+        store_webhook_event(make_event('evt_1', obj=obj))
+        store_webhook_event(make_event('evt_2', obj=obj))
+
+        assert process_lane(claim_batch(10)) == (0, 1)
+
+        statuses = dict(WebhookEvent.objects.values_list('stripe_event_id', 'status'))
+        assert statuses == {'evt_1': 'failed', 'evt_2': 'pending'}
+
+
+@pytest.mark.django_db
+def test_queue_depth_counts_by_status():
+    store_webhook_event(make_event('evt_p'))
+    store_webhook_event(make_event('evt_d'))
+    WebhookEvent.objects.filter(stripe_event_id='evt_d').update(status='dead')
+
+    depth = queue_depth()
+
+    assert depth['pending'] == 1
+    assert depth['dead'] == 1
+    assert depth['failed'] == 0
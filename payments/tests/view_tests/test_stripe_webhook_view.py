@@ -2,7 +2,7 @@ import pytest
 import json
 from rest_framework.test import APIClient
 import stripe
-from payments.models import Payment
+from payments.models import Payment, WebhookEvent
 from payments.tests.factories.payment_factory import PaymentFactory
 from events.tests.factories.order_factory import OrderFactory
 
@@ -47,3 +47,47 @@ class TestStripeWebhookView:
         mocker.patch.object(stripe.Webhook, 'construct_event', side_effect=ValueError)
         response = self.client.post(self.url, data='{}', content_type='application/json', HTTP_STRIPE_SIGNATURE='sig_123')
         assert response.status_code == 400
+
+    def test_inbox_mode_stores_event_without_running_handler(self, mocker, settings):
+        settings.STRIPE_WEBHOOK_INBOX = True
+        payment = PaymentFactory(stripe_payment_intent_id='pi_inbox', status='pending')
+        webhook_event = self._get_webhook_event('payment_intent.payment_failed', {'id': 'pi_inbox'})
+        webhook_event['id'] = 'evt_inbox_1'
+        mocker.patch.object(stripe.Webhook, 'construct_event', return_value=webhook_event)
+
+        response = self.client.post(self.url, data=json.dumps(webhook_event), content_type='application/json', HTTP_STRIPE_SIGNATURE='sig_123')
+
+        assert response.status_code == 200
+        payment.refresh_from_db()
+        assert payment.status == 'pending'
+        assert WebhookEvent.objects.get(stripe_event_id='evt_inbox_1').status == 'pending'
+
+    def test_replayed_event_is_acknowledged_without_running_handler(self, mocker):
+        payment = PaymentFactory(stripe_payment_intent_id='pi_replay', status='pending')
+        webhook_event = self._get_webhook_event('payment_intent.payment_failed', {'id': 'pi_replay'})
+        webhook_event['id'] = 'evt_replay_1'
+        mocker.patch.object(stripe.Webhook, 'construct_event', return_value=webhook_event)
+
+        first = self.client.post(self.url, data=json.dumps(webhook_event), content_type='application/json', HTTP_STRIPE_SIGNATURE='sig_123')
+        payment.refresh_from_db()
+        payment.status = 'pending'
+        payment.save()
+        second = self.client.post(self.url, data=json.dumps(webhook_event), content_type='application/json', HTTP_STRIPE_SIGNATURE='sig_123')
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        payment.refresh_from_db()
+        assert payment.status == 'pending'
+        ledger_row = WebhookEvent.objects.get(stripe_event_id='evt_replay_1')
+        assert ledger_row.status == 'processed'
+        assert ledger_row.attempts == 1
+
+    def test_event_invalidates_cached_stripe_object(self, mocker):
+        from django.core.cache import cache
+        cache.set('stripe_object:pi_cached', {'status': 'requires_payment_method', 'amount': 100, 'client_secret': 's'})
+        webhook_event = self._get_webhook_event('payment_intent.payment_failed', {'id': 'pi_cached'})
+        mocker.patch.object(stripe.Webhook, 'construct_event', return_value=webhook_event)
+
+        self.client.post(self.url, data=json.dumps(webhook_event), content_type='application/json', HTTP_STRIPE_SIGNATURE='sig_123')
+
+        assert cache.get('stripe_object:pi_cached') is None
@@ -5,7 +5,7 @@ import stripe
 from django.conf import settings
 from django.core.cache import cache
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from payments.utils import stripe_cache
 
 STRIPE_MINIMUM_CHARGE = Decimal('0.50')
 
@@ -175,18 +175,13 @@ def _reuse_incomplete_subscription(order):
 
     expected_cents = _first_charge_cents(order)
     try:
-        subscription = stripe.Subscription.retrieve(
-            order.stripe_subscription_id,
-            expand=['latest_invoice.confirmation_secret'],
-        )
-        invoice = getattr(subscription, 'latest_invoice', None)
+        subscription = stripe_cache.subscription_snapshot(order.stripe_subscription_id)
         if (
-            subscription.status == 'incomplete'
-            and invoice is not None
-            and invoice.amount_due == expected_cents
-            and getattr(invoice, 'confirmation_secret', None)
+            subscription['status'] == 'incomplete'
+            and subscription['amount_due'] == expected_cents
+            and subscription['client_secret']
         ):
-            return invoice.confirmation_secret.client_secret
+            return subscription['client_secret']
     except stripe.error.StripeError:
         pass
 
@@ -212,6 +207,7 @@ def _clear_stale_subscription(order):
             stripe.Subscription.cancel(order.stripe_subscription_id)
         except stripe.error.StripeError:
             pass
+        stripe_cache.invalidate(order.stripe_subscription_id)
         order.stripe_subscription_id = None
         order.save(update_fields=['stripe_subscription_id'])
     Payment.objects.filter(order=order, status='pending').delete()
@@ -242,16 +238,19 @@ def reuse_or_cancel_pending_payment_intent(order, amount_in_cents):
             stripe.PaymentIntent.cancel(existing_payment.stripe_payment_intent_id)
         except stripe.error.StripeError:
             pass
+        stripe_cache.invalidate(existing_payment.stripe_payment_intent_id)
         existing_payment.delete()
         return None
 
+    payment_intent_id = existing_payment.stripe_payment_intent_id
     try:
-        payment_intent = stripe.PaymentIntent.retrieve(existing_payment.stripe_payment_intent_id)
-        if payment_intent.amount == amount_in_cents:
-            return payment_intent.client_secret
-        stripe.PaymentIntent.cancel(existing_payment.stripe_payment_intent_id)
+        payment_intent = stripe_cache.payment_intent_snapshot(payment_intent_id)
+        if payment_intent['amount'] == amount_in_cents:
+            return payment_intent['client_secret']
+        stripe.PaymentIntent.cancel(payment_intent_id)
         existing_payment.delete()
     except stripe.error.StripeError:
         existing_payment.delete()
+    stripe_cache.invalidate(payment_intent_id)
 
     return None
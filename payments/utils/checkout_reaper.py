@@ -0,0 +1,139 @@
+"""
+Deletes guest checkouts whose session expired without a payment.
+
+Expired CheckoutSessions are found through the index on `expires_at` and
+handled in primary-key batches. For each draft order the Stripe objects that
+checkout left open (pending PaymentIntents, an incomplete Subscription) are
+cancelled first; a draft whose payment turns out to have gone through is left
+for the webhooks (or `reconcile_stripe`) to activate. Each batch is then
+deleted in one short transaction, re-checking that the order is still an
+expired draft, together with the guest users that only existed for it.
+Sessions of orders that did get paid are just deleted.
+"""
+from collections import Counter
+
+import stripe
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from events.models import CheckoutSession, Order
+from payments.models import Payment
+from payments.utils import stripe_cache
+
+GUEST_USERNAME_PREFIX = 'guest-'
+GUEST_USERNAME_SUFFIX = '@checkout.invalid'
+
+# A PaymentIntent in one of these may still take (or has taken) the money.
+_PAID_PAYMENT_INTENT_STATUSES = ('processing', 'requires_capture', 'succeeded')
+_CANCELLABLE_SUBSCRIPTION_STATUSES = ('incomplete',)
+_DEAD_SUBSCRIPTION_STATUSES = ('incomplete_expired', 'canceled')
+
+
+def expired_session_batches(cutoff, batch_size):
+    """Batches of CheckoutSessions that expired before `cutoff`, in primary key order."""
+    last_pk = 0
+    while True:
+        batch = list(
+            CheckoutSession.objects
+            .filter(expires_at__lt=cutoff, pk__gt=last_pk)
+            .select_related('order')
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def _missing(error):
+    return getattr(error, 'code', None) == 'resource_missing'
+
+
+def _release_payment_intent(payment_intent_id):
+    try:
+        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        if payment_intent.status in _PAID_PAYMENT_INTENT_STATUSES:
+            return False
+        if payment_intent.status != 'canceled':
+            stripe.PaymentIntent.cancel(payment_intent_id)
+    except stripe.error.StripeError as e:
+        if not _missing(e):
+            return False
+    stripe_cache.invalidate(payment_intent_id)
+    return True
+
+
+def _release_subscription(subscription_id):
+    try:
+        subscription = stripe.Subscription.retrieve(subscription_id)
+        if subscription.status in _CANCELLABLE_SUBSCRIPTION_STATUSES:
+            stripe.Subscription.cancel(subscription_id)
+        elif subscription.status not in _DEAD_SUBSCRIPTION_STATUSES:
+            return False
+    except stripe.error.StripeError as e:
+        if not _missing(e):
+            return False
+    stripe_cache.invalidate(subscription_id)
+    return True
+
+
+def release_stripe_objects(order):
+    """
+    Cancels whatever checkout left open on Stripe for this draft. Returns
+    False if the order must be kept: a payment went through, or Stripe could
+    not be reached (the next run tries again).
+    """
+    # The subscription goes first: cancelling it voids its first invoice,
+    # whose PaymentIntent cannot be cancelled on its own.
+    if order.stripe_subscription_id and not _release_subscription(order.stripe_subscription_id):
+        return False
+    pending = Payment.objects.filter(order=order, status='pending').values_list('stripe_payment_intent_id', flat=True)
+    return all(_release_payment_intent(payment_intent_id) for payment_intent_id in pending if payment_intent_id)
+
+
+def _guest_users(user_ids):
+    """The given users that are guest checkout users with nothing left hanging off them."""
+    return get_user_model().objects.filter(
+        pk__in=user_ids,
+        username__startswith=GUEST_USERNAME_PREFIX,
+        username__endswith=GUEST_USERNAME_SUFFIX,
+        password__startswith='!',
+        is_staff=False,
+        is_superuser=False,
+        orders__isnull=True,
+        payments__isnull=True,
+    )
+
+
+def reap_batch(sessions, cutoff):
+    """
+    Deletes the expired drafts in `sessions` whose Stripe objects could be
+    released, plus the sessions of paid orders. Returns a Counter of rows
+    deleted per model label, and 'skipped' for drafts kept back.
+    """
+    reclaimed = Counter()
+    drafts = [session.order for session in sessions if session.order.status == 'pending_payment']
+    finished = [session.pk for session in sessions if session.order.status != 'pending_payment']
+
+    reapable = []
+    for order in drafts:
+        if release_stripe_objects(order):
+            reapable.append(order)
+        else:
+            reclaimed['skipped'] += 1
+
+    user_ids = {order.user_id for order in reapable if order.user_id}
+    with transaction.atomic():
+        # Re-checked here, so an order paid (or a session renewed) since the
+        # batch was read is left alone.
+        _, deleted = Order.objects.filter(
+            pk__in=[order.pk for order in reapable],
+            status='pending_payment',
+            checkout_session__expires_at__lt=cutoff,
+        ).delete()
+        reclaimed.update(deleted)
+        _, deleted = _guest_users(user_ids).delete()
+        reclaimed.update(deleted)
+        _, deleted = CheckoutSession.objects.filter(pk__in=finished).exclude(order__status='pending_payment').delete()
+        reclaimed.update(deleted)
+    return reclaimed
@@ -0,0 +1,126 @@
+"""
+Ledger of Stripe event ids we have already dealt with, so a redelivered
+webhook is acknowledged before any handler runs.
+
+The ledger rows are the WebhookEvent table (unique on stripe_event_id); a
+per-process LRU of recently settled ids sits in front of it, so a burst of
+retries after an outage is answered without touching the database at all.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils import timezone
+
+from payments.models import WebhookEvent
+from payments.utils.webhook_dispatch import ordering_key
+
+logger = logging.getLogger(__name__)
+
+
+class _RecentEventIds:
+    """A thread-safe, bounded set that evicts the least recently used id."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id):
+        with self._lock:
+            if event_id not in self._ids:
+                return False
+            self._ids.move_to_end(event_id)
+            return True
+
+    def add(self, event_id):
+        with self._lock:
+            self._ids[event_id] = None
+            self._ids.move_to_end(event_id)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+_recent = _RecentEventIds(settings.STRIPE_EVENT_LEDGER_CACHE_SIZE)
+
+
+def remember(event_id):
+    """Marks an event id as settled in this process."""
+    if event_id:
+        _recent.add(event_id)
+
+
+def forget_all():
+    """Empties the in-process cache (the database ledger is untouched)."""
+    _recent.clear()
+
+
+def already_seen(event_id):
+    """
+    Whether this event has already been handled or is queued to be. Only a
+    failed row ('failed' in the inbox, 'failed_inline' when handled inline)
+    lets a redelivery through, since that is the one outcome a Stripe retry
+    is meant to fix.
+    """
+    if not event_id:
+        return False
+    if event_id in _recent:
+        return True
+    if WebhookEvent.objects.filter(stripe_event_id=event_id).exclude(status__in=['failed', 'failed_inline']).exists():
+        _recent.add(event_id)
+        return True
+    return False
+
+
+def record_outcome(event, status, duration_ms, error=''):
+    """Writes (or updates) the ledger row for an event handled inline."""
+    row, created = WebhookEvent.objects.get_or_create(
+        stripe_event_id=event['id'],
+        defaults={
+            'event_type': event['type'],
+            'ordering_key': ordering_key(event),
+            'payload': event,
+        },
+    )
+    row.status = status
+    row.attempts += 1
+    row.duration_ms = duration_ms
+    row.last_error = error
+    row.processed_at = timezone.now() if status == 'processed' else None
+    row.save(update_fields=['status', 'attempts', 'duration_ms', 'last_error', 'processed_at'])
+    if status == 'processed':
+        remember(event['id'])
+    return row
+
+
+@contextmanager
+def track(event):
+    """
+    Times the handler run inside the block and records its outcome in the
+    ledger. Exceptions are recorded and re-raised, so the view still answers
+    Stripe with a 5xx and the event is retried. A failure is recorded as
+    'failed_inline', which the inbox worker never claims: Stripe's retry is
+    the only one, and the row does not hold up inbox events queued after it.
+    """
+    if not event.get('id'):
+        yield
+        return
+
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        record_outcome(event, 'failed_inline', _elapsed_ms(started), error=f"{type(e).__name__}: {e}")
+        raise
+    record_outcome(event, 'processed', _elapsed_ms(started))
+
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
@@ -0,0 +1,66 @@
+"""
+Invoice -> PaymentIntent resolution without a Stripe call.
+
+Lookups go through the Django cache, then the InvoicePaymentIntent table.
+The table is filled from webhook events as they arrive, by the
+`backfill_invoice_payment_intents` command for history, and by any Stripe
+lookup the renewal handler still has to make.
+"""
+from django.core.cache import cache
+from django.db import IntegrityError
+
+from payments.models import InvoicePaymentIntent
+
+_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _key(invoice_id):
+    return f"invoice_payment_intent:{invoice_id}"
+
+
+def _id(value):
+    if isinstance(value, dict):
+        return value.get('id')
+    return value
+
+
+def record_invoice_payment_intent(invoice_id, payment_intent_id):
+    """Stores the mapping; the first PaymentIntent recorded for an invoice wins."""
+    invoice_id, payment_intent_id = _id(invoice_id), _id(payment_intent_id)
+    if not invoice_id or not payment_intent_id:
+        return
+    try:
+        InvoicePaymentIntent.objects.get_or_create(
+            stripe_invoice_id=invoice_id,
+            defaults={'stripe_payment_intent_id': payment_intent_id},
+        )
+    except IntegrityError:
+        pass  # Recorded concurrently by another event for the same invoice.
+    cache.delete(_key(invoice_id))
+
+
+def lookup_payment_intent_id(invoice_id):
+    """The PaymentIntent id we know paid this invoice, or None."""
+    payment_intent_id = cache.get(_key(invoice_id))
+    if payment_intent_id:
+        return payment_intent_id
+    payment_intent_id = (
+        InvoicePaymentIntent.objects
+        .filter(stripe_invoice_id=invoice_id)
+        .values_list('stripe_payment_intent_id', flat=True)
+        .first()
+    )
+    if payment_intent_id:
+        cache.set(_key(invoice_id), payment_intent_id, timeout=_CACHE_TIMEOUT)
+    return payment_intent_id
+
+
+def handle_invoice_payment_paid(invoice_payment):
+    """
+    Handles the invoice_payment.paid event, which is where the post-2025 API
+    says which PaymentIntent settled an invoice.
+    """
+    payment = invoice_payment.get('payment') or {}
+    if payment.get('type', 'payment_intent') != 'payment_intent':
+        return
+    record_invoice_payment_intent(invoice_payment.get('invoice'), payment.get('payment_intent'))
@@ -0,0 +1,127 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from payments.models import OutboxMessage
+from payments.utils.send_admin_payment_notification import (
+    send_admin_cancellation_notification,
+    send_admin_payment_notification,
+)
+from payments.utils.send_customer_payment_notification import send_customer_payment_notification
+
+logger = logging.getLogger(__name__)
+
+STALE_SENDING_AFTER = timedelta(minutes=10)
+
+
+def _order(payload):
+    from events.models import Order
+    order_id = payload.get('order_id')
+    if order_id is None:
+        return None
+    return Order.objects.select_related('user').get(pk=order_id)
+
+
+def _send_customer_payment_confirmation(payload):
+    order = _order(payload)
+    send_customer_payment_notification(order.user, order, raise_errors=True)
+
+
+def _send_admin_payment_received(payload):
+    send_admin_payment_notification(payload['payment_intent_id'], order=_order(payload), raise_errors=True)
+
+
+def _send_admin_cancellation(payload):
+    send_admin_cancellation_notification(payload['message'], raise_errors=True)
+
+
+SENDERS = {
+    'customer_payment_confirmation': _send_customer_payment_confirmation,
+    'admin_payment_received': _send_admin_payment_received,
+    'admin_cancellation': _send_admin_cancellation,
+}
+
+
+def enqueue(kind, **payload):
+    """
+    Writes an outbound message in the current transaction and schedules it
+    to be sent once that transaction commits. If it rolls back, the message
+    disappears with it; if the process dies before sending, the
+    `dispatch_outbox` command picks it up.
+    """
+    message = OutboxMessage.objects.create(kind=kind, payload=payload)
+    transaction.on_commit(lambda: dispatch_message(message.pk))
+    return message
+
+
+def enqueue_payment_notifications(order, payment_intent_id):
+    """The customer confirmation and admin alert sent after a first payment."""
+    enqueue('customer_payment_confirmation', order_id=order.pk)
+    enqueue('admin_payment_received', order_id=order.pk, payment_intent_id=payment_intent_id)
+
+
+def dispatch_message(message_id):
+    """
+    Sends one outbox message. The conditional UPDATE claims it first, so a
+    message is never sent twice even if the on-commit hook and the
+    dispatch_outbox command race for it. The senders are asked to raise a
+    failed Mailgun or Twilio call (they only log it otherwise), so it marks
+    the message failed rather than sent. Returns True if it was sent here.
+    """
+    claimed = OutboxMessage.objects.filter(
+        pk=message_id, status__in=['pending', 'failed'],
+    ).update(status='sending', sending_started_at=timezone.now())
+    if not claimed:
+        return False
+
+    message = OutboxMessage.objects.get(pk=message_id)
+    message.attempts += 1
+    try:
+        SENDERS[message.kind](message.payload)
+    except Exception as e:
+        logger.error("Outbox message %s (%s) failed: %s", message.pk, message.kind, e)
+        message.status = 'failed'
+        message.last_error = f"{type(e).__name__}: {e}"
+        message.save(update_fields=['status', 'attempts', 'last_error'])
+        return False
+
+    message.status = 'sent'
+    message.sent_at = timezone.now()
+    message.last_error = ''
+    message.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+    return True
+
+
+def release_stale_sends():
+    """
+    Return messages left 'sending' by a crashed process to the queue. The
+    send may or may not have gone out before the crash; sending it again is
+    preferred to never sending it. Returns how many were released.
+    """
+    # No start time means the row was claimed before the column existed.
+    started_long_ago = Q(sending_started_at__isnull=True) | Q(sending_started_at__lt=timezone.now() - STALE_SENDING_AFTER)
+    return OutboxMessage.objects.filter(started_long_ago, status='sending').update(status='pending', sending_started_at=None, last_error='Interrupted while sending.')
+
+
+def dispatch_pending(include_failed=False, older_than=None, limit=None):
+    """
+    Sends messages the on-commit hook never got to. `older_than` skips
+    messages young enough that their own hook may still be running.
+    Returns (sent, failed).
+    """
+    statuses = ['pending', 'failed'] if include_failed else ['pending']
+    queryset = OutboxMessage.objects.filter(status__in=statuses)
+    if older_than is not None:
+        queryset = queryset.filter(created_at__lte=timezone.now() - older_than)
+    message_ids = list(queryset.order_by('id').values_list('id', flat=True)[:limit])
+
+    sent, failed = 0, 0
+    for message_id in message_ids:
+        if dispatch_message(message_id):
+            sent += 1
+        elif OutboxMessage.objects.filter(pk=message_id, status='failed').exists():
+            failed += 1
+    return sent, failed
@@ -0,0 +1,236 @@
+"""
+Compares Stripe's record of payments, subscriptions and transfers with ours.
+
+Objects are streamed from Stripe's list endpoints (auto-pagination) one
+created-time window at a time and joined against local rows a page at a
+time through indexed id lookups, so memory stays flat however much history
+is checked. Discrepancies that a webhook handler would have fixed carry that
+handler, so the caller can replay the missed event.
+
+A created-time window is only read once, but subscriptions and
+PaymentIntents change state long after they are created. Those still open
+on either side are therefore also checked on every run (stream_open), and
+so is every earlier discrepancy not yet resolved (stream_unresolved).
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+import stripe
+from django.conf import settings
+
+from events.models import Event, Order
+from partners.models import Payout
+from payments.models import Payment, ReconciliationDiscrepancy
+from payments.utils.webhook_handlers import (
+    _invoice_subscription_id,
+    handle_invoice_payment_succeeded,
+    handle_payment_intent_succeeded,
+    handle_subscription_deleted,
+    handle_transfer_created,
+)
+
+PAGE_SIZE = 100
+
+Discrepancy = namedtuple('Discrepancy', ['resource', 'stripe_id', 'problem', 'detail', 'replay', 'stripe_object'])
+
+_LIVE_SUBSCRIPTION_STATUSES = ('active', 'trialing', 'past_due')
+
+
+def _check_payment_intents(payment_intents):
+    succeeded = [pi for pi in payment_intents if pi.get('status') == 'succeeded']
+    local = dict(
+        Payment.objects
+        .filter(stripe_payment_intent_id__in=[pi['id'] for pi in succeeded])
+        .values_list('stripe_payment_intent_id', 'status')
+    )
+    for pi in succeeded:
+        order_id = (pi.get('metadata') or {}).get('order_id')
+        status = local.get(pi['id'])
+        if status is None and order_id:
+            # Renewal PaymentIntents carry no metadata and are covered by the
+            # invoice check; only our own checkout intents must have a row.
+            yield Discrepancy('payment_intents', pi['id'], 'missing_payment', f"order {order_id}", None, pi)
+        elif status is not None and status != 'succeeded':
+            yield Discrepancy(
+                'payment_intents', pi['id'], 'payment_not_succeeded', f"local status {status}",
+                handle_payment_intent_succeeded, pi,
+            )
+
+
+def _check_invoices(invoices):
+    renewals = [
+        invoice for invoice in invoices
+        if invoice.get('billing_reason') != 'subscription_create' and _invoice_subscription_id(invoice)
+    ]
+    subscription_ids = {_invoice_subscription_id(invoice) for invoice in renewals}
+    orders = dict(
+        Order.objects.filter(stripe_subscription_id__in=subscription_ids).values_list('stripe_subscription_id', 'id')
+    )
+    lead = timedelta(days=settings.SUBSCRIPTION_CHARGE_LEAD_DAYS)
+    delivery_dates = {invoice['id']: date.fromtimestamp(invoice['created']) + lead for invoice in renewals}
+    existing_events = set(
+        Event.objects
+        .filter(order_id__in=orders.values(), delivery_date__in=set(delivery_dates.values()))
+        .values_list('order_id', 'delivery_date')
+    )
+    for invoice in renewals:
+        subscription_id = _invoice_subscription_id(invoice)
+        order_id = orders.get(subscription_id)
+        if order_id is None:
+            yield Discrepancy('invoices', invoice['id'], 'missing_order', f"subscription {subscription_id}", None, invoice)
+        elif (order_id, delivery_dates[invoice['id']]) not in existing_events:
+            yield Discrepancy(
+                'invoices', invoice['id'], 'missing_renewal_event',
+                f"order {order_id}, delivery {delivery_dates[invoice['id']]}",
+                handle_invoice_payment_succeeded, invoice,
+            )
+
+
+def _check_subscriptions(subscriptions):
+    local = dict(
+        Order.objects
+        .filter(stripe_subscription_id__in=[subscription['id'] for subscription in subscriptions])
+        .values_list('stripe_subscription_id', 'status')
+    )
+    for subscription in subscriptions:
+        stripe_status = subscription.get('status')
+        status = local.get(subscription['id'])
+        if stripe_status in _LIVE_SUBSCRIPTION_STATUSES and status is None:
+            yield Discrepancy('subscriptions', subscription['id'], 'missing_order', f"stripe status {stripe_status}", None, subscription)
+        elif stripe_status in _LIVE_SUBSCRIPTION_STATUSES and status == 'pending_payment':
+            yield Discrepancy('subscriptions', subscription['id'], 'order_not_activated', f"stripe status {stripe_status}", None, subscription)
+        elif stripe_status == 'canceled' and status == 'active':
+            yield Discrepancy(
+                'subscriptions', subscription['id'], 'order_not_cancelled', 'stripe status canceled',
+                handle_subscription_deleted, subscription,
+            )
+
+
+def _check_transfers(transfers):
+    local = dict(
+        Payout.objects
+        .filter(stripe_transfer_id__in=[transfer['id'] for transfer in transfers])
+        .values_list('stripe_transfer_id', 'status')
+    )
+    for transfer in transfers:
+        status = local.get(transfer['id'])
+        if status is None:
+            payout_id = (transfer.get('metadata') or {}).get('payout_id')
+            yield Discrepancy('transfers', transfer['id'], 'missing_payout', f"payout {payout_id}", None, transfer)
+        elif status != 'completed':
+            yield Discrepancy(
+                'transfers', transfer['id'], 'payout_not_completed', f"local status {status}",
+                handle_transfer_created, transfer,
+            )
+
+
+# resource -> (Stripe class name, extra list filters, batch checker)
+RESOURCES = {
+    'payment_intents': ('PaymentIntent', {}, _check_payment_intents),
+    'invoices': ('Invoice', {'status': 'paid'}, _check_invoices),
+    'subscriptions': ('Subscription', {'status': 'all'}, _check_subscriptions),
+    'transfers': ('Transfer', {}, _check_transfers),
+}
+
+
+def windows(start, end, size):
+    """Consecutive [start, end) created-time windows of at most `size`."""
+    while start < end:
+        window_end = min(start + size, end)
+        yield start, window_end
+        start = window_end
+
+
+def stream(resource, start, end):
+    """Lazily iterates every Stripe object of `resource` created in [start, end)."""
+    class_name, filters, _ = RESOURCES[resource]
+    page = getattr(stripe, class_name).list(
+        created={'gte': int(start.timestamp()), 'lt': int(end.timestamp())},
+        limit=PAGE_SIZE,
+        **filters,
+    )
+    return page.auto_paging_iter()
+
+
+def _retrieve_each(resource, stripe_ids):
+    """Retrieves each of `stripe_ids` from Stripe, skipping any it no longer has."""
+    cls = getattr(stripe, RESOURCES[resource][0])
+    for stripe_id in stripe_ids:
+        try:
+            yield cls.retrieve(stripe_id)
+        except stripe.error.InvalidRequestError as e:
+            if getattr(e, 'code', None) != 'resource_missing':
+                raise
+
+
+def _open_subscriptions(settled_before):
+    # Every subscription live on Stripe, then the Stripe side of any active
+    # order whose subscription was not among them (cancelled on Stripe only).
+    # In steady state that second set is empty, so this costs one list.
+    listed = set()
+    created = {'lt': int(settled_before.timestamp())}
+    for status in _LIVE_SUBSCRIPTION_STATUSES:
+        for subscription in stripe.Subscription.list(status=status, created=created, limit=PAGE_SIZE).auto_paging_iter():
+            listed.add(subscription['id'])
+            yield subscription
+    active = (
+        Order.objects.filter(status='active', stripe_subscription_id__isnull=False, updated_at__lt=settled_before)
+        .exclude(stripe_subscription_id='')
+        .values_list('stripe_subscription_id', flat=True)
+        .iterator()
+    )
+    yield from _retrieve_each('subscriptions', (sid for sid in active if sid not in listed))
+
+
+def _open_payment_intents(settled_before):
+    # Payments we still have as pending; a succeeded intent among them is a
+    # missed payment_intent.succeeded, whenever the intent was created.
+    pending = (
+        Payment.objects.filter(status='pending', created_at__lt=settled_before)
+        .values_list('stripe_payment_intent_id', flat=True)
+        .iterator()
+    )
+    yield from _retrieve_each('payment_intents', pending)
+
+
+_OPEN = {
+    'payment_intents': _open_payment_intents,
+    'subscriptions': _open_subscriptions,
+}
+
+
+def stream_open(resource, settled_before):
+    """
+    Stripe objects of `resource` whose state can still change, checked on
+    every run whatever the checkpoint. Local rows touched after
+    `settled_before` are left for their webhooks.
+    """
+    if resource not in _OPEN:
+        return iter(())
+    return _OPEN[resource](settled_before)
+
+
+def stream_unresolved(resource):
+    """The Stripe objects behind this resource's unresolved discrepancies, retrieved again."""
+    stripe_ids = (
+        ReconciliationDiscrepancy.objects.filter(resource=resource, resolved_at__isnull=True)
+        .order_by('stripe_id').values_list('stripe_id', flat=True).distinct()
+    )
+    return _retrieve_each(resource, list(stripe_ids))
+
+
+def batched(iterable, size=PAGE_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def check_batch(resource, objects):
+    """Yields a Discrepancy for every object in the batch that disagrees with our rows."""
+    _, _, check = RESOURCES[resource]
+    yield from check(objects)
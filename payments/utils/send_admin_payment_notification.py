@@ -1,17 +1,17 @@
 import logging
-import requests
 from django.conf import settings
 from django.template.loader import render_to_string
-from twilio.rest import Client
 
 from data_management.utils import sms_messages
+from data_management.utils.provider_clients import post_mailgun_message, send_sms
 
 logger = logging.getLogger(__name__)
 
 
-def send_admin_cancellation_notification(message: str):
+def send_admin_cancellation_notification(message: str, raise_errors=False):
     """
     Sends an admin notification for a plan cancellation event (email + SMS).
+    A failed send is logged, and re-raised with raise_errors.
     """
     subject = "FutureFlower Plan Cancelled — Action May Be Required"
     admin_email = settings.ADMIN_EMAIL
@@ -25,42 +25,34 @@ def send_admin_cancellation_notification(message: str):
 
     try:
         html_body = render_to_string('notifications/emails/admin_cancellation.html', {'message': message})
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-            auth=("api", settings.MAILGUN_API_KEY),
-            data={
-                "from": settings.DEFAULT_FROM_EMAIL,
-                "to": [admin_email],
-                "subject": subject,
-                "text": message,
-                "html": html_body,
-            },
-            timeout=10,
-        )
+        response = post_mailgun_message({
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [admin_email],
+            "subject": subject,
+            "text": message,
+            "html": html_body,
+        })
         response.raise_for_status()
 
         if not settings.DEBUG:
-            sms_body = sms_messages.admin_cancellation(message)
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=sms_body,
-                messaging_service_sid=settings.TWILIO_MESSAGING_SERVICE_SID,
-                to=admin_number,
-            )
+            send_sms(sms_messages.admin_cancellation(message), admin_number)
 
     except Exception as e:
         logger.error(
             "An error occurred while sending admin cancellation notification. Error: %s", e
         )
+        if raise_errors:
+            raise
 
 
-def send_admin_payment_notification(payment_id: str, order=None):
+def send_admin_payment_notification(payment_id: str, order=None, raise_errors=False):
     """
     Sends an immediate notification to the admin via email and SMS after a successful payment.
 
     Args:
         payment_id: The ID of the successful payment, for logging purposes.
         order: The Order instance associated with the payment (optional, for order context).
+        raise_errors: Re-raise a failed send after logging it, rather than only logging it.
     """
     subject = "New FutureFlower Order Received"
     admin_email = settings.ADMIN_EMAIL
@@ -80,30 +72,22 @@ def send_admin_payment_notification(payment_id: str, order=None):
             'payment_id': payment_id,
             'order': order,
         })
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-            auth=("api", settings.MAILGUN_API_KEY),
-            data={
-                "from": settings.DEFAULT_FROM_EMAIL,
-                "to": [admin_email],
-                "subject": subject,
-                "text": text_body,
-                "html": html_body,
-            },
-            timeout=10,
-        )
+        response = post_mailgun_message({
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [admin_email],
+            "subject": subject,
+            "text": text_body,
+            "html": html_body,
+        })
         response.raise_for_status()
 
         if not settings.DEBUG:
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=text_body,
-                messaging_service_sid=settings.TWILIO_MESSAGING_SERVICE_SID,
-                to=admin_number,
-            )
+            send_sms(text_body, admin_number)
 
     except Exception as e:
         logger.error(
             "An error occurred while sending admin payment notification for payment_id: %s. Error: %s",
             payment_id, e
         )
+        if raise_errors:
+            raise
@@ -1,8 +1,9 @@
 import logging
-import requests
 from django.conf import settings
 from django.template.loader import render_to_string
 
+from data_management.utils.provider_clients import post_mailgun_message
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,11 +28,12 @@ def _format_address_lines(order):
     return lines
 
 
-def send_customer_payment_notification(user, order):
+def send_customer_payment_notification(user, order, raise_errors=False):
     """
     Sends an immediate payment confirmation email to the customer after a successful payment.
     Includes every order detail the customer entered at checkout, so they can
-    catch and report any mistakes before the first delivery.
+    catch and report any mistakes before the first delivery. A failed send is
+    logged, and re-raised with raise_errors.
     """
     if not user.email:
         logger.warning("No email for user %s — skipping customer payment notification.", user.pk)
@@ -93,18 +95,15 @@ def send_customer_payment_notification(user, order):
     text_body = "\n".join(text_lines)
 
     try:
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-            auth=("api", settings.MAILGUN_API_KEY),
-            data={
-                "from": settings.DEFAULT_FROM_EMAIL,
-                "to": [user.email],
-                "subject": "Your FutureFlower order is confirmed",
-                "text": text_body,
-                "html": html_body,
-            },
-            timeout=10,
-        )
+        response = post_mailgun_message({
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [user.email],
+            "subject": "Your FutureFlower order is confirmed",
+            "text": text_body,
+            "html": html_body,
+        })
         response.raise_for_status()
     except Exception as e:
         logger.error("Failed to send customer payment notification for user %s: %s", user.pk, e)
+        if raise_errors:
+            raise
@@ -0,0 +1,79 @@
+"""
+Short-lived, read-through cache of the few Stripe fields checkout re-reads.
+
+A guest who re-clicks "Pay" gets the same PaymentIntent or incomplete
+Subscription back, which means a Stripe retrieve on every click. Snapshots
+are plain dicts keyed by Stripe object id, live for STRIPE_OBJECT_CACHE_TTL
+seconds, and are dropped as soon as a webhook mentions the object or we
+cancel it ourselves, so a stale status can never outlive the event that
+changed it.
+"""
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+
+_KEY_PREFIX = 'stripe_object:'
+
+
+def _key(object_id):
+    return f"{_KEY_PREFIX}{object_id}"
+
+
+def _read_through(object_id, fetch):
+    key = _key(object_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = fetch()
+        cache.set(key, snapshot, timeout=settings.STRIPE_OBJECT_CACHE_TTL)
+    return snapshot
+
+
+def payment_intent_snapshot(payment_intent_id):
+    """{'status', 'amount', 'client_secret'} of a PaymentIntent. Raises StripeError."""
+    def fetch():
+        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        return {
+            'status': payment_intent.status,
+            'amount': payment_intent.amount,
+            'client_secret': payment_intent.client_secret,
+        }
+    return _read_through(payment_intent_id, fetch)
+
+
+def subscription_snapshot(subscription_id):
+    """
+    {'status', 'amount_due', 'client_secret'} of a Subscription and its latest
+    invoice; the invoice fields are None when there is no invoice.
+    Raises StripeError.
+    """
+    def fetch():
+        subscription = stripe.Subscription.retrieve(
+            subscription_id,
+            expand=['latest_invoice.confirmation_secret'],
+        )
+        invoice = getattr(subscription, 'latest_invoice', None)
+        confirmation_secret = getattr(invoice, 'confirmation_secret', None)
+        return {
+            'status': subscription.status,
+            'amount_due': getattr(invoice, 'amount_due', None),
+            'client_secret': getattr(confirmation_secret, 'client_secret', None),
+        }
+    return _read_through(subscription_id, fetch)
+
+
+def invalidate(*object_ids):
+    """Drops cached snapshots; falsy ids are ignored."""
+    keys = [_key(object_id) for object_id in object_ids if object_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_for_event(event):
+    """Drops every snapshot a webhook event may have made stale."""
+    from payments.utils.webhook_handlers import _invoice_subscription_id
+
+    obj = event['data']['object']
+    object_ids = [obj.get('id'), obj.get('payment_intent')]
+    if event['type'].startswith('invoice.'):
+        object_ids.append(_invoice_subscription_id(obj))
+    invalidate(*object_ids)
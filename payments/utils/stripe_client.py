@@ -0,0 +1,86 @@
+"""
+Process-wide Stripe configuration.
+
+Every Stripe call in the project goes through the SDK's global client, which
+`configure_stripe()` sets up once (from PaymentsConfig.ready) with:
+
+- one pooled, keep-alive requests.Session, so consecutive calls in a checkout
+  reuse the TLS connection instead of handshaking each time;
+- connect/read timeouts far tighter than the SDK's 80s default;
+- automatic network retries. The SDK stamps every POST with an
+  Idempotency-Key and reuses it on retry, so a retried create can never
+  create twice;
+- per-call latency logging, with slow calls raised to a warning.
+"""
+import hashlib
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_configured = False
+
+
+class InstrumentedRequestsClient(stripe.RequestsClient):
+    """The SDK's requests client, timing and logging every HTTP round-trip."""
+
+    def request(self, method, url, headers, post_data=None):
+        started = time.monotonic()
+        status_code = None
+        try:
+            content, status_code, response_headers = super().request(method, url, headers, post_data)
+            return content, status_code, response_headers
+        finally:
+            duration_ms = int((time.monotonic() - started) * 1000)
+            level = logging.WARNING if duration_ms >= settings.STRIPE_SLOW_CALL_MS else logging.DEBUG
+            logger.log(
+                level, "Stripe %s %s -> %s in %dms",
+                method.upper(), urlsplit(url).path, status_code or 'error', duration_ms,
+            )
+
+
+def _pooled_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    return session
+
+
+def configure_stripe(force=False):
+    """
+    Points the Stripe SDK at our key and the shared pooled HTTP client.
+    Safe to call repeatedly; only the first call (or force=True) does work.
+    """
+    global _configured
+    if _configured and not force:
+        return stripe
+    with _lock:
+        if _configured and not force:
+            return stripe
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+        stripe.default_http_client = InstrumentedRequestsClient(
+            session=_pooled_session(),
+            timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+        )
+        _configured = True
+    return stripe
+
+
+def idempotency_key(*parts):
+    """
+    A deterministic Idempotency-Key for a create call that must happen once
+    per local record, e.g. the transfer for one Payout row. Only use it when
+    the parts uniquely identify a single attempt — Stripe replays the first
+    response for 24h, including a failure.
+    """
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
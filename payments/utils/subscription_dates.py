@@ -1,4 +1,5 @@
 from datetime import date, timedelta
+import numpy as np
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 
@@ -31,40 +32,97 @@ def calculate_second_delivery_date(start_date, frequency):
     return None
 
 
-def get_next_payment_date(order: 'Order') -> date | None:
+# Billing periods in weeks (fixed-length) or months (calendar).
+_PERIOD_WEEKS = {'weekly': 1, 'fortnightly': 2}
+_PERIOD_MONTHS = {'monthly': 1, 'annually': 12}
+
+
+def next_payment_date(start_date: date, frequency: str, lead_days: int, today: date | None = None) -> date | None:
     """
-    Calculates the next upcoming payment date for a recurring order.
+    The first billing date strictly after `today` for a subscription whose
+    deliveries start on `start_date`, in constant time for any order age.
 
-    This function is robust against "date drift" by always calculating
-    from the original billing cycle anchor date.
+    Every billing date is computed from the anchor (start_date - lead_days)
+    as anchor + n periods, never by stepping from the previous date, so an
+    anchor on the 31st bills on the 31st in every month that has one (and
+    the month's last day otherwise), as Stripe does.
     """
-    if not order.start_date or not order.frequency:
+    if not start_date or not frequency:
         return None
+    today = today or date.today()
+    anchor = start_date - timedelta(days=lead_days)
+    if anchor > today:
+        return anchor
+
+    if frequency in _PERIOD_WEEKS:
+        step_days = 7 * _PERIOD_WEEKS[frequency]
+        periods = (today - anchor).days // step_days + 1
+        return anchor + timedelta(days=periods * step_days)
+
+    if frequency in _PERIOD_MONTHS:
+        step_months = _PERIOD_MONTHS[frequency]
+        elapsed_months = (today.year - anchor.year) * 12 + today.month - anchor.month
+        periods = elapsed_months // step_months
+        candidate = anchor + relativedelta(months=periods * step_months)
+        if candidate <= today:
+            candidate = anchor + relativedelta(months=(periods + 1) * step_months)
+        return candidate
 
-    lead_days = settings.SUBSCRIPTION_CHARGE_LEAD_DAYS
-    anchor_date = order.start_date - timedelta(days=lead_days)
+    return None
 
-    today = date.today()
 
-    if anchor_date > today:
-        return anchor_date
+def next_payment_dates(start_dates, frequencies, lead_days: int, today: date | None = None) -> list[date | None]:
+    """
+    Vectorised `next_payment_date` over many subscriptions at once, using
+    NumPy datetime64 arithmetic. Positions the scalar version answers with
+    None are None here too.
+    """
+    today = np.datetime64(today or date.today(), 'D')
+    count = len(start_dates)
+    scheduled = np.array([bool(s) and bool(f) for s, f in zip(start_dates, frequencies)], dtype=bool)
+    known = scheduled & np.array([f in _PERIOD_WEEKS or f in _PERIOD_MONTHS for f in frequencies], dtype=bool)
+    starts = np.array([s if s else date.min for s in start_dates], dtype='datetime64[D]')
+    anchors = starts - np.timedelta64(lead_days, 'D')
+
+    step_weeks = np.array([_PERIOD_WEEKS.get(f, 0) for f in frequencies], dtype=np.int64)
+    step_months = np.array([_PERIOD_MONTHS.get(f, 0) for f in frequencies], dtype=np.int64)
+    result = np.full(count, np.datetime64('NaT'), dtype='datetime64[D]')
+
+    weekly = known & (step_weeks > 0)
+    if weekly.any():
+        step_days = 7 * step_weeks[weekly]
+        elapsed = (today - anchors[weekly]).astype(np.int64)
+        result[weekly] = anchors[weekly] + ((elapsed // step_days + 1) * step_days).astype('timedelta64[D]')
+
+    calendar = known & (step_months > 0)
+    if calendar.any():
+        steps = step_months[calendar]
+        anchor_months = anchors[calendar].astype('datetime64[M]')
+        day_offsets = (anchors[calendar] - anchor_months.astype('datetime64[D]')).astype(np.int64)
+        elapsed = (today.astype('datetime64[M]') - anchor_months).astype(np.int64)
+        periods = elapsed // steps
+
+        def nth(periods):
+            month_starts = anchor_months + (periods * steps).astype('timedelta64[M]')
+            month_lengths = ((month_starts + 1).astype('datetime64[D]') - month_starts.astype('datetime64[D]')).astype(np.int64)
+            return month_starts.astype('datetime64[D]') + np.minimum(day_offsets, month_lengths - 1).astype('timedelta64[D]')
+
+        candidates = nth(periods)
+        candidates = np.where(candidates <= today, nth(periods + 1), candidates)
+        result[calendar] = candidates
+
+    result = np.where(scheduled & (anchors > today), anchors, result)
+    return [value.item() if scheduled[i] else None for i, value in enumerate(result)]
 
-    next_date = anchor_date
-    frequency = order.frequency
 
-    while next_date <= today:
-        if frequency == 'monthly':
-            next_date += relativedelta(months=1)
-        elif frequency == 'weekly':
-            next_date += relativedelta(weeks=1)
-        elif frequency == 'fortnightly':
-            next_date += relativedelta(weeks=2)
-        elif frequency == 'annually':
-            next_date += relativedelta(years=1)
-        else:
-            return None
-            
-    return next_date
+def get_next_payment_date(order: 'Order') -> date | None:
+    """
+    Calculates the next upcoming payment date for a recurring order.
+
+    This function is robust against "date drift" by always calculating
+    from the original billing cycle anchor date.
+    """
+    return next_payment_date(order.start_date, order.frequency, settings.SUBSCRIPTION_CHARGE_LEAD_DAYS)
 
 
 def get_next_delivery_date(order: 'Order') -> date | None:
@@ -77,3 +135,19 @@ def get_next_delivery_date(order: 'Order') -> date | None:
 
     lead_days = settings.SUBSCRIPTION_CHARGE_LEAD_DAYS
     return next_payment + timedelta(days=lead_days)
+
+
+def get_next_payment_dates(orders) -> list[date | None]:
+    """`get_next_payment_date` for many orders in one vectorised pass."""
+    orders = list(orders)
+    return next_payment_dates(
+        [order.start_date for order in orders],
+        [order.frequency for order in orders],
+        settings.SUBSCRIPTION_CHARGE_LEAD_DAYS,
+    )
+
+
+def get_next_delivery_dates(orders) -> list[date | None]:
+    """`get_next_delivery_date` for many orders in one vectorised pass."""
+    lead = timedelta(days=settings.SUBSCRIPTION_CHARGE_LEAD_DAYS)
+    return [payment + lead if payment else None for payment in get_next_payment_dates(orders)]
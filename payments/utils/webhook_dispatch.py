@@ -0,0 +1,64 @@
+import logging
+
+from payments.utils.webhook_handlers import (
+    _invoice_subscription_id,
+    handle_payment_intent_succeeded,
+    handle_invoice_payment_succeeded,
+    handle_payment_intent_failed,
+    handle_subscription_deleted,
+    handle_account_updated,
+    handle_transfer_created,
+)
+from payments.utils.invoice_payments import handle_invoice_payment_paid
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_HANDLERS = {
+    'payment_intent.succeeded': handle_payment_intent_succeeded,
+    'invoice.payment_succeeded': handle_invoice_payment_succeeded,
+    'payment_intent.payment_failed': handle_payment_intent_failed,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'account.updated': handle_account_updated,
+    'transfer.created': handle_transfer_created,
+    'invoice_payment.paid': handle_invoice_payment_paid,
+}
+
+
+def dispatch_event(event):
+    """
+    Runs the handler for a Stripe event. Shared by the webhook view (inline
+    mode) and the inbox worker, so both paths behave identically. Handler
+    exceptions propagate to the caller, which decides whether to retry.
+
+    Returns False for event types we do not handle.
+    """
+    handler = WEBHOOK_HANDLERS.get(event['type'])
+    if handler is None:
+        logger.warning("Unhandled Stripe webhook event type: %s", event['type'])
+        return False
+    handler(event['data']['object'])
+    return True
+
+
+def ordering_key(event):
+    """
+    Groups events that touch the same order, so the worker never processes
+    them out of arrival order. Derived from the payload alone — the webhook
+    view must stay free of lookups — so it is a best effort: one-off
+    PaymentIntents carry the order id in their metadata, subscription events
+    share the subscription id, and anything else falls back to its own
+    object id.
+    """
+    obj = event['data']['object']
+    metadata = obj.get('metadata') or {}
+    if metadata.get('order_id'):
+        return f"order:{metadata['order_id']}"
+
+    event_type = event['type']
+    if event_type.startswith('invoice.'):
+        subscription_id = _invoice_subscription_id(obj)
+        if subscription_id:
+            return f"sub:{subscription_id}"
+    if event_type.startswith('customer.subscription.'):
+        return f"sub:{obj.get('id')}"
+    return f"{obj.get('object', 'obj')}:{obj.get('id')}"
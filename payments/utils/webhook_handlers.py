@@ -4,8 +4,9 @@ from django.db import transaction
 from payments.models import Payment
 from events.models import Order, Event
 from payments.utils.subscription_dates import get_next_delivery_date
-from payments.utils.send_admin_payment_notification import send_admin_payment_notification
-from payments.utils.send_customer_payment_notification import send_customer_payment_notification
+from payments.utils.outbox import enqueue, enqueue_payment_notifications
+from events.utils.checkout_session_cache import bump_order_version
+from payments.utils.invoice_payments import lookup_payment_intent_id, record_invoice_payment_intent
 from data_management.utils.notification_factory import create_admin_event_notifications, create_customer_delivery_day_notification
 
 
@@ -17,7 +18,8 @@ def _activate_order(order):
 def _create_first_event(order, payment_intent_id):
     """
     Creates the single delivery Event for a one-time or recurring order's
-    first delivery. Idempotent.
+    first delivery. Idempotent. The payment emails/SMS go through the outbox,
+    so they are sent after the caller's transaction commits.
     """
     if Event.objects.filter(order=order, delivery_date=order.start_date).exists():
         print(f"First event for Order (PK: {order.pk}) already exists. Skipping duplicate.")
@@ -35,8 +37,7 @@ def _create_first_event(order, payment_intent_id):
     )
     create_admin_event_notifications(event)
     create_customer_delivery_day_notification(event)
-    send_customer_payment_notification(order.user, order)
-    send_admin_payment_notification(payment_intent_id, order=order)
+    enqueue_payment_notifications(order, payment_intent_id)
 
 
 def handle_payment_intent_succeeded(payment_intent):
@@ -51,6 +52,7 @@ def handle_payment_intent_succeeded(payment_intent):
     transient failure (e.g. the Payment row not written yet, see below).
     """
     payment_intent_id = payment_intent['id']
+    record_invoice_payment_intent(payment_intent.get('invoice'), payment_intent_id)
 
     with transaction.atomic():
         try:
@@ -110,16 +112,21 @@ def _invoice_subscription_id(invoice):
 def _invoice_payment_intent_id(invoice):
     """
     The PaymentIntent id that paid an invoice. Since Stripe API 2025-03-31
-    (basil) invoices no longer carry `payment_intent`; the link lives on the
-    invoice's payments, which need an expanded retrieve. Falls back to the
-    invoice id as an idempotency key if no PaymentIntent can be found.
+    (basil) invoices no longer carry `payment_intent`; the link arrives in a
+    separate `invoice_payment.paid` event and is kept in InvoicePaymentIntent.
+    Only if that event has not been seen yet do we pay for an expanded
+    retrieve. Falls back to the invoice id as an idempotency key if no
+    PaymentIntent can be found.
     """
     payment_intent = invoice.get('payment_intent')
     if payment_intent:
         return payment_intent if isinstance(payment_intent, str) else payment_intent.get('id')
 
+    known = lookup_payment_intent_id(invoice['id'])
+    if known:
+        return known
+
     import stripe
-    stripe.api_key = settings.STRIPE_SECRET_KEY
     try:
         expanded = stripe.Invoice.retrieve(
             invoice['id'], expand=['payments.data.payment.payment_intent']
@@ -127,7 +134,9 @@ def _invoice_payment_intent_id(invoice):
         for invoice_payment in expanded.get('payments', {}).get('data', []):
             intent = (invoice_payment.get('payment') or {}).get('payment_intent')
             if intent:
-                return intent if isinstance(intent, str) else intent.get('id')
+                intent = intent if isinstance(intent, str) else intent.get('id')
+                record_invoice_payment_intent(invoice['id'], intent)
+                return intent
     except stripe.error.StripeError as e:
         print(f"Could not resolve PaymentIntent for invoice {invoice.get('id')}: {e}")
     return f"invoice_{invoice['id']}"
@@ -182,6 +191,9 @@ def handle_invoice_payment_succeeded(invoice):
         except Exception as e:
             print(f"Error processing referral commission for subscription: {e}")
 
+        if order.refresh_billing_dates():
+            order.save(update_fields=['next_payment_date', 'next_delivery_date'])
+
         invoice_created_ts = invoice.get('created')
         if invoice_created_ts:
             from datetime import date
@@ -204,7 +216,7 @@ def handle_invoice_payment_succeeded(invoice):
             )
             create_admin_event_notifications(new_event)
             create_customer_delivery_day_notification(new_event)
-            send_admin_payment_notification(payment_intent_id, order=order)
+            enqueue('admin_payment_received', order_id=order.pk, payment_intent_id=payment_intent_id)
             print(f"Created new Event for recurring delivery on {delivery_date}.")
         else:
             print(f"Event for delivery on {delivery_date} already exists. Skipping duplicate.")
@@ -219,6 +231,7 @@ def handle_payment_intent_failed(payment_intent):
         payment = Payment.objects.get(stripe_payment_intent_id=payment_intent['id'])
         payment.status = 'failed'
         payment.save()
+        bump_order_version(payment.order_id)
         print(f"Payment record (PK: {payment.pk}) status updated to 'failed'.")
     except Payment.DoesNotExist:
         print(f"ERROR: Received failed payment intent for non-existent local Payment record ID: {payment_intent['id']}")
@@ -255,18 +268,10 @@ def handle_subscription_deleted(subscription):
                 print(f"Order (PK: {order.pk}) draft detached from expired subscription {subscription_id}.")
                 return
 
-            order.status = 'cancelled'
-            order.save()
-            print(f"Order (PK: {order.pk}) marked as cancelled via webhook.")
-
-            scheduled_events = order.events.filter(status='scheduled')
-            for event in scheduled_events:
-                from data_management.models.notification import Notification
-                Notification.objects.filter(
-                    related_event=event, status='pending'
-                ).update(status='cancelled')
-                event.status = 'cancelled'
-                event.save()
+            from events.utils.order_cancellation import cancel_order
+            summary = cancel_order(order)
+            print(f"Order (PK: {order.pk}) marked as cancelled via webhook. "
+                  f"Cancelled {summary['events']} event(s) and {summary['notifications']} notification(s).")
 
     except Order.DoesNotExist:
         print(f"Order not found for Stripe Subscription ID: {subscription_id}. Skipping.")
@@ -0,0 +1,173 @@
+import logging
+import random
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, Min, OuterRef
+from django.utils import timezone
+
+from payments.models import WebhookEvent
+from payments.utils import event_ledger
+from payments.utils.webhook_dispatch import dispatch_event, ordering_key
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+STALE_LOCK_AFTER = timedelta(minutes=10)
+
+
+def store_webhook_event(event):
+    """
+    Records a verified event in the inbox. A redelivery of an event that is
+    already stored is absorbed by the unique stripe_event_id, except that
+    one which failed while handled inline (before STRIPE_WEBHOOK_INBOX was
+    turned on) is queued. Returns True if the event was new.
+    """
+    row, created = WebhookEvent.objects.get_or_create(
+        stripe_event_id=event['id'],
+        defaults={
+            'event_type': event['type'],
+            'ordering_key': ordering_key(event),
+            'payload': event,
+        },
+    )
+    if not created and row.status == 'failed_inline':
+        WebhookEvent.objects.filter(pk=row.pk, status='failed_inline').update(
+            status='pending', next_attempt_at=timezone.now(),
+        )
+    return created
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at RETRY_MAX_SECONDS."""
+    delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def release_stale_locks():
+    """Return rows left 'processing' by a crashed worker to the queue."""
+    return WebhookEvent.objects.filter(
+        status='processing',
+        locked_at__lt=timezone.now() - STALE_LOCK_AFTER,
+    ).update(status='failed', locked_at=None, next_attempt_at=timezone.now())
+
+
+def claim_batch(limit):
+    """
+    Claims up to `limit` due events and marks them 'processing'.
+
+    An event is skipped while an older event with the same ordering key is
+    still waiting on a retry, so per-order ordering survives failures.
+    Uses SKIP LOCKED where the database supports it, so several workers can
+    drain the inbox side by side.
+    """
+    now = timezone.now()
+    blocked_by_older = WebhookEvent.objects.filter(
+        ordering_key=OuterRef('ordering_key'),
+        id__lt=OuterRef('id'),
+        status__in=['failed', 'processing'],
+    )
+    with transaction.atomic():
+        due = (
+            WebhookEvent.objects
+            .filter(status__in=['pending', 'failed'], next_attempt_at__lte=now)
+            .exclude(Exists(blocked_by_older))
+            .order_by('id')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        rows = list(due[:limit])
+        WebhookEvent.objects.filter(pk__in=[row.pk for row in rows]).update(
+            status='processing', locked_at=now,
+        )
+    return rows
+
+
+def group_by_ordering_key(rows):
+    """Splits claimed rows into per-key lanes, each in arrival order."""
+    lanes = OrderedDict()
+    for row in rows:
+        lanes.setdefault(row.ordering_key, []).append(row)
+    return list(lanes.values())
+
+
+def process_webhook_event(row, max_attempts=None):
+    """
+    Dispatches one inbox row and records the outcome. A handler exception
+    schedules a retry with backoff, or dead-letters the row once it has used
+    up max_attempts. Returns True on success.
+    """
+    max_attempts = max_attempts or settings.STRIPE_WEBHOOK_MAX_ATTEMPTS
+    row.attempts += 1
+    started = time.monotonic()
+    try:
+        dispatch_event(row.payload)
+    except Exception as e:
+        row.duration_ms = int((time.monotonic() - started) * 1000)
+        logger.exception("Stripe event %s (%s) failed on attempt %s.", row.stripe_event_id, row.event_type, row.attempts)
+        row.last_error = f"{type(e).__name__}: {e}"
+        row.locked_at = None
+        if row.attempts >= max_attempts:
+            row.status = 'dead'
+            logger.error("Stripe event %s dead-lettered after %s attempts.", row.stripe_event_id, row.attempts)
+        else:
+            row.status = 'failed'
+            row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+        row.save(update_fields=['attempts', 'status', 'last_error', 'locked_at', 'next_attempt_at', 'duration_ms'])
+        return False
+
+    row.duration_ms = int((time.monotonic() - started) * 1000)
+    row.status = 'processed'
+    row.processed_at = timezone.now()
+    row.locked_at = None
+    row.last_error = ''
+    row.save(update_fields=['attempts', 'status', 'processed_at', 'locked_at', 'last_error', 'duration_ms'])
+    event_ledger.remember(row.stripe_event_id)
+    return True
+
+
+def process_lane(rows, max_attempts=None):
+    """
+    Processes one ordering lane sequentially. Stops at the first failure and
+    hands the rest of the lane back to the queue untouched, so they run after
+    the failed event's retry rather than ahead of it.
+    """
+    processed, failed = 0, 0
+    for index, row in enumerate(rows):
+        if process_webhook_event(row, max_attempts=max_attempts):
+            processed += 1
+            continue
+        failed += 1
+        remaining = [r.pk for r in rows[index + 1:]]
+        if remaining:
+            WebhookEvent.objects.filter(pk__in=remaining).update(status='pending', locked_at=None)
+        break
+    return processed, failed
+
+
+def queue_depth():
+    """
+    Inbox depth by status, plus the age in seconds of the oldest event still
+    waiting. Logged by the worker after every batch for alerting.
+    """
+    counts = dict(
+        WebhookEvent.objects
+        .exclude(status='processed')
+        .order_by()
+        .values_list('status')
+        .annotate(n=Count('id'))
+    )
+    oldest = WebhookEvent.objects.filter(
+        status__in=['pending', 'failed', 'processing'],
+    ).aggregate(oldest=Min('received_at'))['oldest']
+    return {
+        'pending': counts.get('pending', 0),
+        'processing': counts.get('processing', 0),
+        'failed': counts.get('failed', 0),
+        'dead': counts.get('dead', 0),
+        'oldest_age_seconds': int((timezone.now() - oldest).total_seconds()) if oldest else 0,
+    }
@@ -1,3 +1,4 @@
+import json
 import logging
 
 import stripe
@@ -7,14 +8,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from payments.utils.webhook_handlers import (
-    handle_payment_intent_succeeded,
-    handle_invoice_payment_succeeded,
-    handle_payment_intent_failed,
-    handle_subscription_deleted,
-    handle_account_updated,
-    handle_transfer_created,
-)
+from payments.utils import event_ledger, stripe_cache
+from payments.utils.webhook_dispatch import dispatch_event
+from payments.utils.webhook_inbox import store_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +18,10 @@ logger = logging.getLogger(__name__)
 class StripeWebhookView(APIView):
     """
     Listens for webhook events from Stripe and delegates them to appropriate handlers.
+
+    With STRIPE_WEBHOOK_INBOX enabled the verified event is only stored, and
+    the `process_webhook_inbox` worker runs the handler later, so Stripe gets
+    its 200 without waiting on our database work or outbound notifications.
     """
     authentication_classes = []
     permission_classes = [AllowAny]
@@ -57,25 +57,18 @@ class StripeWebhookView(APIView):
             )
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        if event['type'] == 'payment_intent.succeeded':
-            handle_payment_intent_succeeded(event['data']['object'])
-
-        elif event['type'] == 'invoice.payment_succeeded':
-            handle_invoice_payment_succeeded(event['data']['object'])
-
-        elif event['type'] == 'payment_intent.payment_failed':
-            handle_payment_intent_failed(event['data']['object'])
-
-        elif event['type'] == 'customer.subscription.deleted':
-            handle_subscription_deleted(event['data']['object'])
-
-        elif event['type'] == 'account.updated':
-            handle_account_updated(event['data']['object'])
+        stripe_cache.invalidate_for_event(event)
 
-        elif event['type'] == 'transfer.created':
-            handle_transfer_created(event['data']['object'])
+        event_id = event.get('id')
+        if event_ledger.already_seen(event_id):
+            logger.info("Stripe event %s already handled. Acknowledging replay.", event_id)
+            return HttpResponse(status=200)
 
-        else:
-            logger.warning("Unhandled Stripe webhook event type: %s", event['type'])
+        if settings.STRIPE_WEBHOOK_INBOX:
+            store_webhook_event(json.loads(payload))
+            event_ledger.remember(event_id)
+            return HttpResponse(status=200)
 
+        with event_ledger.track(json.loads(payload)):
+            dispatch_event(event)
         return HttpResponse(status=200)
@@ -11,7 +11,7 @@ def test_send_password_reset_email_success(mocker):
     """
     user = UserFactory()
     
-    mock_post = mocker.patch('users.utils.send_password_reset_email.requests.post')
+    mock_post = mocker.patch('users.utils.send_password_reset_email.post_mailgun_message')
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_post.return_value = mock_response
@@ -20,9 +20,9 @@ def test_send_password_reset_email_success(mocker):
     
     assert result is True
     mock_post.assert_called_once()
-    args, kwargs = mock_post.call_args
-    assert kwargs['data']['to'] == [user.email]
-    assert kwargs['data']['subject'] == "Reset Your FutureFlower Password"
+    data = mock_post.call_args.args[0]
+    assert data['to'] == [user.email]
+    assert data['subject'] == "Reset Your FutureFlower Password"
 
 @pytest.mark.django_db
 def test_send_password_reset_email_blocked_user(mocker):
@@ -32,7 +32,7 @@ def test_send_password_reset_email_blocked_user(mocker):
     user = UserFactory()
     BlockedEmailFactory(email=user.email)
 
-    mock_post = mocker.patch('users.utils.send_password_reset_email.requests.post')
+    mock_post = mocker.patch('users.utils.send_password_reset_email.post_mailgun_message')
 
     result = send_password_reset_email(user)
     
@@ -46,7 +46,7 @@ def test_send_password_reset_email_api_failure(mocker):
     """
     user = UserFactory()
     
-    mock_post = mocker.patch('users.utils.send_password_reset_email.requests.post')
+    mock_post = mocker.patch('users.utils.send_password_reset_email.post_mailgun_message')
     mock_response = MagicMock()
     mock_response.status_code = 500
     mock_post.return_value = mock_response
@@ -63,7 +63,7 @@ def test_send_password_reset_email_exception(mocker):
     """
     user = UserFactory()
     
-    mock_post = mocker.patch('users.utils.send_password_reset_email.requests.post')
+    mock_post = mocker.patch('users.utils.send_password_reset_email.post_mailgun_message')
     mock_post.side_effect = Exception("Mailgun API Error")
 
     result = send_password_reset_email(user)
@@ -1,5 +1,4 @@
 import logging
-import requests
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.contrib.auth.tokens import default_token_generator
@@ -8,6 +7,7 @@ from django.utils.encoding import force_bytes
 from users.models import User
 from data_management.models import BlockedEmail
 from data_management.views.add_to_blocklist_view import signer
+from data_management.utils.provider_clients import post_mailgun_message
 
 logger = logging.getLogger(__name__)
 
@@ -40,16 +40,11 @@ def send_password_reset_email(user: User):
         html_content = render_to_string("users/emails/password_reset_email.html", context)
         text_content = render_to_string("users/emails/password_reset_email.txt", context)
 
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-            auth=("api", settings.MAILGUN_API_KEY),
-            data={"from": settings.DEFAULT_FROM_EMAIL,
-                  "to": [user.email],
-                  "subject": subject,
-                  "text": text_content,
-                  "html": html_content},
-            timeout=10
-        )
+        response = post_mailgun_message({"from": settings.DEFAULT_FROM_EMAIL,
+                                         "to": [user.email],
+                                         "subject": subject,
+                                         "text": text_content,
+                                         "html": html_content})
 
         if response.status_code == 200:
             return True